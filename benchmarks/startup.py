@@ -0,0 +1,111 @@
+"""Measure how long the modules of the package take to import in a fresh interpreter.
+
+Each target is imported in a new Python process several times and the median wall time is
+reported, together with the heavy dependencies the import pulled in. Run it from the root of
+the repository:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10 --json
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+
+TARGETS = [
+    "src.leagues",
+    "src.cache",
+    "src.client",
+    "src.scrape",
+    "src.harvest",
+    "src.sync",
+    "src.utils",
+    "src.style",
+    "src.shotmap",
+    "src.shotzone",
+    "src.storage",
+    "src.zones",
+]
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["pandas", "matplotlib", "mplsoccer", "aiohttp", "understat"]
+
+# The heavy modules are imported by the modules that can not work without them only.
+EXPECTED_LIGHT = ["src.leagues", "src.cache", "src.client", "src.scrape", "src.harvest", "src.sync", "src.utils", "src.style", "src.shotmap", "src.shotzone"]
+
+SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(target, repeat=5):
+    """Import a module in `repeat` fresh interpreters.
+
+    Returns:
+        dict: The target, the median and minimum import time in milliseconds, the median time
+            of the whole process and the heavy modules loaded by the import.
+    """
+
+    imports = []
+    processes = []
+    loaded = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", SCRIPT.format(target=target, heavy=HEAVY_MODULES)], cwd=ROOT_PATH, capture_output=True, text=True, check=True).stdout
+        processes.append(time.perf_counter() - start)
+
+        result = json.loads(output)
+        imports.append(result["elapsed"])
+        loaded = result["loaded"]
+
+    return {
+        "target": target,
+        "import_ms": round(statistics.median(imports) * 1000, 1),
+        "import_min_ms": round(min(imports) * 1000, 1),
+        "process_ms": round(statistics.median(processes) * 1000, 1),
+        "heavy_modules": loaded,
+    }
+
+
+def run(targets=TARGETS, repeat=5):
+    return [measure(target, repeat) for target in targets]
+
+
+def check(results):
+    """Return the targets expected to start fast that imported a heavy module."""
+
+    return [result["target"] for result in results if result["target"] in EXPECTED_LIGHT and result["heavy_modules"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the import time of the package modules.")
+    parser.add_argument("targets", nargs="*", default=TARGETS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--check", action="store_true", help="Fail if a fast-startup module imports a heavy dependency.")
+    args = parser.parse_args()
+
+    results = run(args.targets, args.repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'target':<16}{'import (ms)':>14}{'process (ms)':>14}  heavy modules")
+        for result in results:
+            print(f"{result['target']:<16}{result['import_ms']:>14}{result['process_ms']:>14}  {', '.join(result['heavy_modules']) or '-'}")
+
+    if args.check:
+        failed = check(results)
+        if failed:
+            print(f"Heavy dependencies imported at startup by: {', '.join(failed)}.", file=sys.stderr)
+            sys.exit(1)
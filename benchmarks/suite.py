@@ -0,0 +1,762 @@
+"""Benchmark the shot processing, the figures and the scrape paths on synthetic shots.
+
+Shots shaped like the Understat ones are generated for each size, from 10 up to 1 000 000
+shots, with a fixed seed so every run sees the same data. The scrape paths run against a
+local stub of the Understat API, so no request leaves the machine. Run it from the root of
+the repository:
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --sizes 10 1000 100000 1000000 --repeat 5 --output benchmarks/results/main.json
+    python benchmarks/suite.py --cases prepare_shot_data calculate_shots_stats --json
+
+Compare two result files, for example the ones saved on two commits, and fail when a case
+got slower than the threshold:
+
+    python benchmarks/suite.py --compare benchmarks/results/main.json benchmarks/results/branch.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+from importlib import metadata
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+
+MAX_SIZE = 1_000_000
+
+# A player or a match never has this many shots, and the stub would serve hundreds of MB.
+MAX_SCRAPE_SIZE = 100_000
+
+DEFAULT_REPEAT = 3
+
+WARMUP_SIZE = 10
+
+DEFAULT_SEED = 0
+
+# A case is reported as a regression when its median time grows by more than 10%.
+DEFAULT_THRESHOLD = 0.1
+
+SEASON = "2024"
+
+RESULTS = ["Goal", "SavedShot", "MissedShots", "BlockedShot", "ShotOnPost"]
+
+SITUATIONS = ["OpenPlay", "FromCorner", "SetPiece", "DirectFreekick", "Penalty"]
+
+SITUATION_WEIGHTS = [0.75, 0.12, 0.08, 0.04, 0.01]
+
+SHOT_TYPES = ["RightFoot", "LeftFoot", "Head", "OtherBodyPart"]
+
+SHOT_TYPE_WEIGHTS = [0.5, 0.3, 0.18, 0.02]
+
+LAST_ACTIONS = ["Pass", "Cross", "Rebound", "TakeOn", "Chipped", "Aerial", "None"]
+
+TEAMS = [
+    "Arsenal", "Aston Villa", "Bournemouth", "Brentford", "Brighton", "Chelsea", "Crystal Palace",
+    "Everton", "Fulham", "Ipswich", "Leicester", "Liverpool", "Manchester City", "Manchester United",
+    "Newcastle United", "Nottingham Forest", "Southampton", "Tottenham", "West Ham", "Wolverhampton Wanderers",
+]
+
+PLAYERS_PER_TEAM = 25
+
+SHOTS_PER_MATCH = 25
+
+HOME_TEAM = "Liverpool"
+
+AWAY_TEAM = "Everton"
+
+LIBRARIES = ["numpy", "pandas", "matplotlib", "mplsoccer", "aiohttp", "understat"]
+
+
+def generate_shots(n, seed=DEFAULT_SEED, season=SEASON):
+    """Return `n` synthetic shots shaped like the ones returned by Understat.
+
+    The numbers are strings and the coordinates are between 0 and 1, like in the Understat
+    responses. The shots are spread over the 20 teams and their players, about 25 shots per
+    match, and the goals follow the xG of the shots.
+
+    Args:
+        n (int): The number of shots, up to 1 000 000.
+        seed (int, optional): The seed of the generator. Defaults to 0.
+        season (str, optional): The season of the shots. Defaults to "2024".
+
+    Returns:
+        list[dict]: The shots.
+    """
+
+    if not 0 <= n <= MAX_SIZE:
+        raise ValueError(f"Invalid number of shots: {n}, expected at most {MAX_SIZE}.")
+
+    rng = np.random.default_rng(seed)
+
+    situations = rng.choice(len(SITUATIONS), n, p=SITUATION_WEIGHTS)
+    penalty = situations == SITUATIONS.index("Penalty")
+
+    # Most shots are taken in the box, a few from distance.
+    X = np.where(penalty, 0.885, 1 - np.abs(rng.normal(0, 0.1, n)).clip(0.005, 0.45))
+    Y = np.where(penalty, 0.5, rng.normal(0.5, 0.12, n).clip(0.05, 0.95))
+    xG = np.where(penalty, 0.7611, rng.beta(0.9, 8, n).clip(0.001, 0.99))
+    results = np.where(rng.random(n) < xG, 0, rng.choice(np.arange(1, len(RESULTS)), n))
+
+    matches = np.arange(n) // SHOTS_PER_MATCH
+    home = rng.random(n) < 0.55
+    home_teams = matches % len(TEAMS)
+    away_teams = (home_teams + 1 + matches // len(TEAMS) % (len(TEAMS) - 1)) % len(TEAMS)
+    teams = np.where(home, home_teams, away_teams)
+    players = teams * PLAYERS_PER_TEAM + rng.integers(0, PLAYERS_PER_TEAM, n)
+
+    shot_types = rng.choice(len(SHOT_TYPES), n, p=SHOT_TYPE_WEIGHTS)
+    last_actions = rng.integers(0, len(LAST_ACTIONS), n)
+    minutes = rng.integers(1, 96, n)
+
+    shots = []
+    for i in range(n):
+        shots.append({
+            "id": str(seed * MAX_SIZE + i + 1),
+            "minute": str(minutes[i]),
+            "result": RESULTS[results[i]],
+            "X": repr(float(X[i])),
+            "Y": repr(float(Y[i])),
+            "xG": repr(float(xG[i])),
+            "player": f"Player {players[i]}",
+            "h_a": "h" if home[i] else "a",
+            "player_id": str(players[i] + 1),
+            "situation": SITUATIONS[situations[i]],
+            "season": season,
+            "shotType": SHOT_TYPES[shot_types[i]],
+            "match_id": str(20_000 + matches[i]),
+            "h_team": TEAMS[home_teams[i]],
+            "a_team": TEAMS[away_teams[i]],
+            "h_goals": "1",
+            "a_goals": "1",
+            "date": f"{season}-09-01 15:00:00",
+            "player_assisted": None if last_actions[i] == len(LAST_ACTIONS) - 1 else f"Player {players[i] // PLAYERS_PER_TEAM * PLAYERS_PER_TEAM}",
+            "lastAction": LAST_ACTIONS[last_actions[i]],
+        })
+
+    return shots
+
+
+def generate_match(n, seed=DEFAULT_SEED, home_team=HOME_TEAM, away_team=AWAY_TEAM):
+    """Return `n` synthetic shots split by side, like the Understat match shots."""
+
+    match = {"h": [], "a": []}
+    for shot in generate_shots(n, seed):
+        shot.update(h_team=home_team, a_team=away_team, match_id="30000")
+        match[shot["h_a"]].append(shot)
+
+    return match
+
+
+class StubServer:
+    """A local stand-in for the Understat API, serving synthetic shots.
+
+    The server runs in a background thread with its own event loop, so it also answers the
+    code that calls `asyncio.run` itself. While `patch()` is active, the `understat` package
+    sends its requests to the stub instead of understat.com.
+
+    Args:
+        latency (float, optional): The number of seconds each response is delayed, to mimic
+            the network. Defaults to 0.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.players = {}
+        self.matches = {}
+
+        self.requests = 0
+        self.bytes_sent = 0
+
+        self.url = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    def add_player(self, player_id, player_name, shots):
+        self.players[str(player_id)] = (player_name, shots)
+
+    def add_match(self, match_id, match):
+        self.matches[str(match_id)] = match
+
+    def _json(self, data):
+        from aiohttp import web
+
+        body = json.dumps(data)
+        self.requests += 1
+        self.bytes_sent += len(body)
+
+        return web.Response(text=body, content_type="application/json")
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _league(self, request):
+        await self._delay()
+
+        league = request.match_info["league"]
+        if league != "EPL":
+            return self._json({"teams": {}, "players": [], "dates": []})
+
+        return self._json({
+            "teams": {str(i + 1): {"id": str(i + 1), "title": team, "history": []} for i, team in enumerate(TEAMS)},
+            "players": [{"id": player_id, "player_name": player_name, "team_title": HOME_TEAM} for player_id, (player_name, _) in self.players.items()],
+            "dates": self._dates(),
+        })
+
+    def _dates(self, team=None):
+        dates = []
+        for match_id, match in self.matches.items():
+            shots = [*match["h"], *match["a"]]
+            home_team, away_team = (shots[0]["h_team"], shots[0]["a_team"]) if shots else (HOME_TEAM, AWAY_TEAM)
+            if team is not None and team not in (home_team, away_team):
+                continue
+
+            date = {
+                "id": match_id,
+                "isResult": True,
+                "h": {"id": str(TEAMS.index(home_team) + 1), "title": home_team},
+                "a": {"id": str(TEAMS.index(away_team) + 1), "title": away_team},
+                "goals": {"h": str(len([shot for shot in match["h"] if shot["result"] == "Goal"])), "a": str(len([shot for shot in match["a"] if shot["result"] == "Goal"]))},
+                "datetime": f"{SEASON}-09-01 15:00:00",
+            }
+            if team is not None:
+                date["side"] = "h" if team == home_team else "a"
+            dates.append(date)
+
+        return dates
+
+    async def _player(self, request):
+        await self._delay()
+
+        _, shots = self.players.get(request.match_info["player_id"], (None, []))
+        return self._json({"shots": shots, "matches": [], "groups": {}, "minMaxPlayerStats": {}})
+
+    async def _match(self, request):
+        await self._delay()
+
+        match = self.matches.get(request.match_info["match_id"], {"h": [], "a": []})
+        goals = {side: str(len([shot for shot in match[side] if shot["result"] == "Goal"])) for side in ("h", "a")}
+        return self._json({
+            "shots": match,
+            "rosters": {"h": {}, "a": {}},
+            "match_info": {"id": request.match_info["match_id"], "h_goals": goals["h"], "a_goals": goals["a"]},
+        })
+
+    async def _team(self, request):
+        await self._delay()
+
+        team = request.match_info["team"].replace("_", " ")
+        return self._json({"dates": self._dates(team), "players": [], "statistics": {}})
+
+    async def _start(self, ready):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/getLeagueData/{league}/{season}", self._league)
+        app.router.add_get("/getPlayerData/{player_id}", self._player)
+        app.router.add_get("/getMatchData/{match_id}", self._match)
+        app.router.add_get("/getTeamData/{team}/{season}", self._team)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        ready.set()
+
+    def start(self):
+        """Start the server and return its URL."""
+
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.create_task(self._start(ready))
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout=10):
+            raise RuntimeError("The stub server did not start.")
+
+        return self.url
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def patch(self):
+        """Send the requests of the `understat` package to the stub."""
+
+        import understat.understat as module
+        from understat.constants import BASE_URL
+
+        urls = {name: value for name, value in vars(module).items() if name.endswith("_URL") and isinstance(value, str)}
+        for name, value in urls.items():
+            setattr(module, name, value.replace(BASE_URL, self.url, 1))
+
+        try:
+            yield self
+        finally:
+            for name, value in urls.items():
+                setattr(module, name, value)
+
+
+@contextmanager
+def workspace():
+    """Run in an empty directory, so the caches, the index and the media of the package start empty.
+
+    The fonts are linked from the repository, since the figures load them from "./fonts".
+    """
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="football-benchmarks-") as path:
+        os.symlink(ROOT_PATH / "fonts", Path(path) / "fonts")
+        os.chdir(path)
+        try:
+            yield Path(path)
+        finally:
+            os.chdir(cwd)
+
+
+def clear_data():
+    """Remove the responses, the index and the rendered figures cached in the workspace."""
+
+    import shutil
+
+    shutil.rmtree("./data", ignore_errors=True)
+
+
+class Fixture:
+    """The synthetic data of one size, created once and shared by the cases."""
+
+    def __init__(self, size, seed=DEFAULT_SEED, stub=None):
+        self.size = size
+        self.seed = seed
+        self.shots = generate_shots(size, seed)
+        self.match = generate_match(size, seed)
+
+        self._table = None
+        self._figure = None
+        self._aggregate = None
+
+        self.player_name = f"Benchmark Player {size}"
+        self.player_id = 100_000 + size
+        self.match_id = 30_000 + size
+        self.home_team = HOME_TEAM
+        self.away_team = TEAMS[size % len(TEAMS)] if TEAMS[size % len(TEAMS)] != HOME_TEAM else AWAY_TEAM
+
+        if stub is not None and size <= MAX_SCRAPE_SIZE:
+            match = generate_match(size, seed, home_team=self.home_team, away_team=self.away_team)
+            stub.add_player(self.player_id, self.player_name, self.shots)
+            stub.add_match(self.match_id, match)
+
+    @property
+    def table(self):
+        if self._table is None:
+            from src.utils import prepare_shot_data
+
+            self._table = prepare_shot_data(self.shots)
+
+        return self._table
+
+    @property
+    def figure(self):
+        if self._figure is None:
+            from src.shotmap import create_shotmap_fig_form_data
+
+            self._figure = create_shotmap_fig_form_data(self.shots)
+
+        return self._figure
+
+    @property
+    def aggregate(self):
+        if self._aggregate is None:
+            from src.aggregates import ZoneCube
+
+            cube = ZoneCube()
+            cube.add(self.table)
+            self._aggregate = cube.query()
+
+        return self._aggregate
+
+    def close(self):
+        import matplotlib.pyplot as plt
+
+        if self._figure is not None:
+            plt.close(self._figure)
+
+
+def _prepare_shot_data(fixture):
+    from src.utils import prepare_shot_data
+
+    return prepare_shot_data(fixture.shots)
+
+
+def _calculate_shots_stats(fixture):
+    from src.utils import calculate_shots_stats
+
+    return calculate_shots_stats(fixture.table)
+
+
+def _calculate_zones_stats(fixture):
+    from src.zones import Zones
+    from src.shotzone import calculate_zones_stats
+
+    return calculate_zones_stats(fixture.table, Zones.from_layout("default"))
+
+
+def _create_shotmap_fig_form_data(fixture):
+    from src.shotmap import create_shotmap_fig_form_data
+
+    return create_shotmap_fig_form_data(fixture.shots)
+
+
+def _create_match_shotmap_fig_from_data(fixture):
+    from src.shotmap import create_match_shotmap_fig_from_data
+
+    return create_match_shotmap_fig_from_data(fixture.match)
+
+
+def _create_shotzone_fig_from_data(fixture):
+    from src.shotzone import create_shotzone_fig_from_data
+
+    return create_shotzone_fig_from_data(fixture.shots)
+
+
+def _create_shotzone_fig_from_aggregate(fixture):
+    from src.shotzone import create_shotzone_fig_from_aggregate
+
+    return create_shotzone_fig_from_aggregate(fixture.aggregate)
+
+
+def _savefig(fixture):
+    from src.style import Colors
+
+    buffer = io.BytesIO()
+    fixture.figure.savefig(buffer, format="png", facecolor=Colors.BACKGROUND, bbox_inches="tight")
+    return buffer.getbuffer().nbytes
+
+
+def _render_to_buffer(fixture):
+    from src.output import render_to_buffer
+
+    return len(render_to_buffer(fixture.figure, "png"))
+
+
+def _get_player_shots_data(fixture):
+    from src.client import UnderstatClient
+    from src.index import EntityIndex
+    from src.scrape import get_player_shots_data
+
+    async def main():
+        async with UnderstatClient(index=EntityIndex(), cache=False) as client:
+            return await get_player_shots_data(fixture.player_name, SEASON, client=client)
+
+    return asyncio.run(main())
+
+
+def _get_match_bundle(fixture):
+    from src.client import UnderstatClient
+    from src.index import EntityIndex
+    from src.scrape import get_match_bundle
+
+    async def main():
+        async with UnderstatClient(index=EntityIndex(), cache=False) as client:
+            return await get_match_bundle(fixture.home_team, fixture.away_team, SEASON, client=client)
+
+    return asyncio.run(main())
+
+
+def _create_player_shotmap_fig(fixture):
+    from src.shotmap import create_player_shotmap_fig
+
+    return create_player_shotmap_fig(fixture.player_name, SEASON)
+
+
+def _create_match_shotmap_fig(fixture):
+    from src.shotmap import create_match_shotmap_fig
+
+    return create_match_shotmap_fig(fixture.home_team, fixture.away_team, SEASON)
+
+
+def _create_player_shotzone_fig(fixture):
+    from src.shotzone import create_player_shotzone_fig
+
+    return create_player_shotzone_fig(fixture.player_name, SEASON)
+
+
+@dataclass
+class Case:
+    """A benchmarked function.
+
+    Args:
+        name (str): The name of the case in the results.
+        run (callable): Called with the `Fixture` of a size, the call is timed.
+        setup (callable, optional): Called with the fixture before the timed calls, to create
+            the inputs shared with other cases.
+        scrape (bool, optional): True if the case sends requests to the stub server. The caches
+            are cleared before each run and the sizes above `MAX_SCRAPE_SIZE` are skipped.
+    """
+
+    name: str
+    run: callable
+    setup: callable = None
+    scrape: bool = False
+
+
+CASES = [
+    Case("prepare_shot_data", _prepare_shot_data),
+    Case("calculate_shots_stats", _calculate_shots_stats, setup=lambda fixture: fixture.table),
+    Case("calculate_zones_stats", _calculate_zones_stats, setup=lambda fixture: fixture.table),
+    Case("create_shotmap_fig_form_data", _create_shotmap_fig_form_data),
+    Case("create_match_shotmap_fig_from_data", _create_match_shotmap_fig_from_data),
+    Case("create_shotzone_fig_from_data", _create_shotzone_fig_from_data),
+    Case("create_shotzone_fig_from_aggregate", _create_shotzone_fig_from_aggregate, setup=lambda fixture: fixture.aggregate),
+    Case("savefig", _savefig, setup=lambda fixture: fixture.figure),
+    Case("render_to_buffer", _render_to_buffer, setup=lambda fixture: fixture.figure),
+    Case("get_player_shots_data", _get_player_shots_data, scrape=True),
+    Case("get_match_bundle", _get_match_bundle, scrape=True),
+    Case("create_player_shotmap_fig", _create_player_shotmap_fig, scrape=True),
+    Case("create_match_shotmap_fig", _create_match_shotmap_fig, scrape=True),
+    Case("create_player_shotzone_fig", _create_player_shotzone_fig, scrape=True),
+]
+
+
+def measure(case, fixture, repeat=DEFAULT_REPEAT):
+    """Run a case `repeat` times on a fixture.
+
+    Returns:
+        dict: The case, the size, the time of each run and their median, minimum and maximum
+            in milliseconds, or the error raised by the case.
+    """
+
+    import matplotlib.pyplot as plt
+
+    result = {"case": case.name, "size": fixture.size}
+
+    if case.setup is not None:
+        case.setup(fixture)
+
+    runs = []
+    for _ in range(repeat):
+        if case.scrape:
+            clear_data()
+
+        start = time.perf_counter()
+        try:
+            value = case.run(fixture)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+        runs.append(time.perf_counter() - start)
+
+        if hasattr(value, "savefig"):
+            plt.close(value)
+
+    runs_ms = [round(run * 1000, 3) for run in runs]
+    result.update(
+        runs_ms=runs_ms,
+        median_ms=round(statistics.median(runs) * 1000, 3),
+        min_ms=min(runs_ms),
+        max_ms=max(runs_ms),
+    )
+
+    return result
+
+
+def environment(sizes, repeat, seed):
+    """Return what is needed to tell two result files apart: the commit, the machine and the libraries."""
+
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT_PATH, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    versions = {}
+    for package in LIBRARIES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "versions": versions,
+        "sizes": sizes,
+        "repeat": repeat,
+        "seed": seed,
+    }
+
+
+def run(cases=CASES, sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, latency=0.0, on_result=None):
+    """Run the cases on every size.
+
+    Returns:
+        dict: The "environment" of the run and the list of "results", see `measure`.
+    """
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    if str(ROOT_PATH) not in sys.path:
+        sys.path.insert(0, str(ROOT_PATH))
+
+    env = environment(list(sizes), repeat, seed)
+    results = []
+
+    with workspace(), StubServer(latency=latency) as stub, stub.patch():
+        # Run every case once on a few shots first, so the imports and the fonts are loaded
+        # before anything is timed.
+        warmup = Fixture(WARMUP_SIZE, seed, stub=stub)
+        for case in cases:
+            measure(case, warmup, repeat=1)
+        warmup.close()
+
+        for size in sizes:
+            fixture = Fixture(size, seed, stub=stub)
+
+            for case in cases:
+                if case.scrape and size > MAX_SCRAPE_SIZE:
+                    continue
+
+                result = measure(case, fixture, repeat)
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+
+            fixture.close()
+
+    return {"environment": env, "results": results}
+
+
+def compare(base, head, threshold=DEFAULT_THRESHOLD):
+    """Compare the median times of two runs.
+
+    Returns:
+        list[dict]: The case, the size, both medians and their ratio for each case measured in
+            both runs, with "regression" set when the ratio is above 1 + `threshold`.
+    """
+
+    base_results = {(result["case"], result["size"]): result for result in base["results"] if "median_ms" in result}
+
+    rows = []
+    for result in head["results"]:
+        key = (result["case"], result["size"])
+        if key not in base_results or "median_ms" not in result:
+            continue
+
+        base_ms = base_results[key]["median_ms"]
+        head_ms = result["median_ms"]
+        ratio = head_ms / base_ms if base_ms else float("inf")
+        rows.append({
+            "case": result["case"],
+            "size": result["size"],
+            "base_ms": base_ms,
+            "head_ms": head_ms,
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold,
+        })
+
+    return rows
+
+
+def print_result(result):
+    if "error" in result:
+        print(f"{result['case']:<38}{result['size']:>10}  {result['error']}")
+    else:
+        print(f"{result['case']:<38}{result['size']:>10}{result['median_ms']:>14.2f}{result['min_ms']:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the package on synthetic shots.")
+    parser.add_argument("--cases", nargs="+", choices=[case.name for case in CASES], help="The cases to run. Defaults to all of them.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help=f"The numbers of shots, up to {MAX_SIZE}.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--latency", type=float, default=0.0, help="The delay of each stub response, in seconds.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--output", help="Save the results as JSON to this file.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two result files instead of running the cases.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="The slowdown reported as a regression. Defaults to 0.1.")
+    args = parser.parse_args()
+
+    if args.compare:
+        base, head = (json.loads(Path(path).read_text()) for path in args.compare)
+        rows = compare(base, head, args.threshold)
+
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print(f"{'case':<38}{'size':>10}{'base (ms)':>14}{'head (ms)':>14}{'ratio':>9}")
+            for row in rows:
+                flag = "  slower" if row["regression"] else ""
+                print(f"{row['case']:<38}{row['size']:>10}{row['base_ms']:>14.2f}{row['head_ms']:>14.2f}{row['ratio']:>9.2f}{flag}")
+
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+        sys.exit(0)
+
+    for size in args.sizes:
+        if not 0 < size <= MAX_SIZE:
+            parser.error(f"Invalid size: {size}, expected between 1 and {MAX_SIZE}.")
+
+    cases = [case for case in CASES if args.cases is None or case.name in args.cases]
+
+    if not args.json:
+        print(f"{'case':<38}{'size':>10}{'median (ms)':>14}{'min (ms)':>14}")
+
+    report = run(cases, args.sizes, args.repeat, args.seed, args.latency, on_result=None if args.json else print_result)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
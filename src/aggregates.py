@@ -0,0 +1,254 @@
+"""This module precomputes the shots, xG and goals of every zone of a league season for instant shotzone queries."""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .leagues import LEAGUES
+from .shots import ShotTable
+from .storage import dataset_path, load_shots
+from .zones import Zones, LAYOUTS
+
+
+# The metrics stored for each cell of the cube.
+METRICS = ("shots", "xG", "goals")
+
+CUBE_KIND = "zone_cube"
+
+
+def _strings(values):
+    return np.array([str(value) for value in values], dtype=str)
+
+
+class ZoneCube:
+    """The shots, xG and goals of a league season by (player, team, zone, situation, shot type).
+
+    The values are kept in a dense array with one row per (player, team) pair. A query only
+    sums the few rows and labels it selects, so its cost depends on the number of zones and not
+    on the number of shots. Shots that are in no zone are kept in an extra zone, so the
+    percentages match the ones computed from the raw shots.
+
+    Args:
+        layout (str, optional): The zone layout, see `LAYOUTS`. Defaults to "default".
+    """
+
+    def __init__(self, layout="default"):
+        self.layout = layout
+        self.zones = Zones.from_layout(layout)
+
+        self.pairs = []
+        self.situations = []
+        self.shot_types = []
+
+        self.values = np.zeros((0, len(self.zones) + 1, 0, 0, len(METRICS)))
+        self.shot_ids = np.empty(0, dtype=np.int64)
+
+        self._index()
+
+    def _index(self):
+        self.pair_index = {pair: row for row, pair in enumerate(self.pairs)}
+        self.situation_index = {label: i for i, label in enumerate(self.situations)}
+        self.shot_type_index = {label: i for i, label in enumerate(self.shot_types)}
+
+        self.player_rows = {}
+        self.team_rows = {}
+        for row, (player, team) in enumerate(self.pairs):
+            self.player_rows.setdefault(player, []).append(row)
+            self.team_rows.setdefault(team, []).append(row)
+
+    def _codes(self, labels, index, values):
+        """Return the index of each value, adding the new labels at the end."""
+
+        codes, uniques = pd.factorize(values)
+        for label in uniques:
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+
+        return np.array([index[label] for label in uniques], dtype=np.intp)[codes]
+
+    def add(self, data):
+        """Add shots to the cube, ignoring the ones already added.
+
+        Args:
+            data (list[dict] | pd.DataFrame | ShotTable): The shots, as returned by Understat.
+
+        Returns:
+            int: The number of shots added.
+        """
+
+        shots = ShotTable.from_understat(data)
+        if len(shots) == 0:
+            return 0
+
+        ids = shots["id"]
+        new = ~np.isin(ids, self.shot_ids) & ~pd.Series(ids).duplicated().to_numpy()
+        shots = shots.filter(new)
+        if len(shots) == 0:
+            return 0
+
+        home = np.asarray(shots["h_a"]) == "h"
+        teams = np.where(home, np.asarray(shots["h_team"], dtype=object), np.asarray(shots["a_team"], dtype=object))
+        pairs = pd.MultiIndex.from_arrays([np.asarray(shots["player"], dtype=object), teams])
+
+        pair_codes = self._codes(self.pairs, self.pair_index, pairs)
+        situation_codes = self._codes(self.situations, self.situation_index, np.asarray(shots["situation"], dtype=object))
+        shot_type_codes = self._codes(self.shot_types, self.shot_type_index, np.asarray(shots["shotType"], dtype=object))
+
+        zone_codes = self.zones.assign(shots["X"], shots["Y"], vertical=True)
+        zone_codes[zone_codes < 0] = len(self.zones)
+
+        # Grow the cube for the new players, teams and labels.
+        grow = [
+            (0, len(self.pairs) - self.values.shape[0]),
+            (0, 0),
+            (0, len(self.situations) - self.values.shape[2]),
+            (0, len(self.shot_types) - self.values.shape[3]),
+            (0, 0),
+        ]
+        if any(after for _, after in grow):
+            self.values = np.pad(self.values, grow)
+
+        metrics = np.column_stack([np.ones(len(shots)), shots["xG"].astype(np.float64), shots.goals])
+        np.add.at(self.values, (pair_codes, zone_codes, situation_codes, shot_type_codes), metrics)
+
+        self.shot_ids = np.union1d(self.shot_ids, shots["id"])
+        self._index()
+
+        return len(shots)
+
+    def _selection(self, labels, index):
+        if labels is None:
+            return slice(None)
+
+        labels = [labels] if isinstance(labels, str) else labels
+        return [index[label] for label in labels if label in index]
+
+    def query(self, player=None, team=None, situation=None, shot_type=None):
+        """Sum the cube over the selected players, teams, situations and shot types.
+
+        Every filter takes a label, a list of labels or None for all of them.
+
+        Returns:
+            dict: The per-zone "shots", "xG" and "goals" arrays, without the shots outside of
+                the zones, and the "total_shots", "total_goals", "total_xG" and "xG_per_shot"
+                of all the selected shots.
+        """
+
+        rows = set(range(len(self.pairs)))
+        for labels, index in ((player, self.player_rows), (team, self.team_rows)):
+            if labels is not None:
+                labels = [labels] if isinstance(labels, str) else labels
+                rows &= {row for label in labels for row in index.get(label, [])}
+
+        values = self.values[sorted(rows)]
+        values = values[:, :, self._selection(situation, self.situation_index)]
+        values = values[:, :, :, self._selection(shot_type, self.shot_type_index)]
+
+        by_zone = values.sum(axis=(0, 2, 3))
+        total_shots, total_xG, total_goals = by_zone.sum(axis=0)
+
+        return {
+            "shots": by_zone[:-1, 0],
+            "xG": by_zone[:-1, 1],
+            "goals": by_zone[:-1, 2],
+            "total_shots": int(total_shots),
+            "total_goals": int(total_goals),
+            "total_xG": total_xG,
+            "xG_per_shot": total_xG / total_shots if total_shots else 0.0,
+        }
+
+    def save(self, league, season):
+        path = dataset_path(CUBE_KIND, league, season, self.layout, fmt="npz")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        np.savez_compressed(
+            path,
+            values=self.values,
+            shot_ids=self.shot_ids,
+            players=_strings(player for player, _ in self.pairs),
+            teams=_strings(team for _, team in self.pairs),
+            situations=_strings(self.situations),
+            shot_types=_strings(self.shot_types),
+        )
+
+        return str(path)
+
+    @classmethod
+    def load(cls, league, season, layout="default"):
+        """Load the cube of a league season.
+
+        Raises:
+            FileNotFoundError: If the cube was never built.
+        """
+
+        cube = cls(layout)
+
+        with np.load(dataset_path(CUBE_KIND, league, season, layout, fmt="npz"), allow_pickle=False) as npz:
+            cube.values = npz["values"]
+            cube.shot_ids = npz["shot_ids"]
+            cube.pairs = list(zip(npz["players"].tolist(), npz["teams"].tolist()))
+            cube.situations = npz["situations"].tolist()
+            cube.shot_types = npz["shot_types"].tolist()
+
+        cube._index()
+        return cube
+
+
+def build_zone_cube(league=LEAGUES.EPL, year="2024", layout="default", fmt="parquet"):
+    """Build the zone cube of a league season from its stored shots, see `src.sync`.
+
+    Returns:
+        ZoneCube: The cube, also saved next to the shots dataset.
+    """
+
+    season = str(year)
+
+    cube = ZoneCube(layout)
+    cube.add(load_shots(league, season, fmt=fmt))
+    cube.save(league, season)
+
+    return cube
+
+
+def update_zone_cube(shots, league=LEAGUES.EPL, year="2024", layout=None):
+    """Add new shots to the zone cubes of a league season that were built.
+
+    Args:
+        shots (list | pd.DataFrame): The new shots.
+        league (str, optional): The league. Defaults to "EPL".
+        year (str, optional): The season. Defaults to "2024".
+        layout (str, optional): The zone layout of the cube to update. Defaults to every
+            layout whose cube was built, so none of them falls behind the shots dataset.
+
+    Returns:
+        dict[str, int]: The number of shots added to the cube of each updated layout.
+    """
+
+    season = str(year)
+
+    added = {}
+    for name in [layout] if layout is not None else LAYOUTS:
+        try:
+            cube = ZoneCube.load(league, season, name)
+        except FileNotFoundError:
+            continue
+
+        added[name] = cube.add(shots)
+        if added[name]:
+            cube.save(league, season)
+
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the zone cube of a synced league season.")
+    parser.add_argument("league", nargs="?", default=LEAGUES.EPL)
+    parser.add_argument("year", nargs="?", default="2024")
+    parser.add_argument("--layout", default="default")
+    parser.add_argument("--format", dest="fmt", choices=["parquet", "npz"], default="parquet")
+    args = parser.parse_args()
+
+    cube = build_zone_cube(args.league, args.year, args.layout, args.fmt)
+    print(f"Built the zone cube of {len(cube.shot_ids)} shots, {len(cube.pairs)} players.")
@@ -0,0 +1,331 @@
+"""This module renders many shotmaps and shotzones in parallel with a pool of worker processes."""
+
+import os
+import argparse
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+# The columns of the shared shots array, all stored as float64.
+SHOT_COLUMNS = ("X", "Y", "xG", "goal", "away")
+
+KINDS = ("shotmap", "match", "shotzone")
+
+
+@dataclass
+class RenderJob:
+    """A figure to render in a batch.
+
+    Args:
+        kind (str): "shotmap", "match" or "shotzone".
+        data (list | dict | pd.DataFrame): The shots, as returned by Understat. A match job
+            takes a dict with the "h" and "a" shots.
+        file_name (str): The path where the figure is saved.
+        title (str, optional): The title of the figure.
+        subtitle (str, optional): The subtitle of the figure.
+        layout (str, optional): The zone layout of a shotzone. Defaults to "default".
+    """
+
+    kind: str
+    data: object
+    file_name: str
+    title: str = "Shotmap"
+    subtitle: str = "All shots"
+    layout: str = "default"
+
+
+def shots_to_array(data, away=0):
+    """Convert the shots returned by Understat to rows of `SHOT_COLUMNS`, with X and Y between 0 and 1."""
+
+    from .shots import ShotTable
+
+    shots = ShotTable.from_understat(data)
+
+    return np.column_stack([
+        shots["X"].astype(np.float64) / 100,
+        shots["Y"].astype(np.float64) / 100,
+        shots["xG"].astype(np.float64),
+        shots.goals.astype(np.float64),
+        np.full(len(shots), away, dtype=np.float64),
+    ])
+
+
+def match_teams(data):
+    """Return the home and away team names of the shots of a match."""
+
+    from .shots import ShotTable
+
+    shots = ShotTable.from_understat(data["h"])
+    if len(shots) == 0:
+        shots = ShotTable.from_understat(data["a"])
+
+    return str(shots["h_team"][0]), str(shots["a_team"][0])
+
+
+def pack_jobs(jobs):
+    """Pack the shots of all the jobs into one array.
+
+    Returns:
+        tuple[np.ndarray, list[tuple[int, int]]]: The shots array and the (start, stop) rows
+            of each job.
+    """
+
+    blocks = []
+    bounds = []
+    start = 0
+    for job in jobs:
+        if job.kind not in KINDS:
+            raise ValueError(f"Invalid job kind: '{job.kind}'. Expected one of: {', '.join(KINDS)}.")
+
+        if job.kind == "match":
+            block = np.concatenate([shots_to_array(job.data["h"]), shots_to_array(job.data["a"], away=1)])
+        else:
+            block = shots_to_array(job.data)
+
+        blocks.append(block)
+        bounds.append((start, start + len(block)))
+        start += len(block)
+
+    shots = np.concatenate(blocks) if blocks else np.empty((0, len(SHOT_COLUMNS)))
+    return shots, bounds
+
+
+# The state of a worker process: the shared shots array and the templates built so far.
+_shared_memory = None
+_shots = None
+_templates = {}
+
+
+def _init_worker(name, shape):
+    global _shared_memory, _shots
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    _shots = np.ndarray(shape, dtype=np.float64, buffer=_shared_memory.buf)
+
+
+def _get_template(kind, layout):
+    """Return the template of a kind of figure, building it on the first use in this worker."""
+
+    key = (kind, layout if kind == "shotzone" else None)
+    if key not in _templates:
+        if kind == "shotmap":
+            from .shotmap import ShotmapTemplate
+            _templates[key] = ShotmapTemplate()
+        elif kind == "match":
+            from .shotmap import MatchShotmapTemplate
+            _templates[key] = MatchShotmapTemplate()
+        else:
+            from .shotzone import ShotzoneTemplate
+            _templates[key] = ShotzoneTemplate(layout)
+
+    return _templates[key]
+
+
+def _template_config(kind):
+    """Return the configuration of the template `_get_template` builds for a kind, see `render_cache.render_key`."""
+
+    if kind == "shotmap":
+        from .shotmap import shotmap_config
+        return shotmap_config()
+
+    return None
+
+
+def _init_render_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_data(kind, data, title, subtitle, layout="default", fmt="png", file_name=None, cache=None, **options):
+    """Render a figure from the shots returned by Understat, reusing the templates of this process.
+
+    Meant to run in a pool of worker processes started with `_init_render_worker`, see
+    `server.RenderService` and `planner.run_plan`.
+
+    Args:
+        kind (str): "shotmap", "match" or "shotzone".
+        data (list | dict): The shots. A match takes a dict with the "h" and "a" shots.
+        title (str): The title of the figure.
+        subtitle (str): The subtitle of the figure.
+        layout (str, optional): The zone layout of a shotzone. Defaults to "default".
+        fmt (str, optional): "png", "jpeg", "webp" or "svg". Defaults to "png".
+        file_name (str, optional): Save the figure to this path instead of returning it.
+        cache (RenderCache | bool, optional): The render cache, see `render_cache.render_figure`.
+        **options: The options of the encoder, see `output.encode`.
+
+    Returns:
+        bytes | str | None: The encoded figure, or its path when `file_name` is given.
+    """
+
+    from .render_cache import figure_key, render_figure, save_figure
+
+    key = figure_key(kind, data, title, subtitle, layout=layout, template=_template_config(kind))
+    build = lambda: _get_template(kind, layout).render(data, title=title, subtitle=subtitle)
+
+    # The templates are reused by the next figures of this process, so they are never closed.
+    if file_name is not None:
+        return save_figure(file_name, key, build, cache=cache, fmt=fmt, close=False, **options)
+
+    return render_figure(key, build, cache=cache, fmt=fmt, close=False, **options)
+
+
+def _rows_to_table(rows, teams=("", "")):
+    from .shots import ShotTable
+
+    return ShotTable({
+        "X": (rows[:, 0] * 100).astype(np.float32),
+        "Y": (rows[:, 1] * 100).astype(np.float32),
+        "xG": rows[:, 2].astype(np.float32),
+        "result": pd.Categorical.from_codes((rows[:, 3] > 0).astype(np.int8), ["MissedShots", "Goal"]),
+        "h_team": pd.Categorical.from_codes(np.zeros(len(rows), dtype=np.int8), [teams[0]]),
+        "a_team": pd.Categorical.from_codes(np.zeros(len(rows), dtype=np.int8), [teams[1]]),
+    })
+
+
+def _render_job(task):
+    from .output import render_to_buffer
+
+    kind, start, stop, title, subtitle, layout, teams, file_name = task
+    if stop == start:
+        return None
+
+    rows = _shots[start:stop]
+
+    if kind == "match":
+        away = rows[:, 4] > 0
+        data = {"h": _rows_to_table(rows[~away], teams), "a": _rows_to_table(rows[away], teams)}
+    else:
+        data = _rows_to_table(rows)
+
+    # The encoded figure is sent back, so the parent writes it and caches it without reading it again.
+    fig = _get_template(kind, layout).render(data, title=title, subtitle=subtitle)
+    return render_to_buffer(fig, "png")
+
+
+def render_batch(jobs, workers=None, chunksize=1, cache=None):
+    """Render a batch of figures across a pool of worker processes.
+
+    The shots of all the jobs are packed into a single float array in shared memory, so the
+    workers read them in place instead of receiving pickled DataFrames. Each worker keeps one
+    template per kind of figure and reuses it, together with the loaded fonts, for every job
+    it renders. The figures found in the render cache are copied instead of rendered.
+
+    Args:
+        jobs (list[RenderJob]): The figures to render.
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        chunksize (int, optional): The number of jobs sent to a worker at once. Defaults to 1.
+        cache (RenderCache | bool, optional): The render cache. Defaults to the cache stored
+            in "./data/render_cache"; pass False to render every figure.
+
+    Returns:
+        list[str | None]: The path of each saved figure, or None for the jobs without shots.
+    """
+
+    from .files import write_atomic
+    from .render_cache import RenderCache, render_key
+
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    if cache is None:
+        cache = RenderCache()
+
+    shots, bounds = pack_jobs(jobs)
+
+    tasks = [
+        (job.kind, start, stop, job.title, job.subtitle, job.layout, match_teams(job.data) if job.kind == "match" and stop > start else ("", ""), job.file_name)
+        for job, (start, stop) in zip(jobs, bounds)
+    ]
+
+    results = [None] * len(jobs)
+    keys = {}
+    pending = []
+    for index, task in enumerate(tasks):
+        kind, start, stop, title, subtitle, layout, teams, file_name = task
+        if stop == start:
+            continue
+
+        if cache:
+            keys[index] = render_key(kind, shots[start:stop], title, subtitle, layout=layout, teams=teams, template=_template_config(kind))
+            if cache.restore(keys[index], file_name):
+                results[index] = file_name
+                continue
+
+        pending.append(index)
+
+    if not pending:
+        return results
+
+    # A shared memory block can not be empty.
+    shm = shared_memory.SharedMemory(create=True, size=max(shots.nbytes, 1))
+    try:
+        np.ndarray(shots.shape, dtype=np.float64, buffer=shm.buf)[:] = shots
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(shm.name, shots.shape)) as executor:
+            rendered = list(executor.map(_render_job, [tasks[index] for index in pending], chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    for index, content in zip(pending, rendered):
+        if content is None:
+            continue
+
+        file_name = tasks[index][-1]
+        write_atomic(file_name, content)
+        results[index] = file_name
+
+        if cache:
+            cache.set(keys[index], content)
+
+    return results
+
+
+def league_jobs(league, year, kinds=("shotmap", "shotzone"), layout="default", fmt="parquet"):
+    """Create the jobs rendering every player of a synced league season, see `src.sync`."""
+
+    from .sync import SHOTS_ENTITY
+    from .storage import load_shots
+    from .utils import get_season_label, get_league_label
+
+    # Only the synced partition: the same shots can also be stored by a harvest or an ingest.
+    df = load_shots(league, str(year), SHOTS_ENTITY, columns=["X", "Y", "xG", "result", "player", "player_id"], fmt=fmt)
+
+    # Two players can share a name, so group by ID and only add it to the file name when needed.
+    names = df.groupby("player_id", observed=True)["player"].first()
+    shared_names = set(names[names.duplicated(keep=False)])
+
+    jobs = []
+    for player_id, shots in df.groupby("player_id", observed=True):
+        player_name = names[player_id]
+        normalized_name = player_name.lower().replace(" ", "_")
+        if player_name in shared_names:
+            normalized_name = f"{normalized_name}_{player_id}"
+        subtitle = f"All shots in {get_league_label(league)} in {get_season_label(year)}"
+
+        for kind in kinds:
+            jobs.append(RenderJob(kind, shots, f"./media/{normalized_name}_{year}_{kind}.png", title=player_name, subtitle=subtitle, layout=layout))
+
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the shotmaps and shotzones of every player in a synced league season.")
+    parser.add_argument("league")
+    parser.add_argument("year")
+    parser.add_argument("--kinds", nargs="+", choices=["shotmap", "shotzone"], default=["shotmap", "shotzone"])
+    parser.add_argument("--layout", default="default")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", dest="fmt", choices=["parquet", "npz"], default="parquet")
+    args = parser.parse_args()
+
+    file_names = render_batch(league_jobs(args.league, args.year, args.kinds, args.layout, args.fmt), workers=args.workers)
+    print(f"Rendered {sum(file_name is not None for file_name in file_names)} figures.")
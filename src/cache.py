@@ -0,0 +1,132 @@
+"""This module caches the Understat responses on disk and replays them offline."""
+
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from datetime import date
+
+from .files import write_atomic
+from .leagues import is_past_season, current_season
+
+
+DEFAULT_CACHE_PATH = Path("./data/cache")
+
+# Responses that can still change are refreshed after 6 hours.
+DEFAULT_TTL = 6 * 60 * 60
+
+MATCH_METHODS = {"get_match_shots", "get_match_stats", "get_match_players"}
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a response is not in the cache."""
+
+
+def request_key(method, args, kwargs):
+    """Return a stable key for an Understat method called with the given arguments."""
+
+    payload = json.dumps([method, [str(arg) for arg in args], {key: str(value) for key, value in sorted(kwargs.items())}])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def match_season(method, data):
+    """Return the season of a match response, or None if it can not be told from the data."""
+
+    if method == "get_match_shots" and isinstance(data, dict):
+        shots = [*data.get("h", []), *data.get("a", [])]
+        if shots and "season" in shots[0]:
+            return str(shots[0]["season"])
+
+    if method == "get_match_stats" and isinstance(data, dict) and data.get("date"):
+        return current_season(date.fromisoformat(str(data["date"])[:10]))
+
+    return None
+
+
+def is_immutable(method, kwargs, data, is_result=False):
+    """Return True if the response will never change and can be cached forever.
+
+    Completed seasons never change. The data of a match is only final once the match is a
+    completed result or its season is over: a match fetched while it is played, or whose xG
+    Understat may still revise, is kept for `DEFAULT_TTL` like any other response.
+
+    Args:
+        method (str): The name of the `Understat` method.
+        kwargs (dict): Its keyword arguments.
+        data: The response.
+        is_result (bool, optional): The response is the data of a completed match, see
+            `EntityIndex.is_result`. Defaults to False.
+    """
+
+    if method in MATCH_METHODS:
+        if not data:
+            return False
+
+        season = match_season(method, data)
+        return is_result or (season is not None and is_past_season(season))
+
+    season = kwargs.get("season")
+    return season is not None and is_past_season(season)
+
+
+class ResponseCache:
+    """An on-disk cache of Understat responses, keyed by method and arguments.
+
+    Args:
+        path (str | Path, optional): The directory where the responses are stored.
+            Defaults to "./data/cache".
+        ttl (int, optional): The number of seconds a response that can still change is kept.
+            Defaults to 6 hours.
+        offline (bool, optional): Only serve responses from the cache, ignoring the TTL, and
+            raise `CacheMissError` on a miss. Defaults to the `UNDERSTAT_OFFLINE` environment
+            variable.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, offline=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.offline = offline if offline is not None else os.environ.get("UNDERSTAT_OFFLINE", "") not in ("", "0")
+
+    def _file_path(self, method, args, kwargs):
+        return self.path / method / f"{request_key(method, args, kwargs)}.json"
+
+    def get(self, method, args, kwargs):
+        """Return the cached entry of a request, or None if it is missing or expired.
+
+        Raises:
+            CacheMissError: If the cache is offline and the request is not cached.
+        """
+
+        file_path = self._file_path(method, args, kwargs)
+
+        try:
+            with open(file_path) as fp:
+                entry = json.load(fp)
+        except FileNotFoundError:
+            entry = None
+
+        if entry is None:
+            if self.offline:
+                raise CacheMissError(f"'{method}' called with {args} {kwargs} is not cached.")
+
+            return None
+
+        if self.offline or entry["immutable"] or time.time() - entry["stored_at"] < self.ttl:
+            return entry
+
+        return None
+
+    def set(self, method, args, kwargs, data, is_result=False):
+        file_path = self._file_path(method, args, kwargs)
+
+        entry = {
+            "method": method,
+            "args": [str(arg) for arg in args],
+            "kwargs": {key: str(value) for key, value in kwargs.items()},
+            "stored_at": time.time(),
+            "immutable": is_immutable(method, kwargs, data, is_result=is_result),
+            "data": data,
+        }
+
+        write_atomic(file_path, json.dumps(entry))
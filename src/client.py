@@ -0,0 +1,174 @@
+"""This module provides a long-lived Understat client that shares one pooled HTTP session."""
+
+from contextlib import asynccontextmanager
+
+from .cache import MATCH_METHODS, ResponseCache, request_key
+from .instrument import count, on_response_chunk_received
+from .index import EntityIndex
+from .scheduler import RequestScheduler
+
+
+DEFAULT_CONNECTION_LIMIT = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+
+
+class UnderstatClient:
+    """An Understat client that owns a single pooled `aiohttp.ClientSession`.
+
+    All the requests made through the client reuse the same connection pool, so the TCP/TLS
+    handshake is paid once per connection instead of once per request. Any `get_*` method
+    of `understat.Understat` can be called directly on the client.
+
+    The client can be used as an async context manager:
+
+        async with UnderstatClient() as client:
+            players = await client.get_league_players("EPL", season="2024")
+
+    Args:
+        limit (int, optional): The maximum number of simultaneous connections. Defaults to 10.
+        keepalive_timeout (int, optional): The number of seconds an idle connection is kept open.
+            Defaults to 30.
+        index (EntityIndex, optional): The index used to resolve names to IDs. Defaults to the
+            index stored in "./data/understat_index.json", loaded on first use.
+        cache (ResponseCache | bool, optional): The cache of the Understat responses. Defaults
+            to the cache stored in "./data/cache"; pass False to disable caching.
+        scheduler (RequestScheduler | bool, optional): Rate limits, retries and deduplicates the
+            requests sent to Understat. Defaults to a scheduler with the default limits; pass
+            False to send the requests directly.
+    """
+
+    def __init__(self, limit=DEFAULT_CONNECTION_LIMIT, keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT, index=None, cache=None, scheduler=None):
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+
+        self._index = index
+
+        if cache is None:
+            cache = ResponseCache()
+        self.cache = cache or None
+
+        if scheduler is None:
+            scheduler = RequestScheduler()
+        self.scheduler = scheduler or None
+
+        self.session = None
+        self.understat = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = EntityIndex.load()
+
+        return self._index
+
+    async def open(self):
+        if self.session is not None:
+            return self
+
+        # The HTTP stack is imported on first use, so jobs served from the cache never load it.
+        import aiohttp
+        from understat import Understat
+
+        connector = aiohttp.TCPConnector(limit=self.limit, keepalive_timeout=self.keepalive_timeout)
+
+        # The downloaded bytes are counted in the running stage, see `src.instrument`.
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+
+        self.session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        self.understat = Understat(self.session)
+
+        return self
+
+    async def close(self):
+        if self.session is None:
+            return
+
+        await self.session.close()
+        self.session = None
+        self.understat = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, method, *args, **kwargs):
+        """Call an `understat.Understat` method using the pooled session.
+
+        The response is served from the cache when possible. Otherwise the request goes through
+        the scheduler, which joins it to an identical request in flight, and the response is
+        stored in the cache.
+
+        Args:
+            method (str): The name of the `Understat` method, e.g. "get_league_players".
+            *args: Positional arguments passed to the method.
+            **kwargs: Keyword arguments passed to the method.
+
+        Returns:
+            The data returned by Understat.
+
+        Raises:
+            CacheMissError: If the cache is offline and the response is not cached.
+        """
+
+        if self.cache is not None:
+            entry = self.cache.get(method, args, kwargs)
+            if entry is not None:
+                count("cache_hits")
+                return entry["data"]
+
+        return await self._fetch(method, args, kwargs)
+
+    async def refresh(self, method, *args, **kwargs):
+        """Call an `understat.Understat` method skipping the cached response, and cache the new one.
+
+        In offline mode the cached response is returned instead.
+        """
+
+        if self.cache is not None and self.cache.offline:
+            return self.cache.get(method, args, kwargs)["data"]
+
+        return await self._fetch(method, args, kwargs)
+
+    async def _fetch(self, method, args, kwargs):
+        if self.scheduler is None:
+            return await self._download(method, args, kwargs)
+
+        return await self.scheduler.submit(request_key(method, args, kwargs), lambda: self._download(method, args, kwargs))
+
+    async def _download(self, method, args, kwargs):
+        await self.open()
+
+        count("requests")
+        data = await getattr(self.understat, method)(*args, **kwargs)
+
+        if self.cache is not None:
+            # The data of a match is only cached forever once the index lists it as a result.
+            match_id = args[0] if args else kwargs.get("match_id")
+            is_result = method in MATCH_METHODS and match_id is not None and self.index.is_result(match_id)
+            self.cache.set(method, args, kwargs, data, is_result=is_result)
+
+        return data
+
+    def __getattr__(self, name):
+        if not name.startswith("get_"):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        async def method(*args, **kwargs):
+            return await self.request(name, *args, **kwargs)
+
+        return method
+
+
+@asynccontextmanager
+async def ensure_client(client=None):
+    """Yield the given client, or a one-shot client that is closed on exit when none is given."""
+
+    if client is not None:
+        yield client
+        return
+
+    async with UnderstatClient() as client:
+        yield client
@@ -0,0 +1,30 @@
+"""This module writes files atomically, so a reader never sees a partly written file."""
+
+import tempfile
+from pathlib import Path
+
+
+def write_atomic(file_name, content):
+    """Write text or bytes to a file, replacing it in one step.
+
+    The content is written to a unique temporary file in the same directory, then renamed
+    over the file. Two processes writing the same file at once, e.g. a sync next to the render
+    service, each publish a complete file instead of interleaving their writes.
+
+    Args:
+        file_name (str | Path): The path of the file. Its directory is created if needed.
+        content (str | bytes): The content of the file.
+
+    Returns:
+        Path: The path of the file.
+    """
+
+    file_name = Path(file_name)
+    file_name.parent.mkdir(parents=True, exist_ok=True)
+
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with tempfile.NamedTemporaryFile(mode, dir=file_name.parent, prefix=f"{file_name.name}.", suffix=".tmp", delete=False) as fp:
+        fp.write(content)
+
+    Path(fp.name).replace(file_name)
+    return file_name
@@ -0,0 +1,108 @@
+"""This module harvests the shots of every player in a league season concurrently."""
+
+import json
+import shutil
+import asyncio
+import argparse
+from pathlib import Path
+
+from .client import ensure_client
+from .files import write_atomic
+from .leagues import LEAGUES
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+def print_progress(done, total, player_name):
+    print(f"[{done}/{total}] {player_name}")
+
+
+async def harvest_player_shots(client, player_id, season, checkpoint_dir):
+    """Fetch the shots of one player and save them as a checkpoint file."""
+
+    shots = await client.get_player_shots(player_id=player_id, season=season)
+
+    write_atomic(checkpoint_dir / f"{player_id}.json", json.dumps(shots))
+    return shots
+
+
+async def harvest_league_shots(league=LEAGUES.EPL, year="2024", client=None, concurrency=DEFAULT_CONCURRENCY, on_progress=print_progress):
+    """Fetch the shots of every player in a league season and save them to one CSV file.
+
+    The players are listed once from the entity index, then their shots are fetched
+    concurrently. Each player's shots are saved to a checkpoint file as soon as they are
+    downloaded, so running the harvest again after a failure only fetches the missing players.
+    The checkpoints are deleted once the CSV file is written, so the next harvest of the
+    season fetches every player again and picks up their new matches.
+
+    Args:
+        league (str, optional): The league name. Defaults to LEAGUES.EPL.
+        year (str, optional): The season. Defaults to "2024".
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            one-shot client.
+        concurrency (int, optional): The maximum number of players fetched at the same time.
+            Defaults to 8.
+        on_progress (callable, optional): Called with (done, total, player_name) after each
+            player. Defaults to printing the progress.
+
+    Returns:
+        str: The path of the combined CSV file.
+    """
+
+    season = str(year)
+    file_name = f"./data/{league.lower()}_{season}_shotdata_understat.csv"
+
+    checkpoint_dir = Path(f"./data/{league.lower()}_{season}_harvest")
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    async with ensure_client(client) as client:
+        entry = await client.index.get_entry(client, league, season)
+        players = entry.players
+
+        # The players are keyed by ID, so two players sharing a name are both harvested.
+        done_ids = {path.stem for path in checkpoint_dir.glob("*.json")}
+        pending = {player_id: name for player_id, name in players.items() if player_id not in done_ids}
+
+        total = len(players)
+        done = total - len(pending)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def harvest(player_name, player_id):
+            nonlocal done
+
+            async with semaphore:
+                await harvest_player_shots(client, player_id, season, checkpoint_dir)
+
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total, player_name)
+
+        results = await asyncio.gather(
+            *(harvest(name, player_id) for player_id, name in pending.items()),
+            return_exceptions=True
+        )
+
+    failed = [pending[player_id] for player_id, result in zip(pending, results) if isinstance(result, BaseException)]
+    if failed:
+        raise RuntimeError(f"Failed to harvest the shots of {len(failed)} players, run the harvest again to resume: {', '.join(failed)}.")
+
+    from .ingest import iter_records, write_csv_chunks
+
+    # The checkpoints are streamed to the CSV file, so the whole league is never in memory.
+    shots = (shot for player_id in players for shot in iter_records(checkpoint_dir / f"{player_id}.json"))
+    write_csv_chunks(shots, file_name)
+
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return file_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest the shots of every player in a league season.")
+    parser.add_argument("league", nargs="?", default=LEAGUES.EPL)
+    parser.add_argument("year", nargs="?", default="2024")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    file_name = asyncio.run(harvest_league_shots(args.league, args.year, concurrency=args.concurrency))
+    print(f"Shots saved at: '{file_name}'.")
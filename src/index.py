@@ -0,0 +1,281 @@
+"""This module keeps a persistent index of the Understat players, teams and matches IDs."""
+
+import json
+import time
+import asyncio
+import difflib
+import unicodedata
+from datetime import date
+from pathlib import Path
+
+from .files import write_atomic
+from .leagues import LEAGUES, is_past_season
+
+
+DEFAULT_INDEX_PATH = Path("./data/understat_index.json")
+
+# Entries are refreshed after 12 hours, unless they were saved after the end of their season.
+DEFAULT_TTL = 12 * 60 * 60
+
+FUZZY_CUTOFF = 0.8
+
+# Bump when the format of the entries changes, the entries saved in another format are downloaded again.
+INDEX_VERSION = 2
+
+
+def normalize_name(name):
+    """Normalize a name for fuzzy matching by removing accents, case and extra spaces."""
+
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(name.casefold().split())
+
+
+def _match_key(home_team, away_team):
+    return f"{home_team}|{away_team}"
+
+
+class SeasonEntry:
+    """The players, teams and matches of one league season, with lookup tables built once.
+
+    The players are stored by ID, as two players of a season can share a name: `player_ids`
+    lists the IDs of each name.
+    """
+
+    def __init__(self, league, season, players, teams, matches, updated_at):
+        self.league = league
+        self.season = str(season)
+        self.players = players
+        self.teams = teams
+        self.matches = matches
+        self.updated_at = updated_at
+
+        self.match_ids = {_match_key(match["h"], match["a"]): match["id"] for match in matches}
+        self.result_ids = {str(match["id"]) for match in matches if match["isResult"]}
+
+        self.player_ids = {}
+        for player_id, name in players.items():
+            self.player_ids.setdefault(name, []).append(player_id)
+
+        self._names = {"players": self.player_ids, "teams": teams}
+        self._normalized = {
+            "players": {normalize_name(name): name for name in self.player_ids},
+            "teams": {normalize_name(name): name for name in teams},
+        }
+
+    @classmethod
+    def from_understat(cls, league, season, players, teams, results, fixtures):
+        matches = []
+        for match in [*results, *fixtures]:
+            matches.append({
+                "id": match["id"],
+                "h": match["h"]["title"],
+                "a": match["a"]["title"],
+                "datetime": match["datetime"],
+                "isResult": match["isResult"],
+            })
+
+        return cls(
+            league,
+            season,
+            players={player["id"]: player["player_name"] for player in players},
+            teams={team["title"]: team["id"] for team in teams},
+            matches=matches,
+            updated_at=time.time(),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            "league": self.league,
+            "season": self.season,
+            "players": self.players,
+            "teams": self.teams,
+            "matches": self.matches,
+            "updated_at": self.updated_at,
+        }
+
+    def is_fresh(self, ttl):
+        # An entry saved during its season misses the last results and signings, so it only
+        # stops changing if the season was already over when it was saved.
+        if is_past_season(self.season, date.fromtimestamp(self.updated_at)):
+            return True
+
+        return time.time() - self.updated_at < ttl
+
+    def find_name(self, kind, name, fuzzy=False):
+        """Find the canonical player or team name matching the given name.
+
+        Args:
+            kind (str): Either "players" or "teams".
+            name (str): The name to look for.
+            fuzzy (bool, optional): Allow accent/case-insensitive and approximate matches.
+                Defaults to False.
+
+        Returns:
+            str | None: The name as stored by Understat, or None if there is no match.
+        """
+
+        names = self._names[kind]
+        if name in names:
+            return name
+
+        if not fuzzy:
+            return None
+
+        normalized = self._normalized[kind]
+        key = normalize_name(name)
+        if key in normalized:
+            return normalized[key]
+
+        matches = difflib.get_close_matches(key, normalized.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        return normalized[matches[0]] if matches else None
+
+
+class EntityIndex:
+    """A persistent index of (league, season) to the players, teams and matches IDs.
+
+    Each league season is downloaded once, saved to disk and refreshed when it is older than
+    the TTL, so resolving a name to an ID is a dictionary lookup instead of a download.
+
+    Args:
+        path (str | Path, optional): The JSON file used to store the index.
+            Defaults to "./data/understat_index.json".
+        ttl (int, optional): The number of seconds after which the entries of the season in
+            progress are refreshed. Defaults to 12 hours.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.entries = {}
+
+        self._locks = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH, ttl=DEFAULT_TTL):
+        index = cls(path, ttl)
+
+        if index.path.exists():
+            with open(index.path) as fp:
+                data = json.load(fp)
+
+            entries = data.get("entries", []) if data.get("version") == INDEX_VERSION else []
+            for entry in entries:
+                entry = SeasonEntry.from_dict(entry)
+                index.entries[(entry.league, entry.season)] = entry
+
+        return index
+
+    def save(self):
+        write_atomic(self.path, json.dumps({"version": INDEX_VERSION, "entries": [entry.to_dict() for entry in self.entries.values()]}))
+
+    def is_result(self, match_id):
+        """Return True if the indexed entries list a match as a completed result, without downloading anything."""
+
+        match_id = str(match_id)
+        return any(match_id in entry.result_ids for entry in self.entries.values())
+
+    async def refresh(self, client, league, season):
+        """Download the players, teams and matches of a league season and save them to disk."""
+
+        season = str(season)
+        players, teams, results, fixtures = await asyncio.gather(
+            client.get_league_players(league, season=season),
+            client.get_teams(league, season=season),
+            client.get_league_results(league, season=season),
+            client.get_league_fixtures(league, season=season),
+        )
+
+        entry = SeasonEntry.from_understat(league, season, players, teams, results, fixtures)
+        self.entries[(league, season)] = entry
+        self.save()
+
+        return entry
+
+    async def get_entry(self, client, league, season):
+        """Return the entry of a league season, downloading it if it is missing or stale."""
+
+        key = (league, str(season))
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            entry = self.entries.get(key)
+            if entry is None or not entry.is_fresh(self.ttl):
+                entry = await self.refresh(client, league, season)
+
+        return entry
+
+    async def _find(self, client, season, league, lookup):
+        leagues = [league] if league else LEAGUES.all()
+
+        # Exact matches in every league win over fuzzy matches in any league.
+        for fuzzy in (False, True):
+            for league in leagues:
+                entry = await self.get_entry(client, league, season)
+                value = lookup(entry, fuzzy)
+                if value is not None:
+                    return value
+
+        return None
+
+    async def player_id(self, client, player_name, season, league=None, fuzzy=False):
+        """Return the Understat ID of a player, or None if the player is not found.
+
+        Args:
+            client (UnderstatClient): The client used to download missing entries.
+            player_name (str): The player name.
+            season (str | int): The season.
+            league (str, optional): The league to search. Defaults to every league in `LEAGUES`.
+            fuzzy (bool, optional): Allow approximate name matches. Defaults to False.
+
+        Raises:
+            ValueError: If several players of the league season have this name.
+        """
+
+        def lookup(entry, allow_fuzzy):
+            if allow_fuzzy and not fuzzy:
+                return None
+
+            name = entry.find_name("players", player_name, fuzzy=allow_fuzzy)
+            if name is None:
+                return None
+
+            player_ids = entry.player_ids[name]
+            if len(player_ids) > 1:
+                raise ValueError(f"Ambiguous player name: '{player_name}' is used by the players {', '.join(player_ids)} of {entry.league} {entry.season}.")
+
+            return player_ids[0]
+
+        return await self._find(client, season, league, lookup)
+
+    async def team_id(self, client, team_name, season, league=None, fuzzy=False):
+        """Return the Understat ID of a team, or None if the team is not found."""
+
+        def lookup(entry, allow_fuzzy):
+            if allow_fuzzy and not fuzzy:
+                return None
+
+            name = entry.find_name("teams", team_name, fuzzy=allow_fuzzy)
+            return entry.teams[name] if name else None
+
+        return await self._find(client, season, league, lookup)
+
+    async def match_id(self, client, home_team, away_team, season, league=None, fuzzy=False):
+        """Return the Understat ID of a match, or None if the match is not found."""
+
+        def lookup(entry, allow_fuzzy):
+            if allow_fuzzy and not fuzzy:
+                return None
+
+            home = entry.find_name("teams", home_team, fuzzy=allow_fuzzy)
+            away = entry.find_name("teams", away_team, fuzzy=allow_fuzzy)
+            if home is None or away is None:
+                return None
+
+            return entry.match_ids.get(_match_key(home, away))
+
+        return await self._find(client, season, league, lookup)
@@ -0,0 +1,270 @@
+"""This module streams archived Understat JSON dumps into the shots datasets in bounded chunks."""
+
+import re
+import json
+import argparse
+from pathlib import Path
+
+from .leagues import LEAGUES
+
+
+# The number of characters read from a dump at once.
+READ_SIZE = 1 << 16
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+WHITESPACE = " \t\n\r"
+
+NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+class _JSONStream:
+    """Read the records of a JSON document one at a time.
+
+    Arrays are streamed element by element, and the objects found in them are yielded as
+    records. The values of the other objects are walked the same way, so the records of a
+    list of shots, of a match payload ({"h": [...], "a": [...]}) or of a cached response
+    ({"data": [...]}) are all found, while only one record is held in memory.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.fp.read(READ_SIZE)
+        if not data:
+            self.eof = True
+            return False
+
+        # Drop the part of the buffer that was already parsed.
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self._fill():
+                return ""
+
+    def _expect(self, characters):
+        character = self._peek()
+        if character not in characters:
+            raise ValueError(f"Invalid JSON: expected one of {characters!r}, got {character!r}.")
+
+        self.position += 1
+        return character
+
+    def _decode(self):
+        """Decode the next value, reading more data until it is complete."""
+
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number cut by the end of the buffer may continue in the next read.
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] in NUMBER_CHARACTERS) and self._fill():
+                continue
+
+            self.position = end
+            return value
+
+    def records(self):
+        character = self._peek()
+        if character == "[":
+            yield from self._array()
+        elif character == "{":
+            yield from self._object()
+        elif character:
+            self._decode()
+
+    def _array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self.position += 1
+            return
+
+        while True:
+            character = self._peek()
+            if character == "{":
+                yield self._decode()
+            elif character == "[":
+                yield from self._array()
+            else:
+                self._decode()
+
+            if self._expect(",]") == "]":
+                return
+
+    def _object(self):
+        self._expect("{")
+        if self._peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            self._decode()
+            self._expect(":")
+
+            if self._peek() in "[{":
+                yield from self.records()
+            else:
+                self._decode()
+
+            if self._expect(",}") == "}":
+                return
+
+
+def iter_records(path):
+    """Yield the records of a JSON or JSON Lines dump one at a time.
+
+    Args:
+        path (str | Path): The dump. Files ending in ".jsonl" or ".ndjson" hold one record per
+            line, any other file is parsed as a JSON document, see `_JSONStream`.
+    """
+
+    path = Path(path)
+    with open(path) as fp:
+        if path.suffix in (".jsonl", ".ndjson"):
+            records = (json.loads(line) for line in fp if line.strip())
+        else:
+            records = _JSONStream(fp).records()
+
+        for record in records:
+            # A list of match payloads holds the shots of each side.
+            if isinstance(record.get("h"), list) and isinstance(record.get("a"), list):
+                yield from record["h"]
+                yield from record["a"]
+            else:
+                yield record
+
+
+def iter_chunks(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Group records in lists of at most `chunk_size` records."""
+
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def iter_shot_tables(paths, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the shots of one or more dumps as `ShotTable`s of at most `chunk_size` shots."""
+
+    from .shots import ShotTable
+
+    paths = [paths] if isinstance(paths, (str, Path)) else paths
+    for path in paths:
+        for chunk in iter_chunks(iter_records(path), chunk_size):
+            yield ShotTable.from_understat(chunk)
+
+
+def remove_dump_partitions(stem, league=LEAGUES.EPL):
+    """Delete the partitions written by a previous ingest of a dump, in every season and format.
+
+    Returns:
+        list[str]: The paths of the deleted files.
+    """
+
+    from .storage import DATASETS_PATH, FORMATS, normalize_entity
+
+    # Only "{stem}_00000", "{stem}_00001"... and not the partitions of a dump named "{stem}_2020".
+    pattern = re.compile(rf"{re.escape(normalize_entity(stem))}_\d{{5,}}")
+
+    removed = []
+    for file_path in (DATASETS_PATH / "shots" / f"league={league}").glob("season=*/*"):
+        if file_path.suffix in FORMATS.values() and pattern.fullmatch(file_path.stem):
+            file_path.unlink()
+            removed.append(str(file_path))
+
+    return removed
+
+
+def ingest_dump(path, league=LEAGUES.EPL, chunk_size=DEFAULT_CHUNK_SIZE, fmt="parquet"):
+    """Write the shots of a dump to the shots datasets, one chunk at a time.
+
+    The shots are split by their "season" field and each chunk is written as its own
+    partition file named after the dump, so at most `chunk_size` shots are in memory whatever
+    the size of the dump. The partitions are read back together with `load_shots(league)`.
+    The partitions of a previous ingest of the same dump are deleted first, so none of them
+    is left behind when the dump is ingested again with a smaller `chunk_size`.
+
+    Args:
+        path (str | Path): The JSON or JSON Lines dump.
+        league (str, optional): The league of the shots. Defaults to LEAGUES.EPL.
+        chunk_size (int, optional): The maximum number of shots converted at once.
+            Defaults to 50 000.
+        fmt (str, optional): Either "parquet" or "npz". Defaults to "parquet".
+
+    Returns:
+        list[str]: The paths of the written files.
+    """
+
+    import pandas as pd
+
+    from .storage import write_dataset
+
+    stem = Path(path).stem
+    remove_dump_partitions(stem, league)
+
+    file_names = []
+    for index, chunk in enumerate(iter_chunks(iter_records(path), chunk_size)):
+        df = pd.DataFrame.from_records(chunk)
+        del chunk
+
+        for season, shots in df.groupby(df["season"].astype(str), sort=False):
+            file_names.append(write_dataset(shots, "shots", league, season, f"{stem}_{index:05d}", fmt=fmt))
+
+    return file_names
+
+
+def write_csv_chunks(records, file_name, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write records to a CSV file in chunks, keeping the columns of the first chunk."""
+
+    import pandas as pd
+
+    columns = None
+    for chunk in iter_chunks(records, chunk_size):
+        df = pd.json_normalize(chunk)
+        if columns is None:
+            columns = list(df.columns)
+            df.to_csv(file_name, index=False)
+        else:
+            df.reindex(columns=columns).to_csv(file_name, index=False, header=False, mode="a")
+
+    if columns is None:
+        Path(file_name).write_text("")
+
+    return file_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream archived Understat shot dumps into the shots datasets.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--league", default=LEAGUES.EPL)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--format", dest="fmt", choices=["parquet", "npz"], default="parquet")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        file_names = ingest_dump(path, args.league, args.chunk_size, args.fmt)
+        print(f"'{path}': {len(file_names)} files written.")
@@ -0,0 +1,348 @@
+"""This module records the wall time, requests, bytes and memory of each stage of a render job."""
+
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import nullcontext
+from dataclasses import dataclass, field, asdict
+
+from .files import write_atomic
+
+
+# The stage running in the current thread or task, None outside of any stage.
+_current = contextvars.ContextVar("current_stage", default=None)
+
+# The callbacks called with each finished stage. Nothing is recorded while it is empty.
+_hooks = []
+
+_NULL_STAGE = nullcontext()
+
+
+@dataclass
+class StageRecord:
+    """A finished stage.
+
+    The counters ("requests", "cache_hits", "bytes", ...) of a stage include the ones of the
+    stages nested in it, and so does its peak memory.
+
+    Attributes:
+        name (str): The name of the stage, e.g. "utils.prepare_shot_data".
+        start (float): When the stage started, in seconds of `time.perf_counter`.
+        duration (float): The wall time of the stage, in seconds.
+        depth (int): The number of stages the stage is nested in.
+        parent (str | None): The name of the enclosing stage.
+        counters (dict): The number of requests, cache hits and bytes downloaded.
+        peak_memory (int | None): The peak memory allocated during the stage above the memory
+            allocated when it started, in bytes. Only measured while `tracemalloc` is tracing.
+        thread (int): The thread the stage ran in.
+        task (str | None): The name of the asyncio task the stage ran in.
+    """
+
+    name: str
+    start: float
+    duration: float
+    depth: int
+    parent: str | None
+    counters: dict = field(default_factory=dict)
+    peak_memory: int | None = None
+    thread: int = 0
+    task: str | None = None
+
+
+class Stage:
+    """A running stage, see `stage`."""
+
+    def __init__(self, name):
+        self.name = name
+        self.parent = None
+        self.counters = {}
+        self.peak = 0
+
+    def __enter__(self):
+        # Only imported once something is recorded, so importing the module stays cheap.
+        import tracemalloc
+
+        self.parent = _current.get()
+        self.token = _current.set(self)
+
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the peak reached by the parent so far, then measure this stage on its own.
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = current
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        import asyncio
+        import tracemalloc
+
+        duration = time.perf_counter() - self.start
+        _current.reset(self.token)
+
+        peak_memory = None
+        if self.tracing and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_memory = max(self.peak - self.memory_start, 0)
+
+        if self.parent is not None:
+            for name, value in self.counters.items():
+                self.parent.counters[name] = self.parent.counters.get(name, 0) + value
+            self.parent.peak = max(self.parent.peak, self.peak)
+
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        depth = 0
+        parent = self.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+
+        record = StageRecord(
+            name=self.name,
+            start=self.start,
+            duration=duration,
+            depth=depth,
+            parent=self.parent.name if self.parent is not None else None,
+            counters=dict(self.counters),
+            peak_memory=peak_memory,
+            thread=threading.get_ident(),
+            task=task.get_name() if task is not None else None,
+        )
+
+        for hook in list(_hooks):
+            hook(record)
+
+        return False
+
+
+def enabled():
+    """Return True if a hook is registered, i.e. if the stages are recorded."""
+
+    return bool(_hooks)
+
+
+def add_hook(callback):
+    """Call `callback` with the `StageRecord` of each stage that finishes.
+
+    Returns:
+        callable: The callback, so it can be passed to `remove_hook` later.
+    """
+
+    _hooks.append(callback)
+    return callback
+
+
+def remove_hook(callback):
+    if callback in _hooks:
+        _hooks.remove(callback)
+
+
+def stage(name):
+    """Return a context manager that records the code it wraps as a stage.
+
+    Without any hook registered, a shared no-op context manager is returned and nothing is
+    measured.
+
+        with stage("shotmap.render"):
+            ...
+    """
+
+    if not _hooks:
+        return _NULL_STAGE
+
+    return Stage(name)
+
+
+def instrumented(name=None):
+    """Record each call of the decorated function or coroutine function as a stage.
+
+    Args:
+        name (str, optional): The name of the stage. Defaults to "<module>.<function>".
+    """
+
+    def decorator(func):
+        stage_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _hooks:
+                    return await func(*args, **kwargs)
+
+                with Stage(stage_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _hooks:
+                return func(*args, **kwargs)
+
+            with Stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1):
+    """Add `value` to a counter of the running stage, e.g. count("requests")."""
+
+    current = _current.get()
+    if current is not None:
+        current.counters[name] = current.counters.get(name, 0) + value
+
+
+async def on_response_chunk_received(session, trace_config_ctx, params):
+    """An `aiohttp.TraceConfig` callback that counts the bytes downloaded in the running stage."""
+
+    count("bytes", len(params.chunk))
+
+
+class Recorder:
+    """Collect the stages while it is active, and export them.
+
+        with Recorder(memory=True) as recorder:
+            create_player_shotmap("Mohamed Salah", "2024")
+
+        recorder.save("./data/trace.json", fmt="chrome")
+
+    Args:
+        memory (bool, optional): Measure the peak memory of each stage with `tracemalloc`.
+            Tracing slows down the allocations, so the wall times are inflated. Defaults to False.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self._started_tracing = False
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def start(self):
+        import tracemalloc
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        add_hook(self)
+        return self
+
+    def stop(self):
+        import tracemalloc
+
+        remove_hook(self)
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def summary(self):
+        """Return the calls, the total wall time, the counters and the peak memory of each stage name."""
+
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(record.name, {"calls": 0, "total_ms": 0.0, "counters": {}, "peak_memory": None})
+            entry["calls"] += 1
+            entry["total_ms"] += record.duration * 1000
+            for name, value in record.counters.items():
+                entry["counters"][name] = entry["counters"].get(name, 0) + value
+            if record.peak_memory is not None:
+                entry["peak_memory"] = max(entry["peak_memory"] or 0, record.peak_memory)
+
+        for entry in summary.values():
+            entry["total_ms"] = round(entry["total_ms"], 3)
+
+        return summary
+
+    def to_json(self):
+        origin = min((record.start for record in self.records), default=0)
+
+        stages = []
+        for record in sorted(self.records, key=lambda record: record.start):
+            stage = asdict(record)
+            stage["start_ms"] = round((record.start - origin) * 1000, 3)
+            stage["duration_ms"] = round(record.duration * 1000, 3)
+            del stage["start"], stage["duration"]
+            stages.append(stage)
+
+        return {"stages": stages, "summary": self.summary()}
+
+    def to_chrome_trace(self):
+        """Return the stages in the Chrome trace event format, for chrome://tracing or Perfetto.
+
+        Each thread and each asyncio task gets its own track, so concurrent requests do not
+        overlap on the same row.
+        """
+
+        origin = min((record.start for record in self.records), default=0)
+        pid = os.getpid()
+
+        tracks = {}
+        events = []
+        for record in sorted(self.records, key=lambda record: record.start):
+            track = tracks.setdefault((record.thread, record.task), len(tracks) + 1)
+
+            args = dict(record.counters)
+            if record.peak_memory is not None:
+                args["peak_memory"] = record.peak_memory
+
+            events.append({
+                "name": record.name,
+                "cat": record.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((record.start - origin) * 1e6, 3),
+                "dur": round(record.duration * 1e6, 3),
+                "pid": pid,
+                "tid": track,
+                "args": args,
+            })
+
+        for (thread, task), track in tracks.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": track, "args": {"name": task or f"thread {thread}"}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, file_name, fmt="json"):
+        """Save the stages to a file.
+
+        Args:
+            file_name (str): The path of the file.
+            fmt (str, optional): Either "json" for the stages and their summary, or "chrome"
+                for a Chrome trace. Defaults to "json".
+
+        Returns:
+            str: The path of the file.
+        """
+
+        if fmt == "json":
+            data = self.to_json()
+        elif fmt == "chrome":
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError(f"Invalid format: '{fmt}'. Expected 'json' or 'chrome'.")
+
+        write_atomic(file_name, json.dumps(data, indent=2))
+        return str(file_name)
@@ -0,0 +1,53 @@
+"""This module defines the leagues and seasons available on Understat."""
+
+from datetime import date
+
+
+class LEAGUES:
+    """Leagues names used by Understat."""
+
+    EPL = "EPL"
+    PREMIER_LEAGUE = EPL
+    BUNDESLIGA = "Bundesliga"
+    SERIE_A = "Serie_A"
+    LIGUE_1 = "ligue_1"
+    RFPL = "RFPL"
+
+    @classmethod
+    def all(cls):
+        """Return every league once, ignoring aliases such as `PREMIER_LEAGUE`."""
+
+        return [cls.EPL, cls.BUNDESLIGA, cls.SERIE_A, cls.LIGUE_1, cls.RFPL]
+
+
+# The names of the leagues shown in the figures.
+LEAGUE_NAMES = {
+    LEAGUES.EPL: "Premier League",
+    LEAGUES.BUNDESLIGA: "Bundesliga",
+    LEAGUES.SERIE_A: "Serie A",
+    LEAGUES.LIGUE_1: "Ligue 1",
+    LEAGUES.RFPL: "Russian Premier League",
+}
+
+
+def current_season(today=None):
+    """Return the Understat season (its starting year) that is in progress on the given date.
+
+    Seasons start in July, so any date before July belongs to the season that started the
+    previous year.
+
+    Args:
+        today (datetime.date, optional): The date to check. Defaults to today.
+
+    Returns:
+        str: The starting year of the season, e.g. "2024".
+    """
+
+    today = today or date.today()
+    return str(today.year if today.month >= 7 else today.year - 1)
+
+
+def is_past_season(season, today=None):
+    """Return True if the given season is finished and its data will not change anymore."""
+
+    return int(season) < int(current_season(today))
@@ -0,0 +1,164 @@
+"""This module renders figures to encoded bytes or to RGBA arrays, without going through the disk."""
+
+import io
+
+import numpy as np
+
+
+FORMATS = ("png", "jpeg", "webp", "svg", "rgba")
+
+FILE_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "svg": ".svg"}
+
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp", "svg": "image/svg+xml"}
+
+DEFAULT_COMPRESS_LEVEL = 6
+
+DEFAULT_QUALITY = 90
+
+# The margin kept around the figure content, the default of `savefig(bbox_inches="tight")`.
+PAD_INCHES = 0.1
+
+# The boxes of the labelled figures, shared by every figure with the same label and size.
+_bboxes = {}
+
+
+def _canvas(fig):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if not isinstance(fig.canvas, FigureCanvasAgg):
+        FigureCanvasAgg(fig)
+
+    return fig.canvas
+
+
+def fixed_bbox(fig, pad_inches=PAD_INCHES):
+    """Return the part of a figure that is saved, in pixels.
+
+    The box is the one `savefig(bbox_inches="tight")` finds, snapped to whole pixels and
+    stretched to the full width of the figure. It is computed once and reused for every
+    figure with the same label (the templates label their figures with their layout), so
+    saving a figure costs a single draw instead of an extra layout pass per figure. The box of
+    a figure without a label is measured each time.
+
+    Returns:
+        tuple[int, int, int, int]: The left, top, right and bottom edges, in pixels from the
+            top-left corner of the figure. They may lie outside of it, by the padding.
+    """
+
+    key = (fig.get_label(), *fig.get_size_inches().tolist(), fig.dpi, pad_inches)
+    if fig.get_label() and key in _bboxes:
+        return _bboxes[key]
+
+    width, height = fig.bbox.width, fig.bbox.height
+    pad = pad_inches * fig.dpi
+
+    tight = fig.get_tightbbox(_canvas(fig).get_renderer()).transformed(fig.dpi_scale_trans)
+    top = int(np.floor(height - min(tight.y1 + pad, height + pad)))
+    bottom = int(np.ceil(height - max(tight.y0 - pad, -pad)))
+    bbox = (int(np.floor(-pad)), top, int(np.ceil(width + pad)), bottom)
+
+    if fig.get_label():
+        _bboxes[key] = bbox
+
+    return bbox
+
+
+def render_rgba(fig, bbox=None):
+    """Draw a figure and return its pixels.
+
+    Args:
+        fig (Figure): The figure.
+        bbox (tuple, optional): The box to keep, see `fixed_bbox`. Defaults to the fixed box
+            of the figure. The parts outside of the figure are filled with its face color.
+
+    Returns:
+        np.ndarray: An (height, width, 4) uint8 array.
+    """
+
+    from matplotlib.colors import to_rgba_array
+
+    canvas = _canvas(fig)
+    canvas.draw()
+    pixels = np.asarray(canvas.buffer_rgba())
+
+    left, top, right, bottom = bbox or fixed_bbox(fig)
+
+    image = np.empty((bottom - top, right - left, 4), dtype=np.uint8)
+    image[:] = np.round(to_rgba_array(fig.get_facecolor())[0] * 255).astype(np.uint8)
+
+    # Copy the part of the box that is inside the figure.
+    src_top, src_left = max(top, 0), max(left, 0)
+    src_bottom, src_right = min(bottom, pixels.shape[0]), min(right, pixels.shape[1])
+    image[src_top - top:src_bottom - top, src_left - left:src_right - left] = pixels[src_top:src_bottom, src_left:src_right]
+
+    return image
+
+
+def encode(image, fmt="png", compress_level=DEFAULT_COMPRESS_LEVEL, quality=DEFAULT_QUALITY, lossless=False):
+    """Encode an RGBA array.
+
+    Args:
+        image (np.ndarray): The pixels, see `render_rgba`.
+        fmt (str, optional): "png", "jpeg" or "webp". Defaults to "png".
+        compress_level (int, optional): The zlib level of a PNG, from 0 (fastest) to 9
+            (smallest). Defaults to 6.
+        quality (int, optional): The quality of a JPEG or a lossy WebP, from 1 to 100.
+            Defaults to 90.
+        lossless (bool, optional): Encode a lossless WebP. Defaults to False.
+
+    Returns:
+        bytes: The encoded image.
+    """
+
+    from PIL import Image, features
+
+    buffer = io.BytesIO()
+    if fmt == "png":
+        Image.fromarray(image, "RGBA").save(buffer, format="PNG", compress_level=compress_level)
+    elif fmt == "jpeg":
+        Image.fromarray(image, "RGBA").convert("RGB").save(buffer, format="JPEG", quality=quality)
+    elif fmt == "webp":
+        if not features.check("webp"):
+            raise RuntimeError("WebP is not supported by the installed Pillow.")
+        Image.fromarray(image, "RGBA").save(buffer, format="WEBP", quality=quality, lossless=lossless)
+    else:
+        raise ValueError(f"Invalid format: '{fmt}'. Expected one of 'png', 'jpeg' or 'webp'.")
+
+    return buffer.getvalue()
+
+
+def render_to_buffer(fig, fmt="png", **options):
+    """Render a figure to encoded bytes, or to an RGBA array.
+
+    Unlike `savefig(bbox_inches="tight")`, the figure is drawn once, within its fixed box (see
+    `fixed_bbox`), and nothing is written to the disk.
+
+    Args:
+        fig (Figure): The figure.
+        fmt (str, optional): One of `FORMATS`. "rgba" returns the pixels, see `render_rgba`,
+            and "svg" a vector image with the same box. Defaults to "png".
+        **options: The options of the encoder, see `encode`.
+
+    Returns:
+        bytes | np.ndarray: The encoded figure, or its pixels.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format: '{fmt}'. Expected one of {', '.join(FORMATS)}.")
+
+    if fmt == "svg":
+        from matplotlib.transforms import Bbox
+
+        left, top, right, bottom = fixed_bbox(fig)
+        height = fig.bbox.height
+        bbox_inches = Bbox.from_extents(left, height - bottom, right, height - top).transformed(fig.dpi_scale_trans.inverted())
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="svg", facecolor=fig.get_facecolor(), bbox_inches=bbox_inches)
+        return buffer.getvalue()
+
+    image = render_rgba(fig)
+    if fmt == "rgba":
+        return image
+
+    return encode(image, fmt, **options)
@@ -0,0 +1,312 @@
+"""This module plans a manifest of mixed render and export jobs as a dependency graph and runs it."""
+
+import os
+import json
+import asyncio
+import inspect
+import argparse
+import functools
+from collections import Counter
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+from . import scrape
+from .leagues import LEAGUES
+from .output import FILE_EXTENSIONS
+from .instrument import instrumented
+from .shotmap import fetch_player_shotmap_data, fetch_team_shotmap_data, fetch_match_shotmap_data
+from .shotzone import fetch_player_shotzone_data, fetch_team_shotzone_data
+
+
+DEFAULT_FETCH_WORKERS = 8
+
+# The figures a job can render: the kind of template, the parameters of the job, the
+# coroutine returning the shots, the title and the subtitle, and the default file name.
+FIGURES = {
+    "player_shotmap": ("shotmap", ("player",), fetch_player_shotmap_data, "{player}_{year}_shotmap"),
+    "team_shotmap": ("shotmap", ("team",), fetch_team_shotmap_data, "{team}_{year}_team_shotmap"),
+    "match_shotmap": ("match", ("home", "away"), fetch_match_shotmap_data, "{home}_{away}_{year}_shotmap"),
+    "player_shotzone": ("shotzone", ("player",), fetch_player_shotzone_data, "{player}_{year}_shotzone"),
+    "team_shotzone": ("shotzone", ("team",), fetch_team_shotzone_data, "{team}_{year}_team_shotzone"),
+}
+
+# The `generate_*` functions of `src.scrape` an "export" job can run.
+EXPORTS = [
+    "generate_teams",
+    "generate_league_fixtures",
+    "generate_player_shot_data",
+    "generate_player_data",
+    "generate_player_group_data",
+    "generate_player_matches",
+    "generate_match_stats",
+    "generate_match_shots",
+    "generate_team_stats",
+    "generate_teams_players",
+]
+
+# The names of the job parameters in the signatures of the `generate_*` functions.
+EXPORT_PARAMETERS = {"player_name": "player", "team_name": "team", "home_team": "home", "away_team": "away"}
+
+# The job parameters that can be set once for all the jobs of a manifest.
+MANIFEST_DEFAULTS = ("year", "league", "layout")
+
+# The parameters resolved to an Understat ID with the entity index, see `src.index`.
+INDEXED_PARAMETERS = {"player", "home", "away"}
+
+
+@dataclass
+class Node:
+    """A step of a plan, shared by every job that needs it.
+
+    Attributes:
+        key (tuple): The identity of the step: two jobs needing the same key share the step.
+        stage (str): "index" to download a league season of the entity index, "fetch" to
+            download the shots of a figure, "render" to draw it, or "export" to run a
+            `generate_*` function.
+        deps (tuple): The keys of the steps that must run first.
+        params (dict): The arguments of the step.
+    """
+
+    key: tuple
+    stage: str
+    deps: tuple = ()
+    params: dict = field(default_factory=dict)
+
+
+class Plan:
+    """The dependency graph of a manifest, see `plan_manifest`.
+
+    Attributes:
+        nodes (dict[tuple, Node]): The steps, in the order they were added.
+        jobs (list[tuple]): The key of the last step of each job, in the order of the manifest.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.jobs = []
+
+    def add(self, key, stage, deps=(), **params):
+        node = Node(key, stage, tuple(deps), params)
+
+        existing = self.nodes.setdefault(key, node)
+        if existing != node:
+            # E.g. two shotzones with different layouts saved to the same file.
+            raise ValueError(f"Conflicting {stage} steps for {key[1:]}.")
+
+        return key
+
+    def stages(self):
+        """Return the number of distinct steps of each stage."""
+
+        return dict(Counter(node.stage for node in self.nodes.values()))
+
+
+def _normalize(value):
+    return str(value).replace(" ", "_").lower()
+
+
+def _index_key(plan, job, league, year):
+    if not INDEXED_PARAMETERS & job.keys():
+        return ()
+
+    return (plan.add(("index", league, year), "index", league=league, year=year),)
+
+
+def load_manifest(file_name):
+    """Load a manifest: a JSON object with the "jobs" and their defaults, or a list of jobs.
+
+        {
+            "year": "2024",
+            "jobs": [
+                {"kind": "player_shotmap", "player": "Mohamed Salah"},
+                {"kind": "player_shotzone", "player": "Mohamed Salah", "layout": "detailed"},
+                {"kind": "match_shotmap", "home": "West Ham", "away": "Liverpool", "fmt": "webp"},
+                {"kind": "team_shotmap", "team": "Liverpool", "year": "2023"},
+                {"kind": "export", "function": "generate_player_shot_data", "player": "Mohamed Salah", "fmt": "parquet"}
+            ]
+        }
+    """
+
+    with open(file_name) as fp:
+        manifest = json.load(fp)
+
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+
+    return manifest
+
+
+def plan_manifest(manifest):
+    """Build the dependency graph of the jobs of a manifest.
+
+    The jobs are split into steps, and identical steps are merged: the same shots are fetched
+    once for every figure drawn from them, the same figure asked twice is drawn once, and the
+    league season used to resolve the names is downloaded once, before any of the jobs needing
+    it. The steps that differ but send the same requests, e.g. the shotmap and the shotzone of
+    a player and the export of their shots, share them through the client, see `run_plan`.
+
+    Args:
+        manifest (dict): The jobs and their defaults, see `load_manifest` and `MANIFEST_DEFAULTS`.
+
+    Returns:
+        Plan: The steps and the last step of each job.
+    """
+
+    defaults = {"year": "2024", "league": LEAGUES.EPL, **{key: manifest[key] for key in MANIFEST_DEFAULTS if key in manifest}}
+
+    plan = Plan()
+    for index, job in enumerate(manifest.get("jobs", [])):
+        job = {**defaults, **job}
+        kind = job.get("kind")
+        year = str(job["year"])
+
+        if kind in FIGURES:
+            template, params, fetch, file_name = FIGURES[kind]
+
+            missing = [name for name in params if name not in job]
+            if missing:
+                raise ValueError(f"Job {index}: missing {', '.join(missing)} for a {kind}.")
+
+            args = tuple(str(job[name]) for name in params)
+            league = job["league"]
+            deps = _index_key(plan, job, league, year)
+            # The names are resolved in the league whose index was downloaded first.
+            fetch_key = plan.add(("fetch", fetch.__name__, *args, year, league), "fetch", deps, fetch=fetch, args=(*args, year), league=league)
+
+            fmt = job.get("fmt", "png")
+            if fmt not in FILE_EXTENSIONS:
+                raise ValueError(f"Job {index}: invalid format '{fmt}'. Expected one of {', '.join(FILE_EXTENSIONS)}.")
+
+            layout = job.get("layout", "default") if template == "shotzone" else "default"
+            file_name = job.get("file_name") or f"./media/{file_name.format(year=year, **{name: _normalize(job[name]) for name in params})}{FILE_EXTENSIONS[fmt]}"
+
+            plan.jobs.append(plan.add(("render", file_name), "render", (fetch_key,), kind=template, layout=layout, fmt=fmt, file_name=file_name))
+        elif kind == "export":
+            function = job.get("function")
+            if function not in EXPORTS:
+                raise ValueError(f"Job {index}: invalid export '{function}'. Expected one of {', '.join(EXPORTS)}.")
+
+            kwargs = {}
+            for name, parameter in inspect.signature(getattr(scrape, function)).parameters.items():
+                value = job.get(EXPORT_PARAMETERS.get(name, name), parameter.default)
+                if name == "client":
+                    continue
+                if value is inspect.Parameter.empty:
+                    raise ValueError(f"Job {index}: missing {EXPORT_PARAMETERS.get(name, name)} for {function}.")
+                kwargs[name] = str(value) if name == "year" else value
+
+            deps = _index_key(plan, job, job["league"], year)
+            plan.jobs.append(plan.add(("export", function, *sorted(kwargs.items())), "export", deps, function=function, kwargs=kwargs))
+        else:
+            raise ValueError(f"Job {index}: invalid kind '{kind}'. Expected one of {', '.join([*FIGURES, 'export'])}.")
+
+    return plan
+
+
+async def _run_node(node, results, client, executor, cache):
+    if node.stage == "index":
+        return await client.index.get_entry(client, node.params["league"], node.params["year"])
+
+    if node.stage == "fetch":
+        return await node.params["fetch"](*node.params["args"], client=client, league=node.params["league"])
+
+    if node.stage == "export":
+        return await getattr(scrape, node.params["function"])(**node.params["kwargs"], client=client)
+
+    from .batch import render_data
+
+    data, title, subtitle = results[node.deps[0]]
+    if len(data) == 0:
+        return None
+
+    params = node.params
+    render = functools.partial(render_data, params["kind"], data, title, subtitle, params["layout"], params["fmt"], file_name=params["file_name"], cache=cache)
+    return await asyncio.get_running_loop().run_in_executor(executor, render)
+
+
+@instrumented()
+async def run_plan(plan, fetch_workers=DEFAULT_FETCH_WORKERS, render_workers=None, client=None, cache=None):
+    """Run the steps of a plan, each one as soon as the steps it depends on are done.
+
+    The downloads and the exports run concurrently on one client, at most `fetch_workers` at a
+    time, and the client sends each distinct request once (see `RequestScheduler` and
+    `ResponseCache`), and the figures are drawn in a pool of `render_workers` processes, so the first
+    figures are rendered while the other shots are still downloading. A failed step fails the
+    jobs depending on it, and only them.
+
+    Args:
+        plan (Plan): The plan, see `plan_manifest`.
+        fetch_workers (int, optional): The maximum number of downloads and exports running at
+            once. Defaults to 8.
+        render_workers (int, optional): The number of worker processes. Defaults to the number
+            of CPUs.
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            one-shot client.
+        cache (RenderCache | bool, optional): The render cache, see `render_cache.save_figure`.
+
+    Returns:
+        list[str | BaseException | None]: For each job, the path of the figure, the file
+            written by the export, the error that failed it, or None for a figure without shots.
+    """
+
+    from .batch import _init_render_worker
+
+    semaphores = {"render": asyncio.Semaphore(render_workers or os.cpu_count())}
+    semaphores["index"] = semaphores["fetch"] = semaphores["export"] = asyncio.Semaphore(fetch_workers)
+
+    results = {}
+    tasks = {}
+
+    async def run(node):
+        for dep in node.deps:
+            await tasks[dep]
+
+        async with semaphores[node.stage]:
+            results[node.key] = await _run_node(node, results, client, executor, cache)
+
+    async with scrape.ensure_client(client) as client:
+        with ProcessPoolExecutor(max_workers=render_workers, initializer=_init_render_worker) as executor:
+            # The nodes are added after their dependencies, so every dependency has a task.
+            for key, node in plan.nodes.items():
+                tasks[key] = asyncio.ensure_future(run(node))
+
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    outcomes = []
+    for key in plan.jobs:
+        task = tasks[key]
+        outcomes.append(task.exception() or results.get(key))
+
+    return outcomes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan and run a manifest of shotmaps, shotzones and Understat exports.")
+    parser.add_argument("manifest")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="Print the steps of the plan without running them.")
+    args = parser.parse_args()
+
+    plan = plan_manifest(load_manifest(args.manifest))
+    stages = ", ".join(f"{count} {stage}" for stage, count in plan.stages().items())
+    print(f"{len(plan.jobs)} jobs, {len(plan.nodes)} steps: {stages}.")
+
+    if not args.dry_run:
+        from .client import UnderstatClient
+
+        async def main():
+            async with UnderstatClient() as client:
+                outcomes = await run_plan(plan, args.fetch_workers, args.render_workers, client=client)
+
+            if client.scheduler is not None:
+                print(f"{client.scheduler.stats['requests']} requests sent.")
+
+            return outcomes
+
+        outcomes = asyncio.run(main())
+        for key, outcome in zip(plan.jobs, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"Failed {key[1]}: {outcome}")
+
+        print(f"{sum(outcome is not None and not isinstance(outcome, BaseException) for outcome in outcomes)} jobs done.")
@@ -0,0 +1,222 @@
+"""This module caches the rendered figures, keyed by a hash of everything that goes into them."""
+
+import json
+import hashlib
+from pathlib import Path
+from importlib import metadata
+
+import numpy as np
+
+from .files import write_atomic
+from .instrument import instrumented, stage
+from .style import FONT_BASE_PATH, Colors, OutfitFont, PURPLE_COLORS, Font
+
+
+RENDER_CACHE_PATH = Path("./data/render_cache")
+
+# Bump when the figures change in a way the inputs of the key do not capture.
+RENDER_VERSION = 4
+
+
+def style_fingerprint():
+    """Return the style constants and the versions of the libraries that affect the rendered pixels."""
+
+    fonts = {name: [str(FONT_BASE_PATH / font.file_name), font.weight] for name, font in vars(OutfitFont).items() if isinstance(font, Font)}
+    colors = {name: value for name, value in vars(Colors).items() if not name.startswith("_")}
+
+    versions = {}
+    for package in ("matplotlib", "mplsoccer"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {"fonts": fonts, "colors": colors, "colormap": PURPLE_COLORS, "versions": versions, "render_version": RENDER_VERSION}
+
+
+def render_key(kind, shots, title, subtitle, layout="default", teams=("", ""), template=None):
+    """Return the key of a figure.
+
+    Args:
+        kind (str): "shotmap", "match" or "shotzone".
+        shots (np.ndarray): The shots drawn in the figure, as rows of `batch.SHOT_COLUMNS`.
+        title (str): The title of the figure.
+        subtitle (str): The subtitle of the figure.
+        layout (str, optional): The zone layout of a shotzone. Defaults to "default".
+        teams (tuple[str, str], optional): The home and away teams of a match.
+        template (dict, optional): The configuration of the template the figure is drawn
+            with, e.g. `shotmap.shotmap_config` for the density mode and threshold of a shotmap.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+
+    params = {
+        "kind": kind,
+        "title": title,
+        "subtitle": subtitle,
+        "layout": layout if kind == "shotzone" else None,
+        "teams": list(teams) if kind == "match" else None,
+        "template": template,
+        "shape": list(shots.shape),
+        "style": style_fingerprint(),
+    }
+
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(shots, dtype=np.float64).tobytes())
+
+    return digest.hexdigest()
+
+
+def figure_key(kind, data, title, subtitle, layout="default", template=None):
+    """Return the key of a figure drawn from the shots returned by Understat, see `render_key`."""
+
+    from .batch import shots_to_array, match_teams
+
+    if kind == "match":
+        shots = np.concatenate([shots_to_array(data["h"]), shots_to_array(data["a"], away=1)])
+        teams = match_teams(data) if len(shots) else ("", "")
+    else:
+        shots = shots_to_array(data)
+        teams = ("", "")
+
+    return render_key(kind, shots, title, subtitle, layout=layout, teams=teams, template=template)
+
+
+def output_key(key, fmt="png", **options):
+    """Return the key of a figure encoded with the given format and encoder options, see `output.encode`."""
+
+    if fmt == "png" and not options:
+        return key
+
+    params = json.dumps({"key": key, "fmt": fmt, "options": options}, sort_keys=True)
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+class RenderCache:
+    """An on-disk cache of rendered figures.
+
+    The encoded figures are stored by key, so a figure whose shots, labels, style and format
+    did not change is never drawn again.
+
+    Args:
+        path (str | Path, optional): The directory where the figures are stored.
+            Defaults to "./data/render_cache".
+    """
+
+    def __init__(self, path=RENDER_CACHE_PATH):
+        self.path = Path(path)
+
+    def _file_path(self, key):
+        return self.path / key[:2] / key
+
+    def get(self, key):
+        """Return the bytes of a cached figure, or None if it is not cached."""
+
+        try:
+            return self._file_path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, content):
+        write_atomic(self._file_path(key), content)
+
+    def restore(self, key, file_name):
+        """Copy a cached figure to `file_name`, leaving the file untouched when it is already up to date.
+
+        Returns:
+            bool: True if the figure was cached.
+        """
+
+        content = self.get(key)
+        if content is None:
+            return False
+
+        file_name = Path(file_name)
+        if not file_name.exists() or file_name.read_bytes() != content:
+            write_atomic(file_name, content)
+
+        return True
+
+
+@instrumented()
+def render_figure(key, build, cache=None, fmt="png", close=True, **options):
+    """Render a figure to bytes, skipping the rendering when it is cached.
+
+    Args:
+        key (str): The key of the figure, see `render_key`.
+        build (callable): Called without arguments on a miss to create the figure.
+        cache (RenderCache | bool, optional): The render cache. Defaults to the cache stored
+            in "./data/render_cache"; pass False to always render.
+        fmt (str, optional): One of `output.FORMATS`. The "rgba" pixels are never cached.
+            Defaults to "png".
+        close (bool, optional): Close the figure once it is encoded. Pass False when `build`
+            returns the figure of a reused template. Defaults to True.
+        **options: The options of the encoder, see `output.encode`.
+
+    Returns:
+        bytes | np.ndarray | None: The encoded figure or its pixels, or None if `build`
+            returned no figure.
+    """
+
+    from .output import render_to_buffer
+
+    if cache is None:
+        cache = RenderCache()
+
+    if fmt == "rgba":
+        cache = False
+
+    key = output_key(key, fmt, **options)
+    if cache:
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    fig = build()
+    if fig is None:
+        return
+
+    with stage("render_cache.encode"):
+        content = render_to_buffer(fig, fmt, **options)
+
+    if close:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+
+    if cache:
+        cache.set(key, content)
+
+    return content
+
+
+@instrumented()
+def save_figure(file_name, key, build, cache=None, fmt="png", close=True, **options):
+    """Save a figure to `file_name`, skipping the rendering when it is cached.
+
+    Args:
+        file_name (str): The path of the image.
+        key (str): The key of the figure, see `render_key`.
+        build (callable): Called without arguments on a miss to create the figure.
+        cache (RenderCache | bool, optional): The render cache. Defaults to the cache stored
+            in "./data/render_cache"; pass False to always render.
+        fmt (str, optional): "png", "jpeg", "webp" or "svg". Defaults to "png".
+        close (bool, optional): Close the figure once it is encoded, see `render_figure`.
+        **options: The options of the encoder, see `output.encode`.
+
+    Returns:
+        str | None: The path of the figure, or None if `build` returned no figure.
+    """
+
+    if cache is None:
+        cache = RenderCache()
+
+    if cache and cache.restore(output_key(key, fmt, **options), file_name):
+        return file_name
+
+    content = render_figure(key, build, cache=cache, fmt=fmt, close=close, **options)
+    if content is None:
+        return
+
+    write_atomic(file_name, content)
+    return file_name
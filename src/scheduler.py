@@ -0,0 +1,177 @@
+"""This module schedules the Understat requests with a rate limit, retries and in-flight deduplication."""
+
+import json
+import time
+import random
+import asyncio
+
+from .instrument import count
+
+
+DEFAULT_RATE = 10.0
+
+DEFAULT_BURST = 20
+
+DEFAULT_CONCURRENCY = 8
+
+DEFAULT_RETRIES = 4
+
+DEFAULT_BACKOFF = 0.5
+
+DEFAULT_MAX_BACKOFF = 30.0
+
+# The HTTP statuses worth retrying: rate limited, or a server that is briefly unavailable.
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    """Return True if a failed request may succeed when retried.
+
+    Connection errors and timeouts are transient, and so are the rate limit and server errors.
+    Understat answers with an HTML page when it blocks a client, which the `understat` package
+    fails to decode, so decoding errors are retried too.
+    """
+
+    if isinstance(error, (asyncio.TimeoutError, json.JSONDecodeError)):
+        return True
+
+    import aiohttp
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in TRANSIENT_STATUSES
+
+    return isinstance(error, aiohttp.ClientConnectionError)
+
+
+class TokenBucket:
+    """A token bucket allowing `rate` requests per second on average, with bursts of `burst` requests.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        burst (int): The maximum number of tokens, i.e. of requests sent at once after a pause.
+        clock (callable, optional): Return the current time in seconds. Defaults to `time.monotonic`.
+        sleep (callable, optional): Wait for a number of seconds. Defaults to `asyncio.sleep`.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=asyncio.sleep):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid token bucket: rate={rate}, burst={burst}.")
+
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+
+        self.tokens = burst
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it.
+
+        The waiters are served in order, so a steady stream of requests can not starve one.
+        """
+
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                # Sleeping for exactly the missing time can leave the token short by a rounding error.
+                if self.tokens >= 1 - 1e-9:
+                    self.tokens -= 1
+                    return
+
+                await self.sleep((1 - self.tokens) / self.rate)
+
+
+class RequestScheduler:
+    """Run requests under a rate limit and a concurrency limit, retrying the transient failures.
+
+    Identical requests made while one of them is in flight are sent once: every caller awaits
+    the same task and gets the same response. For example, ten jobs asking for the players of
+    the same league at once cause a single download.
+
+    A scheduler belongs to the event loop it is first used in.
+
+    Args:
+        rate (float, optional): The average number of requests started per second; None for
+            no rate limit. Defaults to 10.
+        burst (int, optional): The number of requests that can be started at once after a
+            pause. Defaults to 20.
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 8.
+        retries (int, optional): The number of times a transient failure is retried.
+            Defaults to 4.
+        backoff (float, optional): The delay before the first retry, in seconds. It doubles
+            after each retry, with jitter. Defaults to 0.5.
+        max_backoff (float, optional): The maximum delay between two attempts, in seconds.
+            Defaults to 30.
+        clock (callable, optional): The clock of the rate limit, see `TokenBucket`.
+        sleep (callable, optional): Wait for a number of seconds, for the rate limit and the
+            backoff. Defaults to `asyncio.sleep`.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, clock=time.monotonic, sleep=asyncio.sleep):
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep) if rate else None
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+
+        self.in_flight = {}
+
+        self.stats = {"requests": 0, "retries": 0, "deduplicated": 0}
+
+    def _delay(self, attempt):
+        # Full jitter keeps the clients that failed together from retrying together.
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1)
+
+    async def _run(self, call):
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                if self.bucket is not None:
+                    await self.bucket.acquire()
+
+                self.stats["requests"] += 1
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt == self.retries or not is_transient(e):
+                        raise
+
+            self.stats["retries"] += 1
+            count("retries")
+            await self.sleep(self._delay(attempt))
+
+    def _forget(self, key, task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+
+        # The error was raised to the callers; this keeps asyncio from logging it again.
+        if not task.cancelled():
+            task.exception()
+
+    async def submit(self, key, call):
+        """Run `call()`, or join the request with the same key that is already in flight.
+
+        Args:
+            key (str): The key of the request, see `cache.request_key`.
+            call (callable): Returns the coroutine that sends the request.
+
+        Returns:
+            The result of `call()`.
+        """
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.stats["deduplicated"] += 1
+            count("deduplicated")
+        else:
+            task = asyncio.ensure_future(self._run(call))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda task: self._forget(key, task))
+
+        # A caller that is cancelled does not cancel the request shared with the others.
+        return await asyncio.shield(task)
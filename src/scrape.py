@@ -3,264 +3,352 @@
 import json
 import asyncio
 
-import aiohttp
-import pandas as pd
-from understat import Understat
+from .client import UnderstatClient, ensure_client
+from .instrument import instrumented
+from .leagues import LEAGUES
 
 
-class LEAGUES:
-    """Leagues names used by Understat."""
+@instrumented()
+async def get_player_id(client, player_name, year="2024", league=None, fuzzy=False):
+    """Resolve a player name to its Understat ID using the client's entity index.
 
-    EPL = "EPL"
-    PREMIER_LEAGUE = EPL
-    BUNDESLIGA = "Bundesliga"
-    SERIE_A = "Serie_A"
-    LIGUE_1 = "ligue_1"
-    RFPL = "RFPL"
+    Args:
+        client (UnderstatClient): The client used to download the index entries.
+        player_name (str): The player name.
+        year (str, optional): The season. Defaults to "2024".
+        league (str, optional): The league to search. Defaults to every league in `LEAGUES`.
+        fuzzy (bool, optional): Allow accent/case-insensitive and approximate matches.
+            Defaults to False.
 
+    Returns:
+        str: The Understat ID of the player.
+    """
 
-async def get_player_id(understat, player_name, year="2024"):
-    players = await understat.get_league_players("EPL", season=year)
-    for player in players:
-        if player["player_name"] == player_name:
-            return player["id"]
+    player_id = await client.index.player_id(client, player_name, year, league=league, fuzzy=fuzzy)
+    if player_id is None:
+        raise ValueError(f"Invalid player name: '{player_name}'.")
 
-    raise ValueError(f"Invalid player name: '{player_name}'.")
+    return player_id
 
 
-async def get_math_id(understat, home_team, away_team, year="2024"):
-    season = str(year)
+@instrumented()
+async def get_team_id(client, team_name, year="2024", league=None, fuzzy=False):
+    """Resolve a team name to its Understat ID using the client's entity index."""
 
-    results = await understat.get_league_results("EPL", season=season)
-    for result in results:
-        if result["h"]["title"] == home_team and result["a"]["title"] == away_team:
-            return result["id"]
+    team_id = await client.index.team_id(client, team_name, year, league=league, fuzzy=fuzzy)
+    if team_id is None:
+        raise ValueError(f"Invalid team name: '{team_name}'.")
 
-    fixtures = await understat.get_league_fixtures("EPL", season=season)
-    for fixture in fixtures:
-        if fixture["h"]["title"] == home_team and fixture["a"]["title"] == away_team:
-            return fixture["id"]
+    return team_id
 
-    raise ValueError(f"Fixture not found for {home_team} vs {away_team}.")
 
+@instrumented()
+async def get_math_id(client, home_team, away_team, year="2024", league=None, fuzzy=False):
+    """Resolve a fixture to its Understat match ID using the client's entity index."""
 
-async def get_teams(league, year="2024"):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
-
-        season = str(year)
-        return await understat.get_teams(league, season=season)
+    match_id = await client.index.match_id(client, home_team, away_team, year, league=league, fuzzy=fuzzy)
+    if match_id is None:
+        raise ValueError(f"Fixture not found for {home_team} vs {away_team}.")
 
+    return match_id
 
-async def get_league_fixtures(year="2024"):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
 
+@instrumented()
+async def get_teams(league, year="2024", client=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        return await understat.get_league_fixtures("EPL", season=season)
+        return await client.get_teams(league, season=season)
+
 
+@instrumented()
+async def get_league_fixtures(year="2024", client=None, league=LEAGUES.EPL):
+    async with ensure_client(client) as client:
+        season = str(year)
+        return await client.get_league_fixtures(league, season=season)
 
-async def get_player_shots_data(player_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
 
+@instrumented()
+async def get_player_shots_data(player_name, year, client=None, league=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        player_id = await get_player_id(understat, player_name, year=season)
-        player_shots = await understat.get_player_shots(
+        player_id = await get_player_id(client, player_name, year=season, league=league)
+        player_shots = await client.get_player_shots(
             player_id=player_id,
             season=season
         )
         return player_shots
 
 
-async def get_player_data(player_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
-
+@instrumented()
+async def get_player_data(player_name, year, client=None, league=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        player_id = await get_player_id(understat, player_name, year=season)
-        player_shots = await understat.get_player_stats(
+        player_id = await get_player_id(client, player_name, year=season, league=league)
+        player_shots = await client.get_player_stats(
             player_id=player_id
         )
 
         return player_shots
 
 
-async def get_player_grouped_data(player_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
-
+@instrumented()
+async def get_player_grouped_data(player_name, year, client=None, league=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        players = await understat.get_league_players("EPL", season=season)
-        player_id = None
-        for player in players:
-            if player["player_name"] == player_name:
-                player_id = player["id"]
-                break
-
-        if not player_id:
-            raise ValueError(f"Invalid player name: '{player_name}'.")
-
-        player_shots = await understat.get_player_grouped_stats(
+        player_id = await get_player_id(client, player_name, year=season, league=league)
+        player_shots = await client.get_player_grouped_stats(
             player_id=player_id
         )
 
         return player_shots
 
 
-async def get_player_matches(player_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
-
+@instrumented()
+async def get_player_matches(player_name, year, client=None, league=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        player_id = await get_player_id(understat, player_name, year=season)
-        player_shots = await understat.get_player_matches(
+        player_id = await get_player_id(client, player_name, year=season, league=league)
+        player_shots = await client.get_player_matches(
             player_id=player_id
         )
 
         return player_shots
 
 
-async def get_match_stats(home_team, away_team, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
+@instrumented()
+async def get_match_stats(home_team, away_team, year, client=None, league=None):
+    async with ensure_client(client) as client:
+        season = str(year)
+        fixture_id = await get_math_id(client, home_team, away_team, year=season, league=league)
+        fixture_data = await client.get_match_stats(fixture_id)
+        return fixture_data
+
 
+@instrumented()
+async def get_match_shots(home_team, away_team, year, client=None, league=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        fixture_id = await get_math_id(understat, home_team, away_team, year=season)
-        fixture_data = await understat.get_match_stats(fixture_id)
+        fixture_id = await get_math_id(client, home_team, away_team, year=season, league=league)
+        fixture_data = await client.get_match_shots(fixture_id)
         return fixture_data
 
 
-async def get_match_shots(home_team, away_team, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
+@instrumented()
+async def get_match_bundle(home_team, away_team, year, client=None, league=None):
+    """Fetch the shots and the stats of a match together.
 
+    The match ID is resolved once, then the shots and the stats are requested concurrently
+    on the same client.
+
+    Args:
+        home_team (str): The name of the home team.
+        away_team (str): The name of the away team.
+        year (str): The season.
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            one-shot client.
+        league (str, optional): The league searched for the match. Defaults to every league
+            in `LEAGUES`.
+
+    Returns:
+        tuple[dict, dict]: The shots and the stats of the match.
+    """
+
+    async with ensure_client(client) as client:
         season = str(year)
-        fixture_id = await get_math_id(understat, home_team, away_team, year=season)
-        fixture_data = await understat.get_match_shots(fixture_id)
-        return fixture_data
+        fixture_id = await get_math_id(client, home_team, away_team, year=season, league=league)
 
+        shots, stats = await asyncio.gather(
+            client.get_match_shots(fixture_id),
+            client.get_match_stats(fixture_id)
+        )
+        return shots, stats
 
-async def get_team_stats(team_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
 
+@instrumented()
+async def get_team_stats(team_name, year, client=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        team_stats = await understat.get_team_stats(team_name, season=season)
+        team_stats = await client.get_team_stats(team_name, season=season)
         return team_stats
 
 
-async def get_teams_players(team_name, year):
-    async with aiohttp.ClientSession() as session:
-        understat = Understat(session)
+@instrumented()
+async def get_team_results(team_name, year, client=None):
+    async with ensure_client(client) as client:
+        season = str(year)
+        team_results = await client.get_team_results(team_name, season=season)
+        return team_results
+
+
+def get_team_side(result, team_name):
+    """Return the side, "h" or "a", of a team in one of its results."""
+
+    if result.get("side") in ("h", "a"):
+        return result["side"]
+
+    for side in ("h", "a"):
+        if result[side]["title"] == team_name:
+            return side
+
+    raise ValueError(f"{team_name} did not play in match {result['id']}.")
 
+
+@instrumented()
+async def get_team_shots_data(team_name, year, client=None):
+    """Fetch the shots of a team in every match it played in a season.
+
+    The results of the team are requested once, then the shots of all its matches are
+    requested concurrently on the same client, whose scheduler keeps to the rate limit. Only
+    the shots of the team's side of each match are kept.
+
+    Args:
+        team_name (str): The name of the team, e.g. "Liverpool".
+        year (str): The season.
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            one-shot client.
+
+    Returns:
+        list[dict]: The shots of the team, in the order of its matches.
+    """
+
+    async with ensure_client(client) as client:
+        season = str(year)
+        results = await client.get_team_results(team_name, season=season)
+
+        matches = await asyncio.gather(*(client.get_match_shots(result["id"]) for result in results))
+
+        shots = []
+        for result, match in zip(results, matches):
+            shots.extend(match[get_team_side(result, team_name)])
+
+        return shots
+
+
+@instrumented()
+async def get_teams_players(team_name, year, client=None):
+    async with ensure_client(client) as client:
         season = str(year)
-        team_stats = await understat.get_team_players(team_name, season=season)
+        team_stats = await client.get_team_players(team_name, season=season)
         return team_stats
 
 
-async def generate_teams(league=LEAGUES.EPL, year="2024"):
+async def generate_teams(league=LEAGUES.EPL, year="2024", client=None):
     file_name = f"./data/{league.lower()}_teams_{year}_understat.json"
 
-    data = await get_teams(league, year)
+    data = await get_teams(league, year, client=client)
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
     return file_name
 
 
-async def generate_league_fixtures(year):
-    file_name = f"./data/{LEAGUES.PREMIER_LEAGUE.lower()}_{year}_fixtures_understat.csv"
+async def generate_league_fixtures(year, client=None, fmt="csv", league=LEAGUES.EPL):
+    file_name = f"./data/{league.lower()}_{year}_fixtures_understat.csv"
 
-    data = await get_league_fixtures(year)
-    df = pd.json_normalize(data)
-    df.to_csv(file_name, index=False)
+    data = await get_league_fixtures(year, client=client, league=league)
 
-    return file_name
+    from .storage import write_csv, write_dataset
+    if fmt != "csv":
+        return write_dataset(data, "fixtures", league, year, "fixtures", fmt=fmt)
+
+    return write_csv(data, file_name)
 
 
-async def generate_player_shot_data(player_name, year):
+async def generate_player_shot_data(player_name, year, client=None, fmt="csv", league=LEAGUES.EPL):
     normalized_player_name = player_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_player_name}_{year}_shotdata_understat.csv"
 
-    data = await get_player_shots_data(player_name, year)
-    df = pd.json_normalize(data)
-    df.to_csv(file_name, index=False)
+    data = await get_player_shots_data(player_name, year, client=client, league=league)
 
-    return file_name
+    from .storage import write_csv, write_dataset
+    if fmt != "csv":
+        return write_dataset(data, "shots", league, year, normalized_player_name, fmt=fmt)
 
+    return write_csv(data, file_name)
 
-async def generate_player_data(player_name, year):
+
+async def generate_player_data(player_name, year, client=None, fmt="csv", league=LEAGUES.EPL):
     normalized_player_name = player_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_player_name}_{year}_stats_understat.csv"
 
-    data = await get_player_data(player_name, year)
-    df = pd.json_normalize(data)
-    df.to_csv(file_name, index=False)
+    data = await get_player_data(player_name, year, client=client, league=league)
 
-    return file_name
+    from .storage import write_csv, write_dataset
+    if fmt != "csv":
+        return write_dataset(data, "player_stats", league, year, normalized_player_name, fmt=fmt)
+
+    return write_csv(data, file_name)
 
 
-async def generate_player_group_data(player_name, year):
+async def generate_player_group_data(player_name, year, client=None, league=LEAGUES.EPL):
     normalized_player_name = player_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_player_name}_{year}_group_stats_understat.json"
 
-    data = await get_player_grouped_data(player_name, year)
+    data = await get_player_grouped_data(player_name, year, client=client, league=league)
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
     return file_name
 
 
-async def generate_player_matches(player_name, year):
+async def generate_player_matches(player_name, year, client=None, fmt="csv", league=LEAGUES.EPL):
     normalized_player_name = player_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_player_name}_{year}_matches_understat.csv"
 
-    data = await get_player_matches(player_name, year)
-    df = pd.json_normalize(data)
-    df.to_csv(file_name, index=False)
+    data = await get_player_matches(player_name, year, client=client, league=league)
 
-    return file_name
+    from .storage import write_csv, write_dataset
+    if fmt != "csv":
+        return write_dataset(data, "player_matches", league, year, normalized_player_name, fmt=fmt)
+
+    return write_csv(data, file_name)
 
 
-async def generate_match_stats(home_team, away_team, year):
+async def generate_match_stats(home_team, away_team, year, client=None, league=LEAGUES.EPL):
     normalized_match_name = f"{home_team}_{away_team}".replace(" ", "_").lower()
     file_name = f"./data/{normalized_match_name}_{year}_stats_understat.json"
 
-    data = await get_match_stats(home_team, away_team, year)
+    data = await get_match_stats(home_team, away_team, year, client=client, league=league)
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
     return file_name
 
 
-async def generate_match_shots(home_team, away_team, year):
+async def generate_match_shots(home_team, away_team, year, client=None, fmt="json", league=LEAGUES.EPL):
     normalized_match_name = f"{home_team}_{away_team}".replace(" ", "_").lower()
     file_name = f"./data/{normalized_match_name}_{year}_shots_understat.json"
 
-    data = await get_match_shots(home_team, away_team, year)
+    data = await get_match_shots(home_team, away_team, year, client=client, league=league)
+
+    if fmt != "json":
+        from .storage import write_dataset
+
+        # Both sides are stored in one table, the "h_a" column tells them apart.
+        return write_dataset([*data["h"], *data["a"]], "shots", league, year, normalized_match_name, fmt=fmt)
+
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
     return file_name
 
 
-async def generate_team_stats(team_name, year):
+async def generate_team_stats(team_name, year, client=None):
     normalized_team_name = team_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_team_name}_{year}_stats_understat.json"
 
-    data = await get_team_stats(team_name, year)
+    data = await get_team_stats(team_name, year, client=client)
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
     return file_name
 
 
-async def generate_teams_players(team_name, year):
+async def generate_teams_players(team_name, year, client=None):
     normalized_team_name = team_name.replace(" ", "_").lower()
     file_name = f"./data/{normalized_team_name}_{year}_players_understat.json"
 
-    data = await get_teams_players(team_name, year)
+    data = await get_teams_players(team_name, year, client=client)
     with open(file_name, 'w') as fp:
         json.dump(data, fp, indent=2)
 
@@ -274,13 +362,17 @@ if __name__ == "__main__":
     home_team = "Liverpool"
     away_team = "Everton"
 
-    asyncio.run(generate_teams(LEAGUES.EPL, year))
-    asyncio.run(generate_player_shot_data(player_name, year))
-    asyncio.run(generate_player_data(player_name, year))
-    asyncio.run(generate_player_group_data(player_name, year))
-    asyncio.run(generate_player_matches(player_name, year))
-    asyncio.run(generate_league_fixtures(year))
-    asyncio.run(generate_match_stats(home_team, away_team, year))
-    asyncio.run(generate_match_shots(home_team, away_team, year))
-    asyncio.run(generate_team_stats(home_team, year))
-    asyncio.run(generate_teams_players(home_team, year))
+    async def main():
+        async with UnderstatClient() as client:
+            await generate_teams(LEAGUES.EPL, year, client=client)
+            await generate_player_shot_data(player_name, year, client=client)
+            await generate_player_data(player_name, year, client=client)
+            await generate_player_group_data(player_name, year, client=client)
+            await generate_player_matches(player_name, year, client=client)
+            await generate_league_fixtures(year, client=client)
+            await generate_match_stats(home_team, away_team, year, client=client)
+            await generate_match_shots(home_team, away_team, year, client=client)
+            await generate_team_stats(home_team, year, client=client)
+            await generate_teams_players(home_team, year, client=client)
+
+    asyncio.run(main())
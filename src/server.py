@@ -0,0 +1,343 @@
+"""This module serves the shotmaps and shotzones over HTTP, keeping the hot figures in memory."""
+
+import os
+import time
+import asyncio
+import argparse
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import DEFAULT_TTL
+from .leagues import LEAGUES
+from .output import CONTENT_TYPES
+from .shotmap import fetch_player_shotmap_data, fetch_team_shotmap_data, fetch_match_shotmap_data
+from .shotzone import fetch_player_shotzone_data, fetch_team_shotzone_data
+
+
+DEFAULT_HOST = "127.0.0.1"
+
+DEFAULT_PORT = 8080
+
+# The total size of the encoded figures kept in memory, in bytes.
+DEFAULT_IMAGE_CACHE_SIZE = 128 * 1024 * 1024
+
+# The number of fetched shot lists kept in memory.
+DEFAULT_DATA_CACHE_SIZE = 256
+
+# The endpoints: the kind of figure, the required query parameters and the coroutine
+# returning the shots, the title and the subtitle of the figure.
+ROUTES = {
+    "/shotmap/player": ("shotmap", ("player", "year"), fetch_player_shotmap_data),
+    "/shotmap/team": ("shotmap", ("team", "year"), fetch_team_shotmap_data),
+    "/shotmap/match": ("match", ("home", "away", "year"), fetch_match_shotmap_data),
+    "/shotzone/player": ("shotzone", ("player", "year"), fetch_player_shotzone_data),
+    "/shotzone/team": ("shotzone", ("team", "year"), fetch_team_shotzone_data),
+}
+
+# The encoder options accepted in the query string, see `output.encode`.
+OPTIONS = {
+    "compress_level": int,
+    "quality": int,
+    "lossless": lambda value: value.lower() in ("1", "true", "yes"),
+}
+
+
+class NotFoundError(LookupError):
+    """Raised when the player, team or fixture of a request does not exist or has no shots."""
+
+
+class LRUCache:
+    """An in-memory cache evicting the least recently used values, bounded by their total size.
+
+    Args:
+        max_size (int): The maximum total size of the values.
+        sizeof (callable, optional): Return the size of a value. Defaults to 1 for every value,
+            i.e. the cache holds at most `max_size` values.
+        ttl (float, optional): The number of seconds a value is kept; None to keep it until it
+            is evicted. Defaults to None.
+    """
+
+    def __init__(self, max_size, sizeof=None, ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.ttl = ttl
+        self.clock = clock
+
+        self.size = 0
+        self._entries = OrderedDict()
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and self.clock() - entry[2] > self.ttl:
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def set(self, key, value):
+        if key in self._entries:
+            self._remove(key)
+
+        # A value larger than the whole cache would only evict everything else.
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+
+        self._entries[key] = (value, size, self.clock())
+        self.size += size
+
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+
+def parse_options(query):
+    """Return the encoder options found in a query string, see `OPTIONS`."""
+
+    options = {}
+    for name, parse in OPTIONS.items():
+        if name in query:
+            try:
+                options[name] = parse(query[name])
+            except ValueError:
+                raise ValueError(f"Invalid {name}: '{query[name]}'.") from None
+
+    return options
+
+
+class RenderService:
+    """An HTTP service returning the shotmaps and shotzones as images.
+
+    The figures are rendered in a pool of worker processes, so the event loop keeps serving
+    while a figure is drawn, and each worker reuses its templates. Identical requests made
+    while a figure is being fetched or rendered wait for the same result instead of starting
+    their own. The encoded figures and the fetched shots are kept in size-bounded LRU caches,
+    so a hot figure is returned without fetching or drawing anything:
+
+        GET /shotmap/player?player=Mohamed Salah&year=2024
+        GET /shotmap/match?home=West Ham&away=Liverpool&year=2024&fmt=webp&quality=80
+        GET /shotzone/player?player=Mohamed Salah&year=2024&layout=detailed
+        GET /shotmap/player?player=Florian Wirtz&year=2024&league=Bundesliga
+
+    Args:
+        workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        image_cache_size (int, optional): The total size of the figures kept in memory, in
+            bytes. Defaults to 128 MiB.
+        data_cache_size (int, optional): The number of shot lists kept in memory.
+            Defaults to 256.
+        ttl (float, optional): The number of seconds a figure or a shot list is kept in
+            memory, as the shots of the current season change. Defaults to 6 hours.
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            client with the default response cache and scheduler, closed with the service.
+        cache (RenderCache | bool, optional): The on-disk render cache, see
+            `render_cache.render_figure`. Defaults to the cache stored in "./data/render_cache".
+    """
+
+    def __init__(self, workers=None, image_cache_size=DEFAULT_IMAGE_CACHE_SIZE, data_cache_size=DEFAULT_DATA_CACHE_SIZE, ttl=DEFAULT_TTL, client=None, cache=None):
+        self.workers = workers or os.cpu_count()
+        self.images = LRUCache(image_cache_size, sizeof=len, ttl=ttl)
+        self.data = LRUCache(data_cache_size, ttl=ttl)
+        self.client = client
+        self.cache = cache
+
+        self.executor = None
+        self._owns_client = client is None
+
+        self._renders = {}
+        self._fetches = {}
+
+        self.stats = {"requests": 0, "renders": 0, "fetches": 0, "coalesced": 0}
+
+    async def start(self, app=None):
+        from .batch import _init_render_worker
+        from .client import UnderstatClient
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_render_worker)
+
+        if self.client is None:
+            self.client = UnderstatClient()
+
+    async def close(self, app=None):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+        if self._owns_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def _single_flight(self, in_flight, key, call):
+        # Same as `RequestScheduler.submit`: one task per key, shielded from the callers.
+        task = in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(call())
+            in_flight[key] = task
+            task.add_done_callback(lambda task: self._forget(in_flight, key, task))
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _forget(in_flight, key, task):
+        if in_flight.get(key) is task:
+            del in_flight[key]
+
+        if not task.cancelled():
+            task.exception()
+
+    async def fetch(self, path, args, league=LEAGUES.EPL):
+        """Return the shots, the title and the subtitle of the figure of an endpoint."""
+
+        _, _, fetch = ROUTES[path]
+
+        key = (fetch.__name__, args, league)
+        entry = self.data.get(key)
+        if entry is not None:
+            return entry
+
+        async def call():
+            await self.start()
+
+            self.stats["fetches"] += 1
+            try:
+                entry = await fetch(*args, client=self.client, league=league)
+            except ValueError as e:
+                # The names are resolved while fetching.
+                raise NotFoundError(str(e)) from e
+
+            self.data.set(key, entry)
+            return entry
+
+        return await self._single_flight(self._fetches, key, call)
+
+    async def render(self, path, args, layout="default", fmt="png", options=None, league=LEAGUES.EPL):
+        """Return the encoded figure of an endpoint.
+
+        Args:
+            path (str): The endpoint, one of `ROUTES`.
+            args (tuple): The values of its query parameters, e.g. ("Mohamed Salah", "2024").
+            layout (str, optional): The zone layout of a shotzone. Defaults to "default".
+            fmt (str, optional): "png", "jpeg", "webp" or "svg". Defaults to "png".
+            options (dict, optional): The options of the encoder, see `output.encode`.
+            league (str, optional): The league the names are searched in and shown in the
+                subtitle. Defaults to "EPL".
+
+        Raises:
+            NotFoundError: If the player, team or fixture does not exist or has no shots.
+        """
+
+        options = options or {}
+
+        key = (path, args, layout, fmt, tuple(sorted(options.items())), league)
+        content = self.images.get(key)
+        if content is not None:
+            return content
+
+        async def call():
+            from .batch import render_data
+
+            data, title, subtitle = await self.fetch(path, args, league)
+            if len(data) == 0:
+                raise NotFoundError("No shots found.")
+
+            kind, _, _ = ROUTES[path]
+            loop = asyncio.get_running_loop()
+            render = functools.partial(render_data, kind, data, title, subtitle, layout, fmt, cache=self.cache, **options)
+            content = await loop.run_in_executor(self.executor, render)
+
+            self.stats["renders"] += 1
+            self.images.set(key, content)
+            return content
+
+        return await self._single_flight(self._renders, key, call)
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        self.stats["requests"] += 1
+
+        _, params, _ = ROUTES[request.path]
+        missing = [name for name in params if not request.query.get(name)]
+        if missing:
+            raise web.HTTPBadRequest(text=f"Missing query parameters: {', '.join(missing)}.")
+
+        fmt = request.query.get("fmt", "png")
+        if fmt not in CONTENT_TYPES:
+            raise web.HTTPBadRequest(text=f"Invalid format: '{fmt}'. Expected one of {', '.join(CONTENT_TYPES)}.")
+
+        try:
+            options = parse_options(request.query)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        league = request.query.get("league", LEAGUES.EPL)
+        if league not in LEAGUES.all():
+            raise web.HTTPBadRequest(text=f"Invalid league: '{league}'. Expected one of {', '.join(LEAGUES.all())}.")
+
+        args = tuple(request.query[name] for name in params)
+        try:
+            content = await self.render(request.path, args, request.query.get("layout", "default"), fmt, options, league)
+        except NotFoundError as e:
+            raise web.HTTPNotFound(text=str(e))
+        except ValueError as e:
+            # E.g. an invalid zone layout, raised by the worker.
+            raise web.HTTPBadRequest(text=str(e))
+
+        return web.Response(body=content, content_type=CONTENT_TYPES[fmt])
+
+    async def handle_stats(self, request):
+        from aiohttp import web
+
+        return web.json_response({
+            **self.stats,
+            "images": {**self.images.stats, "entries": len(self.images), "size": self.images.size},
+            "data": {**self.data.stats, "entries": len(self.data)},
+        })
+
+    def app(self):
+        """Return the `aiohttp` application of the service, started and closed with it."""
+
+        from aiohttp import web
+
+        app = web.Application()
+        for path in ROUTES:
+            app.router.add_get(path, self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.close)
+
+        return app
+
+
+if __name__ == "__main__":
+    from aiohttp import web
+
+    parser = argparse.ArgumentParser(description="Serve the shotmaps and shotzones over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--image-cache-size", type=int, default=DEFAULT_IMAGE_CACHE_SIZE, help="The size of the in-memory figures cache, in bytes.")
+    parser.add_argument("--data-cache-size", type=int, default=DEFAULT_DATA_CACHE_SIZE, help="The number of shot lists kept in memory.")
+    args = parser.parse_args()
+
+    service = RenderService(args.workers, args.image_cache_size, args.data_cache_size)
+    web.run_app(service.app(), host=args.host, port=args.port)
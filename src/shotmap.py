@@ -2,17 +2,38 @@
 
 import asyncio
 
-from .utils import prepare_shot_data, calculate_shots_stats, get_season_label
-from .scrape import get_player_shots_data, get_match_shots, get_match_stats
+from .utils import prepare_shot_data, calculate_shots_stats, get_season_label, get_league_label, add_stats_section
+from .leagues import LEAGUES
+from .scrape import get_player_shots_data, get_match_bundle, get_team_shots_data
 from .style import OutfitFont, Colors
+from .render_cache import figure_key, render_figure, save_figure
+from .output import FILE_EXTENSIONS
+from .instrument import instrumented
 
-import matplotlib.pyplot as plt
-from mplsoccer import Pitch, VerticalPitch
+import numpy as np
+
+
+# Above this number of shots, the shotmap draws their density instead of one marker per shot.
+DENSITY_THRESHOLD = 2000
+
+DENSITY_MODES = ("grid", "kde", "hexbin")
+
+# The number of cells along the length (X) and the width (Y) of the attacking half.
+DENSITY_BINS = (25, 40)
+
+# The standard deviation of the "kde" smoothing, in cells of a grid twice as fine.
+KDE_SIGMA = 1.5
+
+
+def shotmap_config(density_threshold=DENSITY_THRESHOLD, density="grid", bins=DENSITY_BINS):
+    """Return the options of a `ShotmapTemplate` that change the drawn figure, see `render_cache.render_key`."""
+
+    return {"density_threshold": density_threshold, "density": density, "bins": list(bins), "kde_sigma": KDE_SIGMA}
 
 
 def add_header_section(ax, title, subtitle):
-    ax.text(x=0.5, y=0.8, s=title, fontsize=24, fontproperties=OutfitFont.BLACK, color=Colors.MAIN, ha="center")
-    ax.text(x=0.5, y=0.65, s=subtitle, fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+    title_text = ax.text(x=0.5, y=0.8, s=title, fontsize=24, fontproperties=OutfitFont.BLACK, color=Colors.MAIN, ha="center")
+    subtitle_text = ax.text(x=0.5, y=0.65, s=subtitle, fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
 
     ax.text(x=0.25, y=0.45, s=f"Low Quality Chance", fontsize=12, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
 
@@ -24,8 +45,14 @@ def add_header_section(ax, title, subtitle):
         { "x": 0.54, "y": 0.48, "s": 400 },
         { "x": 0.60, "y": 0.48, "s": 500 }
     ]
-    for point in points:
-        ax.scatter(x=point["x"], y=point["y"], s=point["s"], color=Colors.BACKGROUND, edgecolor=Colors.MAIN, linewidth=0.8)
+    ax.scatter(
+        x=[point["x"] for point in points],
+        y=[point["y"] for point in points],
+        s=[point["s"] for point in points],
+        color=Colors.BACKGROUND,
+        edgecolor=Colors.MAIN,
+        linewidth=0.8
+    )
 
     ax.text(x=0.75, y=0.45, s="High Quality Chance", fontsize=12, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
 
@@ -35,185 +62,518 @@ def add_header_section(ax, title, subtitle):
     ax.scatter(x=0.53, y=0.26, s=100, color=Colors.BACKGROUND, edgecolor=Colors.MAIN, linewidth=0.8)
     ax.text(x=0.55, y=0.23, s="No Goal", fontsize=10, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="left")
 
+    return title_text, subtitle_text
+
 
 def add_average_distance_section(ax, average_distance):
-    ax.scatter(x=90, y=average_distance, s=100, color=Colors.MAIN, linewidth=0.8)
-    ax.plot([90, 90], [100, average_distance], color=Colors.MAIN, linewidth=2)
-    ax.text(x=90, y=average_distance - 4, s=f"Average Distance\n{average_distance:.1f} meters", fontsize=10, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+    point = ax.scatter(x=90, y=average_distance, s=100, color=Colors.MAIN, linewidth=0.8)
+    line, = ax.plot([90, 90], [100, average_distance], color=Colors.MAIN, linewidth=2)
+    text = ax.text(x=90, y=average_distance - 4, s=f"Average Distance\n{average_distance:.1f} meters", fontsize=10, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
 
+    return point, line, text
 
-def create_shotmap_fig_form_data(data, title="Shotmap", subtitle="All shots"):
-    if len(data) == 0:
-        return
 
-    df = prepare_shot_data(data)
-    stats = calculate_shots_stats(df)
-
-    fig = plt.figure(figsize=(8, 12))
-    fig.patch.set_facecolor(Colors.BACKGROUND)
-
-    ax1 = fig.add_axes([0, 0.7, 1, .2])
-    ax1.set_facecolor(Colors.BACKGROUND)
-    ax1.set_xlim(0, 1)
-    ax1.set_ylim(0, 1)
-    add_header_section(ax1, title, subtitle)
-    ax1.set_axis_off()
-
-    ax2 = fig.add_axes([.05, 0.25, 0.9, .5])
-    ax2.set_facecolor(Colors.BACKGROUND)
-
-    pitch = VerticalPitch(
-        pitch_type="opta",
-        half=True,
-        corner_arcs=True,
-        pitch_color=Colors.BACKGROUND,
-        line_color=Colors.MAIN,
-        pad_bottom=0.25,
-    )
-    pitch.draw(ax=ax2)
+def update_average_distance_section(artists, average_distance):
+    point, line, text = artists
 
-    add_average_distance_section(ax2, stats["points_average_distance"])
+    point.set_offsets([[90, average_distance]])
+    line.set_ydata([100, average_distance])
+    text.set_position((90, average_distance - 4))
+    text.set_text(f"Average Distance\n{average_distance:.1f} meters")
 
-    for x in df.to_dict(orient="records"):
-        color=Colors.ACCENT if x["result"] == "Goal" else Colors.BACKGROUND,
-        pitch.scatter(x["X"], x["Y"], s=300 * x["xG"], color=color, ax=ax2, alpha=0.7, linewidth=0.8, edgecolor=Colors.MAIN)
 
-    ax2.set_axis_off()
+def _shot_colors(goals):
+    return np.where(np.asarray(goals, dtype=bool), Colors.ACCENT, Colors.BACKGROUND)
 
-    # Add another axis for the stats
-    ax3 = fig.add_axes([0, .2, 1, .05])
-    ax3.set_facecolor(Colors.BACKGROUND)
-    ax3.set_xlim(0, 1)
-    ax3.set_ylim(0, 1)
 
-    stats = [
-        {"text": "Shots", "value": f"{stats["total_shots"]}", "x": 0.2},
-        {"text": "Goals", "value": f"{stats["total_goals"]}", "x": 0.4},
-        {"text": "xG", "value": f"{stats["total_xG"]:.2f}", "x": 0.6},
-        {"text": "xG/Shot", "value": f"{stats["xG_per_shot"]:.2f}", "x": 0.8}
-    ]
-    for stat in stats:
-        ax3.text(x=stat["x"], y=0.5, s=stat["text"], fontsize=20, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
-        ax3.text(x=stat["x"], y=0, s=stat["value"], fontsize=16, fontproperties=OutfitFont.BOLD, color=Colors.ACCENT, ha="center")
+def add_shots(pitch, ax, x, y, xG, goals):
+    """Draws all the shots with a single scatter collection.
+
+    The marker size grows with the xG and goals are filled with the accent color. The shots
+    keep their order, so overlapping markers look the same as when drawn one by one.
+    """
+
+    return pitch.scatter(np.asarray(x), np.asarray(y), s=300 * np.asarray(xG), color=_shot_colors(goals), ax=ax, alpha=0.7, linewidth=0.8, edgecolor=Colors.MAIN)
+
+
+def update_shots(pitch, collection, x, y, xG, goals):
+    """Replaces the shots drawn by `add_shots` with new ones."""
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if pitch.vertical:
+        x, y = y, x
+
+    collection.set_offsets(np.column_stack([x, y]))
+    collection.set_sizes(300 * np.asarray(xG, dtype=float))
+    collection.set_facecolor(_shot_colors(goals))
+
+
+def _density_edges(bins):
+    # The shotmap shows the attacking half, in opta units.
+    return np.linspace(50, 100, bins[0] + 1), np.linspace(0, 100, bins[1] + 1)
+
+
+def _smooth(values, sigma):
+    radius = max(int(3 * sigma), 1)
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    kernel /= kernel.sum()
+
+    # The gaussian kernel is separable, so the grid is smoothed along each axis in turn.
+    values = np.apply_along_axis(np.convolve, 0, values, kernel, mode="same")
+    return np.apply_along_axis(np.convolve, 1, values, kernel, mode="same")
+
+
+def calculate_shots_density(x, y, bins=DENSITY_BINS, smooth=False):
+    """Counts the shots in each cell of a grid over the attacking half.
+
+    The shots are binned by one vectorized histogram, so the cost grows slowly with the number
+    of shots and the result has the same size whatever their number.
+
+    Args:
+        x, y (array-like): The coordinates of the shots, in opta units.
+        bins (tuple[int, int], optional): The number of cells along X and Y.
+        smooth (bool, optional): Smooth the counts with a gaussian kernel, an approximation of
+            a kernel density estimate. Defaults to False.
+
+    Returns:
+        np.ndarray: The (bins[0], bins[1]) counts, the rows following X.
+    """
+
+    x_edges, y_edges = _density_edges(bins)
+    counts, _, _ = np.histogram2d(np.asarray(x, dtype=float), np.asarray(y, dtype=float), bins=[x_edges, y_edges])
+
+    if smooth:
+        counts = _smooth(counts, KDE_SIGMA)
+
+    return counts
+
+
+def add_density(ax, bins=DENSITY_BINS):
+    """Adds an empty, hidden density grid below the pitch lines of a vertical half pitch."""
+
+    # The colormap imports matplotlib, so it is only loaded when a template is built.
+    from .style import PURPLE_COLORMAP
+
+    x_edges, y_edges = _density_edges(bins)
+
+    # The pitch is vertical: X runs along the vertical axis and Y along the horizontal one.
+    mesh = ax.pcolormesh(y_edges, x_edges, np.ma.masked_all(bins), cmap=PURPLE_COLORMAP.reversed(), zorder=0.8)
+    mesh.set_visible(False)
+
+    return mesh
+
+
+def update_density(mesh, counts):
+    """Shows new counts on a grid drawn by `add_density`, leaving the empty cells transparent."""
+
+    threshold = counts.max() * 1e-3
+    mesh.set_array(np.ma.masked_less_equal(counts, threshold))
+    mesh.set_clim(0, max(counts.max(), 1))
+    mesh.set_visible(True)
+
+
+class ShotmapTemplate:
+    """A player shotmap figure whose static parts are built once.
+
+    The pitch, the legend and the labels are drawn when the template is created. Rendering
+    new data only updates the shots, the average distance and the texts, so the same figure
+    can be saved for many players:
+
+        template = ShotmapTemplate()
+        for player_name, data in shots.items():
+            template.render(data, title=player_name).savefig(...)
+
+    Above `density_threshold` shots, e.g. for a team or a league, the shots are binned and
+    their density is drawn instead of one marker each, so the drawing time stays the same
+    whatever the number of shots. The header, the legend and the stats are kept.
+
+    Args:
+        density_threshold (int, optional): The number of shots above which the density is
+            drawn; None to always draw the markers. Defaults to 2000.
+        density (str, optional): "grid" for the counts per cell, "kde" for smoothed counts
+            or "hexbin" for hexagonal cells. Defaults to "grid".
+        bins (tuple[int, int], optional): The number of cells along X and Y, see
+            `calculate_shots_density`. Defaults to (25, 40).
+    """
+
+    @instrumented("shotmap.build_template")
+    def __init__(self, density_threshold=DENSITY_THRESHOLD, density="grid", bins=DENSITY_BINS):
+        if density not in DENSITY_MODES:
+            raise ValueError(f"Invalid density: '{density}'. Expected one of {', '.join(DENSITY_MODES)}.")
+
+        self.density_threshold = density_threshold
+        self.density = density
+        self.bins = bins
+
+        # matplotlib and mplsoccer are only imported when a figure is built.
+        import matplotlib.pyplot as plt
+        from mplsoccer import VerticalPitch
+
+        self.fig = plt.figure(figsize=(8, 12))
+        # The label identifies the layout, see `output.fixed_bbox`.
+        self.fig.set_label("shotmap")
+        self.fig.patch.set_facecolor(Colors.BACKGROUND)
+
+        ax1 = self.fig.add_axes([0, 0.7, 1, .2])
+        ax1.set_facecolor(Colors.BACKGROUND)
+        ax1.set_xlim(0, 1)
+        ax1.set_ylim(0, 1)
+        self.title, self.subtitle = add_header_section(ax1, "", "")
+        ax1.set_axis_off()
+
+        ax2 = self.fig.add_axes([.05, 0.25, 0.9, .5])
+        ax2.set_facecolor(Colors.BACKGROUND)
+
+        self.pitch = VerticalPitch(
+            pitch_type="opta",
+            half=True,
+            corner_arcs=True,
+            pitch_color=Colors.BACKGROUND,
+            line_color=Colors.MAIN,
+            pad_bottom=0.25,
+        )
+        self.pitch.draw(ax=ax2)
+
+        self.average_distance = add_average_distance_section(ax2, 0)
+        self.shots = add_shots(self.pitch, ax2, [], [], [], [])
+
+        # The "kde" grid is twice as fine, then smoothed.
+        self.density_bins = tuple(2 * n for n in bins) if density == "kde" else bins
+        self.density_mesh = add_density(ax2, self.density_bins) if density != "hexbin" else None
+        self.hexbin = []
+
+        ax2.set_axis_off()
+        self.ax = ax2
+
+        # Add another axis for the stats
+        ax3 = self.fig.add_axes([0, .2, 1, .05])
+        ax3.set_facecolor(Colors.BACKGROUND)
+        ax3.set_xlim(0, 1)
+        ax3.set_ylim(0, 1)
+
+        self.stats = add_stats_section(ax3, [
+            {"text": "Shots", "value": "", "x": 0.2},
+            {"text": "Goals", "value": "", "x": 0.4},
+            {"text": "xG", "value": "", "x": 0.6},
+            {"text": "xG/Shot", "value": "", "x": 0.8}
+        ])
+
+        ax3.set_axis_off()
+
+    @instrumented()
+    def render(self, data, title="Shotmap", subtitle="All shots"):
+        if len(data) == 0:
+            return
+
+        shots = prepare_shot_data(data)
+        stats = calculate_shots_stats(shots)
+
+        self.title.set_text(title)
+        self.subtitle.set_text(subtitle)
+
+        update_average_distance_section(self.average_distance, stats["points_average_distance"])
+
+        if self.density_threshold is not None and len(shots) > self.density_threshold:
+            update_shots(self.pitch, self.shots, [], [], [], [])
+            self._update_density(shots)
+        else:
+            self._hide_density()
+            update_shots(self.pitch, self.shots, shots["X"], shots["Y"], shots["xG"], shots.goals)
+
+        values = [
+            f"{stats["total_shots"]}",
+            f"{stats["total_goals"]}",
+            f"{stats["total_xG"]:.2f}",
+            f"{stats["xG_per_shot"]:.2f}"
+        ]
+        for text, value in zip(self.stats, values):
+            text.set_text(value)
+
+        return self.fig
+
+    def _update_density(self, shots):
+        if self.density == "hexbin":
+            from .style import PURPLE_COLORMAP
+
+            self._hide_density()
+            patches = len(self.ax.patches)
+            hexbin = self.pitch.hexbin(shots["X"], shots["Y"], ax=self.ax, gridsize=self.bins[1] // 2, mincnt=1, cmap=PURPLE_COLORMAP.reversed(), zorder=0.8)
+
+            # The hexagons are clipped by a rectangle added with them, which would outline the pitch.
+            self.hexbin = [hexbin, *self.ax.patches[patches:]]
+            for patch in self.hexbin[1:]:
+                patch.set_visible(False)
+            return
+
+        counts = calculate_shots_density(shots["X"], shots["Y"], bins=self.density_bins, smooth=self.density == "kde")
+        update_density(self.density_mesh, counts)
+
+    def _hide_density(self):
+        if self.density_mesh is not None:
+            self.density_mesh.set_visible(False)
+
+        for artist in self.hexbin:
+            artist.remove()
+        self.hexbin = []
+
+
+class MatchShotmapTemplate:
+    """A match shotmap figure whose static parts are built once, see `ShotmapTemplate`."""
+
+    @instrumented("shotmap.build_match_template")
+    def __init__(self):
+        import matplotlib.pyplot as plt
+        from mplsoccer import Pitch
+
+        self.fig = plt.figure(figsize=(8, 12))
+        self.fig.set_label("match_shotmap")
+        self.fig.patch.set_facecolor(Colors.BACKGROUND)
+
+        ax1 = self.fig.add_axes([0, 0.7, 1, .2])
+        ax1.set_facecolor(Colors.BACKGROUND)
+        ax1.set_xlim(0, 1)
+        ax1.set_ylim(0, 1)
+        self.title, self.subtitle = add_header_section(ax1, "", "")
+        ax1.set_axis_off()
+
+        ax2 = self.fig.add_axes([.05, 0.285, .9, .5])
+        ax2.set_facecolor(Colors.BACKGROUND)
+
+        self.pitch = Pitch(
+            pitch_type="opta",
+            corner_arcs=True,
+            pitch_color=Colors.BACKGROUND,
+            line_color=Colors.MAIN,
+            pad_bottom=0.25,
+        )
+        self.pitch.draw(ax=ax2)
+
+        self.home_team = ax2.text(x=25, y=90, s="", fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+        self.away_team = ax2.text(x=75, y=90, s="", fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+
+        self.home_shots = add_shots(self.pitch, ax2, [], [], [], [])
+        self.away_shots = add_shots(self.pitch, ax2, [], [], [], [])
+
+        ax2.set_axis_off()
 
-    ax3.set_axis_off()
+        ax3 = self.fig.add_axes([0, .275, 1, .05])
+        ax3.set_facecolor(Colors.BACKGROUND)
+        ax3.set_xlim(0, 1)
+        ax3.set_ylim(0, 1)
+
+        self.stats = add_stats_section(ax3, [
+            {"text": "Shots", "value": "", "x": 0.14},
+            {"text": "xG", "value": "", "x": 0.26},
+            {"text": "xG/Shot", "value": "", "x": 0.38},
+            {"text": "Shots", "value": "", "x": 0.58},
+            {"text": "xG", "value": "", "x": 0.70},
+            {"text": "xG/Shot", "value": "", "x": 0.82}
+        ], fontsize=18)
+
+        ax3.set_axis_off()
+
+    @instrumented()
+    def render(self, data, title="Shotmap", subtitle="All shots"):
+        if len(data) == 0:
+            return
+
+        home_data = data['h']
+        away_data = data['a']
 
-    return fig
+        home_shots = prepare_shot_data(home_data)
+        away_shots = prepare_shot_data(away_data)
+
+        home_stats = calculate_shots_stats(home_shots)
+        away_stats = calculate_shots_stats(away_shots)
+
+        self.title.set_text(title)
+        self.subtitle.set_text(subtitle)
+
+        self.home_team.set_text(home_shots["h_team"][0])
+        self.away_team.set_text(home_shots["a_team"][0])
+
+        update_shots(self.pitch, self.home_shots, 100 - home_shots["X"], home_shots["Y"], home_shots["xG"], home_shots.goals)
+        update_shots(self.pitch, self.away_shots, away_shots["X"], away_shots["Y"], away_shots["xG"], away_shots.goals)
+
+        values = [
+            f"{home_stats["total_shots"]}",
+            f"{home_stats["total_xG"]:.2f}",
+            f"{home_stats["xG_per_shot"]:.2f}",
+            f"{away_stats["total_shots"]}",
+            f"{away_stats["total_xG"]:.2f}",
+            f"{away_stats["xG_per_shot"]:.2f}"
+        ]
+        for text, value in zip(self.stats, values):
+            text.set_text(value)
+
+        return self.fig
+
+
+def create_shotmap_fig_form_data(data, title="Shotmap", subtitle="All shots", density_threshold=DENSITY_THRESHOLD, density="grid"):
+    if len(data) == 0:
+        return
+
+    return ShotmapTemplate(density_threshold=density_threshold, density=density).render(data, title=title, subtitle=subtitle)
 
 
 def create_match_shotmap_fig_from_data(data, title="Shotmap", subtitle="All shots"):
     if len(data) == 0:
         return
 
-    home_data = data['h']
-    away_data = data['a']
+    return MatchShotmapTemplate().render(data, title=title, subtitle=subtitle)
 
-    home_df = prepare_shot_data(home_data)
-    away_df = prepare_shot_data(away_data)
 
-    home_team = home_data[0]['h_team']
-    away_team = home_data[0]['a_team']
+async def fetch_player_shotmap_data(player_name, year, client=None, league=LEAGUES.EPL):
+    """Fetch the shots of a player in a league and return them with the title and subtitle of the shotmap."""
 
-    home_stats = calculate_shots_stats(home_df)
-    away_stats = calculate_shots_stats(away_df)
+    data = await get_player_shots_data(player_name, year, client=client, league=league)
 
-    fig = plt.figure(figsize=(8, 12))
-    fig.patch.set_facecolor(Colors.BACKGROUND)
+    title = player_name
+    subtitle = f'All shots in {get_league_label(league)} in {get_season_label(year)}'
 
-    ax1 = fig.add_axes([0, 0.7, 1, .2])
-    ax1.set_facecolor(Colors.BACKGROUND)
-    ax1.set_xlim(0, 1)
-    ax1.set_ylim(0, 1)
-    add_header_section(ax1, title, subtitle)
-    ax1.set_axis_off()
+    return data, title, subtitle
 
-    ax2 = fig.add_axes([.05, 0.285, .9, .5])
-    ax2.set_facecolor(Colors.BACKGROUND)
 
-    pitch = Pitch(
-        pitch_type="opta",
-        corner_arcs=True,
-        pitch_color=Colors.BACKGROUND,
-        line_color=Colors.MAIN,
-        pad_bottom=0.25,
-    )
-    pitch.draw(ax=ax2)
+async def fetch_team_shotmap_data(team_name, year, client=None, league=LEAGUES.EPL):
+    """Fetch the shots of a team in a season and return them with the title and subtitle of the shotmap."""
 
-    ax2.text(x=25, y=90, s=home_team, fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
-    ax2.text(x=75, y=90, s=away_team, fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+    data = await get_team_shots_data(team_name, year, client=client)
 
-    for x in home_df.to_dict(orient="records"):
-        color = Colors.ACCENT if x["result"] == "Goal" else Colors.BACKGROUND
-        pitch.scatter(100 - x["X"], x["Y"], s=300 * x["xG"], color=color, ax=ax2, alpha=0.7, linewidth=0.8, edgecolor=Colors.MAIN)
+    title = team_name
+    subtitle = f'All shots in {get_league_label(league)} in {get_season_label(year)}'
 
-    for x in away_df.to_dict(orient='records'):
-        color = Colors.ACCENT if x["result"] == "Goal" else Colors.BACKGROUND
-        pitch.scatter(x["X"], x["Y"], s=300 * x["xG"], color=color, ax=ax2, alpha=0.7, linewidth=.8, edgecolor=Colors.MAIN)
+    return data, title, subtitle
 
-    ax2.set_axis_off()
 
-    ax3 = fig.add_axes([0, .275, 1, .05])
-    ax3.set_facecolor(Colors.BACKGROUND)
-    ax3.set_xlim(0, 1)
-    ax3.set_ylim(0, 1)
+async def fetch_match_shotmap_data(home_team, away_team, year, client=None, league=LEAGUES.EPL):
+    """Fetch the shots of a match in a league and return them with the title and subtitle of the shotmap."""
 
-    stats = [
-        {"text": "Shots", "value": f"{home_stats["total_shots"]}", "x": 0.14},
-        {"text": "xG", "value": f"{home_stats["total_xG"]:.2f}", "x": 0.26},
-        {"text": "xG/Shot", "value": f"{home_stats["xG_per_shot"]:.2f}", "x": 0.38},
-        {"text": "Shots", "value": away_stats["total_shots"], "x": 0.58},
-        {"text": "xG", "value": f"{away_stats["total_xG"]:.2f}", "x": 0.70},
-        {"text": "xG/Shot", "value": f"{away_stats["xG_per_shot"]:.2f}", "x": 0.82}
-    ]
-    for stat in stats:
-        ax3.text(x=stat["x"], y=0.5, s=stat["text"], fontsize=18, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
-        ax3.text(x=stat["x"], y=0, s=stat["value"], fontsize=16, fontproperties=OutfitFont.BOLD, color=Colors.ACCENT, ha="center")
+    data, result = await get_match_bundle(home_team, away_team, year, client=client, league=league)
 
-    ax3.set_axis_off()
+    title = f"{home_team} {result["h_goals"]} - {result["a_goals"]} {away_team}"
+    subtitle = f'All shots in {home_team} - {away_team} fixture in {get_season_label(year)}'
 
-    return fig
+    return data, title, subtitle
 
 
+@instrumented()
+def get_player_shotmap_data(player_name, year):
+    return asyncio.run(fetch_player_shotmap_data(player_name, year))
+
+
+@instrumented()
+def get_team_shotmap_data(team_name, year):
+    return asyncio.run(fetch_team_shotmap_data(team_name, year))
+
+
+@instrumented()
+def get_match_shotmap_data(home_team, away_team, year):
+    return asyncio.run(fetch_match_shotmap_data(home_team, away_team, year))
+
+
+@instrumented()
 def create_player_shotmap_fig(player_name, year):
-    data = asyncio.run(get_player_shots_data(player_name, year))
+    data, title, subtitle = get_player_shotmap_data(player_name, year)
+
+    return create_shotmap_fig_form_data(data, title=title, subtitle=subtitle)
 
-    title = player_name
-    subtitle = f'All shots in Premier League in {get_season_label(year)}'
+
+@instrumented()
+def create_team_shotmap_fig(team_name, year):
+    data, title, subtitle = get_team_shotmap_data(team_name, year)
 
     return create_shotmap_fig_form_data(data, title=title, subtitle=subtitle)
 
 
+@instrumented()
 def create_match_shotmap_fig(home_team, away_team, year):
-    data = asyncio.run(get_match_shots(home_team, away_team, year))
-    result = asyncio.run(get_match_stats(home_team, away_team, year))
-
-    title = f"{home_team} {result["h_goals"]} - {result["a_goals"]} {away_team}"
-    subtitle = f'All shots in {home_team} - {away_team} fixture in {get_season_label(year)}'
+    data, title, subtitle = get_match_shotmap_data(home_team, away_team, year)
 
     return create_match_shotmap_fig_from_data(data, title=title, subtitle=subtitle)
 
 
-def create_player_shotmap(player_name, year):
-    file_name = f"./media/{player_name.lower().replace(" ", "_")}_{year}_shotmap.png"
+@instrumented()
+def render_player_shotmap(player_name, year, cache=None, fmt="png", **options):
+    """Render the shotmap of a player to bytes, see `render_cache.render_figure`.
+
+    Returns:
+        bytes | np.ndarray | None: The encoded figure, its pixels when `fmt` is "rgba", or
+            None if the player has no shots.
+    """
 
-    fig = create_player_shotmap_fig(player_name, year)
-    if fig is None:
+    data, title, subtitle = get_player_shotmap_data(player_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotmap", data, title, subtitle, template=shotmap_config())
+    return render_figure(key, lambda: create_shotmap_fig_form_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def render_team_shotmap(team_name, year, cache=None, fmt="png", **options):
+    """Render the shotmap of a team in a season to bytes, see `render_player_shotmap`."""
+
+    data, title, subtitle = get_team_shotmap_data(team_name, year)
+    if len(data) == 0:
         return
 
-    fig.savefig(file_name, facecolor=Colors.BACKGROUND, bbox_inches="tight")
-    return file_name
+    key = figure_key("shotmap", data, title, subtitle, template=shotmap_config())
+    return render_figure(key, lambda: create_shotmap_fig_form_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def render_match_shotmap(home_team, away_team, year, cache=None, fmt="png", **options):
+    """Render the shotmap of a match to bytes, see `render_player_shotmap`."""
+
+    data, title, subtitle = get_match_shotmap_data(home_team, away_team, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("match", data, title, subtitle)
+    return render_figure(key, lambda: create_match_shotmap_fig_from_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def create_player_shotmap(player_name, year, cache=None, fmt="png", **options):
+    """Save the shotmap of a player, unless the same figure is already in the render cache."""
 
+    file_name = f"./media/{player_name.lower().replace(" ", "_")}_{year}_shotmap{FILE_EXTENSIONS[fmt]}"
+
+    data, title, subtitle = get_player_shotmap_data(player_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotmap", data, title, subtitle, template=shotmap_config())
+    return save_figure(file_name, key, lambda: create_shotmap_fig_form_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def create_team_shotmap(team_name, year, cache=None, fmt="png", **options):
+    """Save the shotmap of a team in a season, unless the same figure is already in the render cache."""
+
+    file_name = f"./media/{team_name.lower().replace(" ", "_")}_{year}_team_shotmap{FILE_EXTENSIONS[fmt]}"
+
+    data, title, subtitle = get_team_shotmap_data(team_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotmap", data, title, subtitle, template=shotmap_config())
+    return save_figure(file_name, key, lambda: create_shotmap_fig_form_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def create_match_shotmap(home_team, away_team, year, cache=None, fmt="png", **options):
+    """Save the shotmap of a match, unless the same figure is already in the render cache."""
 
-def create_match_shotmap(home_team, away_team, year):
     normalized_match_name = f"{home_team}_{away_team}".replace(" ", "_").lower()
-    file_name = f"./media/{normalized_match_name}_{year}_shotmap.png"
+    file_name = f"./media/{normalized_match_name}_{year}_shotmap{FILE_EXTENSIONS[fmt]}"
 
-    fig = create_match_shotmap_fig(home_team, away_team, year)
-    if fig is None:
+    data, title, subtitle = get_match_shotmap_data(home_team, away_team, year)
+    if len(data) == 0:
         return
 
-    fig.savefig(file_name, facecolor=Colors.BACKGROUND, bbox_inches="tight")
-    return file_name
+    key = figure_key("match", data, title, subtitle)
+    return save_figure(file_name, key, lambda: create_match_shotmap_fig_from_data(data, title=title, subtitle=subtitle), cache=cache, fmt=fmt, **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""This module holds shots in a compact, typed columnar table."""
+
+import numpy as np
+import pandas as pd
+
+
+# Coordinates are stored in opta units (0 to 100), the scale used by mplsoccer.
+FLOAT_COLUMNS = ("X", "Y", "xG")
+
+INT_COLUMNS = {
+    "id": np.int64,
+    "minute": np.int16,
+    "match_id": np.int32,
+    "player_id": np.int32,
+    "season": np.int16,
+    "h_goals": np.int8,
+    "a_goals": np.int8,
+}
+
+CATEGORY_COLUMNS = ("result", "situation", "shotType", "h_a", "h_team", "a_team", "player", "player_assisted", "lastAction")
+
+# Missing integers are stored as -1.
+MISSING_INT = -1
+
+
+def _convert(name, values):
+    if name in FLOAT_COLUMNS:
+        column = pd.to_numeric(values, errors="coerce")
+        column = np.asarray(column, dtype=np.float64)
+        if name in ("X", "Y"):
+            column = column * 100
+
+        return column.astype(np.float32)
+
+    if name in INT_COLUMNS:
+        column = pd.to_numeric(values, errors="coerce")
+        return np.asarray(pd.Series(column).fillna(MISSING_INT), dtype=INT_COLUMNS[name])
+
+    return pd.Categorical(values)
+
+
+class ShotTable:
+    """Shots with a fixed schema, stored as one array per column.
+
+    The coordinates and the xG are float32, the IDs and the minute are small integers and the
+    repeated labels (result, situation, shot type, teams, ...) are categoricals, so a table
+    takes a fraction of the memory of the records and is processed without a Python object
+    per shot. Columns are read with `table["xG"]`.
+
+    Args:
+        columns (dict): The columns, by name. They must all have the same length.
+    """
+
+    def __init__(self, columns):
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"The columns have different lengths: {sorted(lengths)}.")
+
+        self.columns = columns
+        self.length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_understat(cls, data):
+        """Create a table from the shots returned by Understat.
+
+        Each column is gathered from the records and converted by one vectorized call, so no
+        intermediate DataFrame is built. Columns outside of the schema are dropped.
+
+        Args:
+            data (list[dict] | pd.DataFrame | ShotTable): The shots, with X and Y between 0 and 1.
+                A table is returned as it is.
+
+        Returns:
+            ShotTable: The shots, with X and Y scaled to opta units.
+        """
+
+        if isinstance(data, ShotTable):
+            return data
+
+        names = [*FLOAT_COLUMNS, *INT_COLUMNS, *CATEGORY_COLUMNS]
+
+        if isinstance(data, pd.DataFrame):
+            values = {name: data[name] for name in names if name in data.columns}
+        else:
+            data = list(data)
+            present = [name for name in names if data and name in data[0]]
+
+            values = {name: [shot.get(name) for shot in data] for name in present}
+
+        for name in FLOAT_COLUMNS:
+            if name not in values:
+                values[name] = []
+
+        return cls({name: _convert(name, column) for name, column in values.items()})
+
+    @classmethod
+    def concat(cls, tables):
+        """Join tables with the same columns, merging the categories of the labels."""
+
+        tables = list(tables)
+        if not tables:
+            return cls.from_understat([])
+
+        columns = {}
+        for name in tables[0].columns:
+            parts = [table[name] for table in tables]
+            if isinstance(parts[0], pd.Categorical):
+                columns[name] = pd.api.types.union_categoricals(parts)
+            else:
+                columns[name] = np.concatenate(parts)
+
+        return cls(columns)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    @property
+    def goals(self):
+        """A boolean array telling which shots were goals."""
+
+        return np.asarray(self.columns["result"] == "Goal") if "result" in self.columns else np.zeros(self.length, dtype=bool)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def filter(self, mask):
+        """Return the shots selected by a boolean mask."""
+
+        return ShotTable({name: column[mask] for name, column in self.columns.items()})
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns)
@@ -2,112 +2,269 @@
 
 import asyncio
 
-from .utils import prepare_shot_data, calculate_shots_stats, get_season_label
-from .scrape import get_player_shots_data
-from .style import OutfitFont, Colors, PURPLE_COLORMAP
-from .zones import Zones, draw_zone_fill, draw_zones
+from .utils import prepare_shot_data, calculate_shots_stats, get_season_label, get_league_label, add_stats_section
+from .leagues import LEAGUES
+from .scrape import get_player_shots_data, get_team_shots_data
+from .style import OutfitFont, Colors
+from .render_cache import figure_key, render_figure, save_figure
+from .output import FILE_EXTENSIONS
+from .instrument import instrumented
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from mplsoccer import VerticalPitch
+import numpy as np
 
 
-def calculate_zones_stats(df, zones, vertical=True):
-    """Calculates the stats for each zone."""
+@instrumented()
+def calculate_zones_stats(shots, zones, vertical=True):
+    """Calculates the stats for each zone.
 
-    for zone in zones:
-        zone.values["shots"] = 0
-        zone.values["xG"] = 0
+    The shots of a `ShotTable` are assigned to the zones in one vectorized pass, then the
+    shots, xG and percentage of each zone are reduced with group sums.
+    """
 
-    for shot in df.to_dict(orient="records"):
-        x, y = shot["X"], shot["Y"]
+    zone_indexes = zones.assign(shots["X"], shots["Y"], vertical)
+    inside = zone_indexes >= 0
 
-        for zone in zones:
-            if zone.is_inside(x, y, vertical):
-                zone.values["shots"] += 1
-                zone.values["xG"] += shot["xG"]
-                break
+    counts = np.bincount(zone_indexes[inside], minlength=len(zones))
+    xG = np.bincount(zone_indexes[inside], weights=shots["xG"][inside], minlength=len(zones))
 
-    total_shots = df.shape[0]
-    for zone in zones:
+    total_shots = len(shots)
+    for zone, zone_shots, zone_xG in zip(zones, counts, xG):
+        zone.values["shots"] = int(zone_shots)
+        zone.values["xG"] = float(zone_xG)
         zone.values["percentage"] = zone.values["shots"] * 100 / total_shots
 
 
-def create_shotzone_fig_from_data(data, title="Title", subtitle="Subtitle"):
+class ShotzoneTemplate:
+    """A shotzone figure whose static parts are built once.
+
+    The pitch, the zone borders and the labels are drawn when the template is created.
+    Rendering new data only updates the zone fills and the texts, so the same figure can be
+    saved for many players.
+
+    Args:
+        layout (str, optional): The name of the zone layout, see `LAYOUTS`. Defaults to "default".
+    """
+
+    @instrumented("shotzone.build_template")
+    def __init__(self, layout="default"):
+        # matplotlib, mplsoccer and the zone geometry are only imported when a figure is built.
+        import matplotlib.pyplot as plt
+        from mplsoccer import VerticalPitch
+
+        from .style import PURPLE_COLORMAP
+        from .zones import Zones, draw_zones_fill, draw_zones
+
+        self.colormap = PURPLE_COLORMAP
+
+        self.fig = plt.figure(figsize=(8, 12))
+        # The label identifies the layout, see `output.fixed_bbox`.
+        self.fig.set_label(f"shotzone_{layout}")
+        self.fig.patch.set_facecolor(Colors.BACKGROUND)
+
+        ax1 = self.fig.add_axes([.05, 0.6, 0.9, 0.2])
+        self.title = ax1.text(x=0.5, y=0.8, s="", fontsize=24, fontproperties=OutfitFont.BLACK, color=Colors.MAIN, ha="center")
+        self.subtitle = ax1.text(x=0.5, y=0.65, s="", fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+        ax1.set_axis_off()
+
+        ax2 = self.fig.add_axes([.05, 0.25, 0.9, .5])
+        ax2.set_facecolor(Colors.BACKGROUND)
+
+        self.pitch = VerticalPitch(
+            pitch_type="opta",
+            half=True,
+            corner_arcs=True,
+            pitch_color=Colors.BACKGROUND,
+            line_color=Colors.MAIN,
+            spot_scale=0,
+            pad_bottom=0.25
+        )
+        self.pitch.draw(ax=ax2)
+
+        self.zones = Zones.from_layout(layout)
+        draw_zones(self.pitch, ax2, self.zones)
+
+        # Every zone gets a patch and a label, the ones without shots are left out on render.
+        self.patches = [zone.patch(self.pitch.vertical) for zone in self.zones]
+        self.fill, self.labels = draw_zones_fill(self.pitch, ax2, self.zones, texts=[""] * len(self.zones), colors=[])
+
+        ax2.set_axis_off()
+
+        ax3 = self.fig.add_axes([0, .2, 1, .05])
+        ax3.set_facecolor(Colors.BACKGROUND)
+        ax3.set_xlim(0, 1)
+        ax3.set_ylim(0, 1)
+
+        self.stats = add_stats_section(ax3, [
+            {"text": "Shots", "value": "", "x": 0.2},
+            {"text": "Goals", "value": "", "x": 0.4},
+            {"text": "xG", "value": "", "x": 0.6},
+            {"text": "xG/Shot", "value": "", "x": 0.8}
+        ])
+
+        ax3.set_axis_off()
+
+    @instrumented()
+    def render(self, data, title="Title", subtitle="Subtitle"):
+        if len(data) == 0:
+            return
+
+        shots = prepare_shot_data(data)
+        stats = calculate_shots_stats(shots)
+
+        calculate_zones_stats(shots, self.zones, self.pitch.vertical)
+
+        return self._update(stats, title, subtitle)
+
+    @instrumented()
+    def render_aggregate(self, aggregate, title="Title", subtitle="Subtitle"):
+        """Render the per-zone values returned by `ZoneCube.query`, without going through the shots."""
+
+        if aggregate["total_shots"] == 0:
+            return
+
+        if len(aggregate["shots"]) != len(self.zones):
+            raise ValueError(f"The aggregate has {len(aggregate["shots"])} zones, the template has {len(self.zones)}.")
+
+        for zone, zone_shots, zone_xG in zip(self.zones, aggregate["shots"], aggregate["xG"]):
+            zone.values["shots"] = int(zone_shots)
+            zone.values["xG"] = float(zone_xG)
+            zone.values["percentage"] = zone.values["shots"] * 100 / aggregate["total_shots"]
+
+        return self._update(aggregate, title, subtitle)
+
+    @instrumented("shotzone.update_artists")
+    def _update(self, stats, title, subtitle):
+        self.title.set_text(title)
+        self.subtitle.set_text(subtitle)
+
+        # The zones with the most shots are drawn first and get the lightest colors of the colormap,
+        # the zones with the fewest shots the darkest ones.
+        shots = [zone.values["shots"] for zone in self.zones]
+        order = sorted((i for i in range(len(shots)) if shots[i] > 0), key=lambda i: shots[i], reverse=True)
+        self.fill.set_paths([self.patches[i] for i in order])
+        self.fill.set_facecolor(self.colormap(np.arange(1, len(order) + 1) / max(len(order), 1)))
+
+        for label, zone in zip(self.labels, self.zones):
+            label.set_text(f"{zone.values["percentage"]:.2f}%\n{zone.values["xG"]:.2f}xG" if zone.values["shots"] > 0 else "")
+
+        values = [
+            f"{stats["total_shots"]}",
+            f"{stats["total_goals"]}",
+            f"{stats["total_xG"]:.2f}",
+            f"{stats["xG_per_shot"]:.2f}"
+        ]
+        for text, value in zip(self.stats, values):
+            text.set_text(value)
+
+        return self.fig
+
+
+def create_shotzone_fig_from_data(data, title="Title", subtitle="Subtitle", layout="default"):
     if len(data) == 0:
         return
 
-    df = prepare_shot_data(data)
-    stats = calculate_shots_stats(df)
+    return ShotzoneTemplate(layout).render(data, title=title, subtitle=subtitle)
+
+
+async def fetch_player_shotzone_data(player_name, year, client=None, league=LEAGUES.EPL):
+    """Fetch the shots of a player in a league and return them with the title and subtitle of the shotzone."""
+
+    data = await get_player_shots_data(player_name, year, client=client, league=league)
+
+    return data, f"{player_name}", f"All shots in the {get_league_label(league)} in {get_season_label(year)} season"
+
+
+async def fetch_team_shotzone_data(team_name, year, client=None, league=LEAGUES.EPL):
+    """Fetch the shots of a team in a season and return them with the title and subtitle of the shotzone."""
+
+    data = await get_team_shots_data(team_name, year, client=client)
 
-    fig = plt.figure(figsize=(8, 12))
-    fig.patch.set_facecolor(Colors.BACKGROUND)
+    return data, f"{team_name}", f"All shots in the {get_league_label(league)} in {get_season_label(year)} season"
 
-    ax1 = fig.add_axes([.05, 0.6, 0.9, 0.2])
-    ax1.text(x=0.5, y=0.8, s=title, fontsize=24, fontproperties=OutfitFont.BLACK, color=Colors.MAIN, ha="center")
-    ax1.text(x=0.5, y=0.65, s=subtitle, fontsize=14, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
-    ax1.set_axis_off()
 
-    ax2 = fig.add_axes([.05, 0.25, 0.9, .5])
-    ax2.set_facecolor(Colors.BACKGROUND)
+@instrumented()
+def get_player_shotzone_data(player_name, year):
+    return asyncio.run(fetch_player_shotzone_data(player_name, year))
 
-    pitch = VerticalPitch(
-        pitch_type="opta",
-        half=True,
-        corner_arcs=True,
-        pitch_color=Colors.BACKGROUND,
-        line_color=Colors.MAIN,
-        spot_scale=0,
-        pad_bottom=0.25
-    )
-    pitch.draw(ax=ax2)
 
-    zones = Zones()
-    calculate_zones_stats(df, zones, pitch.vertical)
-    draw_zones(pitch, ax2, zones)
+@instrumented()
+def get_team_shotzone_data(team_name, year):
+    return asyncio.run(fetch_team_shotzone_data(team_name, year))
 
-    zones_to_draw = list(filter(lambda zone: zone.values["shots"] > 0, sorted(zones, key=lambda zone: zone.values["shots"], reverse=True)))
-    for index, zone in enumerate(zones_to_draw):
-        if zone.values["shots"] > 0:
-            draw_zone_fill(pitch, ax2, zone, text=f"{zone.values["percentage"]:.2f}%\n{zone.values["xG"]:.2f}xG", color=PURPLE_COLORMAP((index + 1) / len(zones_to_draw)))
 
-    ax2.set_axis_off()
+def create_shotzone_fig_from_aggregate(aggregate, title="Title", subtitle="Subtitle", layout="default"):
+    return ShotzoneTemplate(layout).render_aggregate(aggregate, title=title, subtitle=subtitle)
 
-    ax3 = fig.add_axes([0, .2, 1, .05])
-    ax3.set_facecolor(Colors.BACKGROUND)
-    ax3.set_xlim(0, 1)
-    ax3.set_ylim(0, 1)
 
-    stats = [
-        {"text": "Shots", "value": f"{stats["total_shots"]}", "x": 0.2},
-        {"text": "Goals", "value": f"{stats["total_goals"]}", "x": 0.4},
-        {"text": "xG", "value": f"{stats["total_xG"]:.2f}", "x": 0.6},
-        {"text": "xG/Shot", "value": f"{stats["xG_per_shot"]:.2f}", "x": 0.8}
-    ]
-    for stat in stats:
-        ax3.text(x=stat["x"], y=0.5, s=stat["text"], fontsize=20, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
-        ax3.text(x=stat["x"], y=0, s=stat["value"], fontsize=16, fontproperties=OutfitFont.BOLD, color=Colors.ACCENT, ha="center")
+@instrumented()
+def create_player_shotzone_fig(player_name, year, layout="default"):
+    data, title, subtitle = get_player_shotzone_data(player_name, year)
 
-    ax3.set_axis_off()
+    return create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout)
 
-    return fig
 
+@instrumented()
+def create_team_shotzone_fig(team_name, year, layout="default"):
+    data, title, subtitle = get_team_shotzone_data(team_name, year)
 
-def create_player_shotzone_fig(player_name, year):
-    data = asyncio.run(get_player_shots_data(player_name, year))
+    return create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout)
 
-    return create_shotzone_fig_from_data(data, title=f"{player_name}", subtitle=f"All shots in the Premier League in {get_season_label(year)} season")
 
+@instrumented()
+def render_player_shotzone(player_name, year, layout="default", cache=None, fmt="png", **options):
+    """Render the shotzone of a player to bytes, see `render_cache.render_figure`.
 
-def create_player_shotzone(player_name, year):
-    file_name = f"./media/{player_name.lower().replace(" ", "_")}_{year}_shotzone.png"
+    Returns:
+        bytes | np.ndarray | None: The encoded figure, its pixels when `fmt` is "rgba", or
+            None if the player has no shots.
+    """
 
-    fig = create_player_shotzone_fig(player_name, year)
-    if fig is None:
+    data, title, subtitle = get_player_shotzone_data(player_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotzone", data, title, subtitle, layout=layout)
+    return render_figure(key, lambda: create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def render_team_shotzone(team_name, year, layout="default", cache=None, fmt="png", **options):
+    """Render the shotzone of a team in a season to bytes, see `render_player_shotzone`."""
+
+    data, title, subtitle = get_team_shotzone_data(team_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotzone", data, title, subtitle, layout=layout)
+    return render_figure(key, lambda: create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def create_player_shotzone(player_name, year, layout="default", cache=None, fmt="png", **options):
+    """Save the shotzone of a player, unless the same figure is already in the render cache."""
+
+    file_name = f"./media/{player_name.lower().replace(" ", "_")}_{year}_shotzone{FILE_EXTENSIONS[fmt]}"
+
+    data, title, subtitle = get_player_shotzone_data(player_name, year)
+    if len(data) == 0:
+        return
+
+    key = figure_key("shotzone", data, title, subtitle, layout=layout)
+    return save_figure(file_name, key, lambda: create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout), cache=cache, fmt=fmt, **options)
+
+
+@instrumented()
+def create_team_shotzone(team_name, year, layout="default", cache=None, fmt="png", **options):
+    """Save the shotzone of a team in a season, unless the same figure is already in the render cache."""
+
+    file_name = f"./media/{team_name.lower().replace(" ", "_")}_{year}_team_shotzone{FILE_EXTENSIONS[fmt]}"
+
+    data, title, subtitle = get_team_shotzone_data(team_name, year)
+    if len(data) == 0:
         return
 
-    fig.savefig(file_name, facecolor=Colors.BACKGROUND, bbox_inches="tight")
-    return file_name
+    key = figure_key("shotzone", data, title, subtitle, layout=layout)
+    return save_figure(file_name, key, lambda: create_shotzone_fig_from_data(data, title=title, subtitle=subtitle, layout=layout), cache=cache, fmt=fmt, **options)
 
 
 if __name__ == "__main__":
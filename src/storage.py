@@ -0,0 +1,187 @@
+"""This module stores scraped datasets in compact columnar files partitioned by league, season and entity."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+DATASETS_PATH = Path("./data/datasets")
+
+FORMATS = {
+    "parquet": ".parquet",
+    "npz": ".npz",
+}
+
+FLOAT_COLUMNS = {"X", "Y", "xG"}
+INT_COLUMNS = {"id", "minute", "player_id", "match_id", "h_goals", "a_goals", "season"}
+CATEGORY_COLUMNS = {"result", "situation", "shotType", "h_a", "lastAction", "h_team", "a_team", "player"}
+
+
+def normalize_entity(name):
+    return str(name).replace(" ", "_").lower()
+
+
+def _is_text(series):
+    return not isinstance(series.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(series.dtype)
+
+
+def coerce_types(df):
+    """Convert the string columns returned by Understat to their actual types.
+
+    The shot columns are converted using a fixed schema (floats for the coordinates and xG,
+    integers for the IDs, categories for the repeated labels). Any other column holding only
+    numeric strings is converted to a number.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to convert.
+
+    Returns:
+        pd.DataFrame: The DataFrame with typed columns.
+    """
+
+    for column in df.columns:
+        if column in FLOAT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+        elif column in INT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+        elif column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype("category")
+        elif _is_text(df[column]):
+            converted = pd.to_numeric(df[column], errors="coerce")
+            if converted.notna().sum() == df[column].notna().sum():
+                df[column] = converted
+
+    return df
+
+
+def dataset_path(kind, league, season, entity, fmt="parquet"):
+    """Return the path of a dataset partition, e.g. "./data/datasets/shots/league=EPL/season=2024/mohamed_salah.parquet"."""
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format: '{fmt}'. Expected one of: {', '.join(FORMATS)}.")
+
+    return DATASETS_PATH / kind / f"league={league}" / f"season={season}" / f"{normalize_entity(entity)}{FORMATS[fmt]}"
+
+
+def _write_npz(df, path):
+    arrays = {}
+    for column in df.columns:
+        series = df[column]
+        if not pd.api.types.is_numeric_dtype(series.dtype):
+            # Missing values are stored as empty strings so the file can be loaded without pickle.
+            arrays[column] = np.array(["" if pd.isna(value) else str(value) for value in series], dtype=str)
+        elif series.hasnans:
+            arrays[column] = series.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            arrays[column] = series.to_numpy()
+
+    np.savez_compressed(path, **arrays)
+
+
+def _read_npz(path, columns=None):
+    with np.load(path, allow_pickle=False) as npz:
+        names = columns if columns is not None else npz.files
+        df = pd.DataFrame({name: npz[name] for name in names if name in npz.files})
+
+    for column in df.columns:
+        if df[column].dtype.kind == "U":
+            df[column] = df[column].astype(object).where(df[column] != "", None)
+
+    return coerce_types(df)
+
+
+def write_csv(data, file_name):
+    """Write the records returned by Understat to a CSV file, flattening the nested fields."""
+
+    pd.json_normalize(data).to_csv(file_name, index=False)
+    return file_name
+
+
+def write_dataset(data, kind, league, season, entity, fmt="parquet"):
+    """Write a dataset partition in a columnar format.
+
+    Args:
+        data (list | pd.DataFrame): The records returned by Understat, or a DataFrame.
+        kind (str): The dataset kind, e.g. "shots" or "fixtures".
+        league (str): The league name.
+        season (str): The season.
+        entity (str): The player, team or match the data belongs to.
+        fmt (str, optional): Either "parquet" (requires pyarrow) or "npz" (compressed NumPy).
+            Defaults to "parquet".
+
+    Returns:
+        str: The path of the written file.
+    """
+
+    path = dataset_path(kind, league, season, entity, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = data if isinstance(data, pd.DataFrame) else pd.json_normalize(data)
+    df = coerce_types(df)
+
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        _write_npz(df, path)
+
+    return str(path)
+
+
+def read_dataset(kind, league="*", season="*", entity="*", columns=None, fmt="parquet"):
+    """Read the partitions of a dataset into one DataFrame, keeping the column types.
+
+    The league, season and entity can be left out to read every partition. Only the given
+    columns are read from the files.
+
+    Args:
+        kind (str): The dataset kind, e.g. "shots".
+        league (str, optional): The league name. Defaults to every league.
+        season (str, optional): The season. Defaults to every season.
+        entity (str, optional): The player, team or match. Defaults to every entity.
+        columns (list[str], optional): The columns to read. Defaults to every column.
+        fmt (str, optional): Either "parquet" or "npz". Defaults to "parquet".
+
+    Returns:
+        pd.DataFrame: The dataset, with the "league", "season" and "entity" partition columns
+            added when more than one partition can match.
+    """
+
+    entity = entity if entity == "*" else normalize_entity(entity)
+    pattern = f"{kind}/league={league}/season={season}/{entity}{FORMATS[fmt]}"
+    paths = sorted(DATASETS_PATH.glob(pattern))
+
+    if not paths:
+        raise FileNotFoundError(f"No dataset found for '{DATASETS_PATH / pattern}'.")
+
+    frames = []
+    for path in paths:
+        df = pd.read_parquet(path, columns=columns) if fmt == "parquet" else _read_npz(path, columns)
+
+        if "*" in (league, season, entity):
+            partition = {
+                "league": path.parent.parent.name.split("=", 1)[1],
+                "season": path.parent.name.split("=", 1)[1],
+                "entity": path.stem,
+            }
+            for column, value in partition.items():
+                if column not in df.columns:
+                    df[column] = value
+
+        frames.append(df)
+
+    if len(frames) == 1:
+        return frames[0]
+
+    # Categories differ between partitions, so they are restored after the concatenation.
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS.intersection(df.columns):
+        df[column] = df[column].astype("category")
+
+    return df
+
+
+def load_shots(league="*", season="*", entity="*", columns=None, fmt="parquet"):
+    """Read a shots dataset, ready to be used by `prepare_shot_data`."""
+
+    return read_dataset("shots", league, season, entity, columns=columns, fmt=fmt)
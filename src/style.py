@@ -1,21 +1,38 @@
 from pathlib import Path
 
-import matplotlib.font_manager as font_manager
-from matplotlib.colors import LinearSegmentedColormap
-
 FONT_BASE_PATH = Path("./fonts/static")
 
 
+class Font:
+    """A font loaded the first time it is used.
+
+    Loading a font imports matplotlib, so the fonts are only created when a figure needs them.
+    """
+
+    def __init__(self, file_name, weight):
+        self.file_name = file_name
+        self.weight = weight
+        self.font = None
+
+    def __get__(self, instance, owner):
+        if self.font is None:
+            import matplotlib.font_manager as font_manager
+
+            self.font = font_manager.FontProperties(fname=FONT_BASE_PATH / self.file_name, weight=self.weight)
+
+        return self.font
+
+
 class OutfitFont:
-    BLACK = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-Black.ttf", weight=900)
-    EXTRA_BOLD = font_manager.FontProperties(fname=FONT_BASE_PATH /  "/Outfit-ExtraBold.ttf", weight=800)
-    BOLD = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-Bold.ttf", weight=700)
-    SEMI_BOLD = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-SemiBold.ttf", weight=600)
-    MEDIUM = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-Medium.ttf", weight=500)
-    REGULAR = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-Regular.ttf", weight=400)
-    LIGHT = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-Light.ttf", weight=300)
-    EXTRA_LIGHT = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-ExtraLight.ttf", weight=200)
-    THIN = font_manager.FontProperties(fname=FONT_BASE_PATH / "Outfit-ExtraLight.ttf", weight=100)
+    BLACK = Font("Outfit-Black.ttf", weight=900)
+    EXTRA_BOLD = Font("/Outfit-ExtraBold.ttf", weight=800)
+    BOLD = Font("Outfit-Bold.ttf", weight=700)
+    SEMI_BOLD = Font("Outfit-SemiBold.ttf", weight=600)
+    MEDIUM = Font("Outfit-Medium.ttf", weight=500)
+    REGULAR = Font("Outfit-Regular.ttf", weight=400)
+    LIGHT = Font("Outfit-Light.ttf", weight=300)
+    EXTRA_LIGHT = Font("Outfit-ExtraLight.ttf", weight=200)
+    THIN = Font("Outfit-ExtraLight.ttf", weight=100)
 
 
 class Colors:
@@ -24,4 +41,16 @@ class Colors:
     ACCENT = "#c084fc"
 
 
-PURPLE_COLORMAP = LinearSegmentedColormap.from_list('purple_colormap', ["#c084fc", "#a855f7", "#9333ea", "#7e22ce", "#6b21a8", "#581c87", "#3b0764"])
+PURPLE_COLORS = ["#c084fc", "#a855f7", "#9333ea", "#7e22ce", "#6b21a8", "#581c87", "#3b0764"]
+
+
+def __getattr__(name):
+    # The colormap is created on first use, like the fonts.
+    if name == "PURPLE_COLORMAP":
+        from matplotlib.colors import LinearSegmentedColormap
+
+        colormap = LinearSegmentedColormap.from_list('purple_colormap', PURPLE_COLORS)
+        globals()[name] = colormap
+        return colormap
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
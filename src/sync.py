@@ -0,0 +1,141 @@
+"""This module keeps the stored shots of a league season up to date with only the newly completed matches."""
+
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+from .client import ensure_client
+from .files import write_atomic
+from .leagues import LEAGUES
+
+
+SYNC_STATE_PATH = Path("./data/sync_state.json")
+
+SHOTS_ENTITY = "matches"
+
+DEFAULT_CONCURRENCY = 8
+
+
+def load_sync_state(path=SYNC_STATE_PATH):
+    if not Path(path).exists():
+        return {}
+
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def save_sync_state(state, path=SYNC_STATE_PATH):
+    write_atomic(path, json.dumps(state, indent=2))
+
+
+def append_shots(shots, league, season, fmt="parquet"):
+    """Append shots to the stored shots dataset of a league season, ignoring the ones already stored."""
+
+    import pandas as pd
+
+    from .storage import read_dataset, write_dataset
+
+    df = pd.json_normalize(shots)
+
+    try:
+        stored = read_dataset("shots", league, season, SHOTS_ENTITY, fmt=fmt)
+    except FileNotFoundError:
+        stored = None
+
+    if stored is not None:
+        df = pd.concat([stored.astype({"id": "string"}), df.astype({"id": "string"})], ignore_index=True)
+        df = df.drop_duplicates(subset="id", keep="last")
+
+    return write_dataset(df, "shots", league, season, SHOTS_ENTITY, fmt=fmt)
+
+
+async def sync_season(league=LEAGUES.EPL, year="2024", client=None, fmt="parquet", concurrency=DEFAULT_CONCURRENCY, state_path=SYNC_STATE_PATH):
+    """Fetch the shots of the matches completed since the last sync and add them to the season dataset.
+
+    A watermark is kept for each league season with the IDs of the synced matches and the date
+    of the latest one. The results list is downloaded once and compared with it, so only the
+    matches completed since the last sync are fetched.
+
+    Args:
+        league (str, optional): The league name. Defaults to LEAGUES.EPL.
+        year (str, optional): The season. Defaults to "2024".
+        client (UnderstatClient, optional): The client used for the requests. Defaults to a
+            one-shot client.
+        fmt (str, optional): The format of the shots dataset, "parquet" or "npz".
+            Defaults to "parquet".
+        concurrency (int, optional): The maximum number of matches fetched at the same time.
+            Defaults to 8.
+        state_path (str | Path, optional): The file storing the watermarks.
+            Defaults to "./data/sync_state.json".
+
+    Returns:
+        list[str]: The IDs of the newly synced matches.
+    """
+
+    season = str(year)
+    key = f"{league}/{season}"
+
+    state = load_sync_state(state_path)
+    watermark = state.get(key, {"datetime": None, "matches": []})
+    synced = set(watermark["matches"])
+
+    async with ensure_client(client) as client:
+        # The results list is the only request made when there is nothing new to sync.
+        results = await client.refresh("get_league_results", league, season=season)
+        pending = [result for result in results if result["isResult"] and result["id"] not in synced]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(result):
+            async with semaphore:
+                # A match cached while it was played holds only part of its shots, and a synced
+                # match is never fetched again, so the cached response is skipped.
+                return await client.refresh("get_match_shots", result["id"])
+
+        responses = await asyncio.gather(*(fetch(result) for result in pending), return_exceptions=True)
+
+    shots = []
+    new_matches = []
+    for result, data in zip(pending, responses):
+        if isinstance(data, BaseException):
+            continue
+
+        shots.extend([*data["h"], *data["a"]])
+        new_matches.append(result)
+
+    if shots:
+        from .aggregates import update_zone_cube
+
+        append_shots(shots, league, season, fmt=fmt)
+        # Every zone cube built for the season is updated, whatever its layout.
+        update_zone_cube(shots, league, season)
+
+    if new_matches:
+        dates = [match["datetime"] for match in new_matches]
+        if watermark["datetime"] is not None:
+            dates.append(watermark["datetime"])
+
+        watermark = {
+            "datetime": max(dates),
+            "matches": sorted(synced.union(match["id"] for match in new_matches)),
+        }
+        state[key] = watermark
+        save_sync_state(state, state_path)
+
+    failed = len(pending) - len(new_matches)
+    if failed:
+        raise RuntimeError(f"Failed to sync {failed} matches of {league} {season}, run the sync again to retry them.")
+
+    return [match["id"] for match in new_matches]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the shots of the matches completed since the last sync.")
+    parser.add_argument("league", nargs="?", default=LEAGUES.EPL)
+    parser.add_argument("year", nargs="?", default="2024")
+    parser.add_argument("--format", dest="fmt", choices=["parquet", "npz"], default="parquet")
+    args = parser.parse_args()
+
+    match_ids = asyncio.run(sync_season(args.league, args.year, fmt=args.fmt))
+    print(f"Synced {len(match_ids)} new matches.")
@@ -1,6 +1,6 @@
 from .style import OutfitFont, Colors
-
-import pandas as pd
+from .leagues import LEAGUE_NAMES
+from .instrument import instrumented
 
 
 def get_season_label(year):
@@ -17,43 +17,46 @@ def get_season_label(year):
     return f"{year}/{int(year) % 100 + 1}"
 
 
+def get_league_label(league):
+    """Return the name of a league shown in the figures, e.g. "Premier League" for "EPL"."""
+
+    return LEAGUE_NAMES.get(league, str(league).replace("_", " "))
+
+
+@instrumented()
 def prepare_shot_data(data):
-    """Prepare shot data by converting it to a DataFrame and adjusting coordinates.
+    """Prepare shot data by converting it to a typed `ShotTable` with opta coordinates.
 
-    Takes raw shot data and converts it to a pandas DataFrame, ensuring proper data types
-    for xG (Expected Goals), X and Y coordinates. Scales X and Y coordinates by multiplying
+    Takes raw shot data and converts it to a `ShotTable` in one pass, with float32 xG
+    (Expected Goals), X and Y coordinates. Scales X and Y coordinates by multiplying
     them by 100 to match mplsoccer pitch dimensions.
 
     Args:
-        data: Raw shot data that can be converted to a pandas DataFrame. Must contain
-            columns 'xG', 'X', and 'Y'.
+        data: Raw shot data, a list of records or a DataFrame. Must contain the fields 'xG',
+            'X', and 'Y'. A `ShotTable` is returned as it is.
 
     Returns:
-        pd.DataFrame: DataFrame containing the processed shot data with adjusted coordinates.
-            Contains at minimum the following columns:
-            - xG (float): Expected Goals value
-            - X (float): X-coordinate multiplied by 100
-            - Y (float): Y-coordinate multiplied by 100
+        ShotTable: The processed shot data with adjusted coordinates. Contains at minimum
+            the following columns:
+            - xG (float32): Expected Goals value
+            - X (float32): X-coordinate multiplied by 100
+            - Y (float32): Y-coordinate multiplied by 100
     """
 
-    df = pd.DataFrame(data)
-    df = df.astype({"xG": float, "X": float, "Y": float})
+    from .shots import ShotTable
 
-    # Convert x and y for mplsoccer
-    df["X"] = df["X"] * 100
-    df["Y"] = df["Y"] * 100
+    return ShotTable.from_understat(data)
 
-    return df
 
-
-def calculate_shots_stats(df):
-    """Calculate statistics from a dataframe containing shot information.
+@instrumented()
+def calculate_shots_stats(shots):
+    """Calculate statistics from a table containing shot information.
 
     This function processes shot data and calculates various statistics including total shots,
     goals, expected goals (xG), and distance metrics.
 
     Args:
-        df (pandas.DataFrame): DataFrame containing shot data with columns:
+        shots (ShotTable): Table containing shot data with columns:
             - 'result': Shot outcome ('Goal' or other)
             - 'xG': Expected goals value for each shot
             - 'X': X-coordinate of shot location (in percentage of pitch length)
@@ -68,14 +71,15 @@ def calculate_shots_stats(df):
             - actual_average_distance (float): Average shot distance in meters
     """
 
-    total_shots = df.shape[0]
-    total_goals = df[df['result'] == 'Goal'].shape[0]
-    total_xG = df['xG'].sum()
+    total_shots = len(shots)
+    total_goals = int(shots.goals.sum())
+    # The float32 columns are summed in float64, so the totals do not lose precision.
+    total_xG = shots['xG'].sum(dtype="float64")
     xG_per_shot = total_xG / total_shots
-    points_average_distance = df['X'].mean()
+    points_average_distance = shots['X'].mean(dtype="float64")
 
     average_pitch_size = 105
-    actual_average_distance = average_pitch_size - (df['X'] * average_pitch_size / 100).mean()
+    actual_average_distance = average_pitch_size - points_average_distance * average_pitch_size / 100
 
     return {
         'total_shots': total_shots,
@@ -87,7 +91,7 @@ def calculate_shots_stats(df):
     }
 
 
-def add_title(ax, text, x=0.5, y=0.85, font=OutfitFont.BLACK, fontsize=24, color=Colors.MAIN):
+def add_title(ax, text, x=0.5, y=0.85, font=None, fontsize=24, color=Colors.MAIN):
     """Add a title to a matplotlib axis.
 
     Args:
@@ -101,10 +105,11 @@ def add_title(ax, text, x=0.5, y=0.85, font=OutfitFont.BLACK, fontsize=24, color
 
     """
 
+    font = font or OutfitFont.BLACK
     ax.text(x=x, y=y, s=text, fontproperties=font, fontsize=fontsize, color=color, ha="center", va="center")
 
 
-def add_subtitle(ax, text, x=0.5, y=0.7, font=OutfitFont.REGULAR, fontsize=14, color=Colors.MAIN):
+def add_subtitle(ax, text, x=0.5, y=0.7, font=None, fontsize=14, color=Colors.MAIN):
     """Add a subtitle to a matplotlib axis.
 
     Args:
@@ -118,4 +123,27 @@ def add_subtitle(ax, text, x=0.5, y=0.7, font=OutfitFont.REGULAR, fontsize=14, c
 
     """
 
+    font = font or OutfitFont.REGULAR
     ax.text(x=x, y=y, s=text, fontproperties=font, fontsize=fontsize, color=color, ha="center", va="center")
+
+
+def add_stats_section(ax, stats, fontsize=20):
+    """Add a row of stats, each with a label and a value below it, to a matplotlib axis.
+
+    Args:
+        ax (matplotlib.axes.Axes): The axis to add the stats to.
+        stats (list[dict]): The stats to add, each with a "text" label, a "value" and a "x"
+            coordinate.
+        fontsize (int, optional): The size of the font of the labels. Defaults to 20.
+
+    Returns:
+        list[matplotlib.text.Text]: The value texts, in the same order as the stats, so they
+            can be updated later.
+    """
+
+    values = []
+    for stat in stats:
+        ax.text(x=stat["x"], y=0.5, s=stat["text"], fontsize=fontsize, fontproperties=OutfitFont.BOLD, color=Colors.MAIN, ha="center")
+        values.append(ax.text(x=stat["x"], y=0, s=stat["value"], fontsize=16, fontproperties=OutfitFont.BOLD, color=Colors.ACCENT, ha="center"))
+
+    return values
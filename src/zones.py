@@ -1,8 +1,12 @@
 from dataclasses import dataclass, field
 
+import numpy as np
+
 from .style import Colors, OutfitFont
 
-from matplotlib.patches import Rectangle
+from matplotlib.path import Path
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import Polygon, Rectangle
 from mplsoccer.dimensions import opta_dims
 
 
@@ -16,6 +20,19 @@ PITCH_SIDE_LENGTH = (PITCH_DIMS.length / 2) - PITCH_DIMS.penalty_area_length
 PENALTY_AREA_SIDE_WIDTH = (PITCH_DIMS.penalty_area_width - PITCH_DIMS.six_yard_width) / 2
 PENALTY_AREA_SIDE_LENGTH = PITCH_DIMS.penalty_area_length - PITCH_DIMS.six_yard_length
 
+# The penalty arc is an ellipse on the opta pitch because its length and width are scaled differently
+PENALTY_ARC_LENGTH = PITCH_DIMS.circle_diameter * PITCH_DIMS.length / PITCH_DIMS.pitch_length
+PENALTY_ARC_WIDTH = PITCH_DIMS.circle_diameter * PITCH_DIMS.width / PITCH_DIMS.pitch_width
+
+ALL_SIDES = ["top", "bottom", "left", "right"]
+
+# The compiled layouts label the pitch in cells of 0.1 x 0.1 opta units
+RASTER_RESOLUTION = 0.1
+
+# Absorbs the floating point error of points lying exactly on a cell edge, in cells. It covers
+# the rounding of float32 coordinates, about 1e-5 opta units near the goal line.
+RASTER_EPSILON = 1e-3
+
 
 @dataclass
 class Zone:
@@ -34,6 +51,193 @@ class Zone:
 
         return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
 
+    def contains(self, x, y):
+        """Vectorized version of `is_inside` for the horizontal pitch coordinates."""
+
+        return (self.x <= x) & (x < self.x + self.width) & (self.y <= y) & (y < self.y + self.height)
+
+    def bounds(self):
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def border_lines(self):
+        """Returns the borders to draw as a list of ([x1, x2], [y1, y2]) lines."""
+
+        lines = []
+
+        if "top" in self.draw:
+            lines.append(([self.x, self.x + self.width], [self.y + self.height, self.y + self.height]))
+
+        if "bottom" in self.draw:
+            lines.append(([self.x, self.x + self.width], [self.y, self.y]))
+
+        if "left" in self.draw:
+            lines.append(([self.x, self.x], [self.y, self.y + self.height]))
+
+        if "right" in self.draw:
+            lines.append(([self.x + self.width, self.x + self.width], [self.y, self.y + self.height]))
+
+        return lines
+
+    def patch(self, vertical=False, **kwargs):
+        x, y, width, height = self.x, self.y, self.width, self.height
+
+        if vertical:
+            x, y = y, x
+            width, height = height, width
+
+        return Rectangle((x, y), width, height, **kwargs)
+
+    def label_point(self):
+        return self.x + self.width / 2, self.y + self.height / 2
+
+    def mirror(self):
+        """Returns the same zone at the other end of the pitch."""
+
+        draw = [{"left": "right", "right": "left"}.get(side, side) for side in self.draw]
+        return Zone(PITCH_DIMS.length - self.x - self.width, self.y, self.width, self.height, draw=draw)
+
+
+@dataclass
+class PolygonZone:
+    """A zone shaped as a polygon, with `draw` listing the indexes of the edges to draw."""
+
+    points: list[tuple[float, float]]
+    draw: list[int] = field(default_factory=list)
+    values: dict = field(default_factory=dict)
+
+    def is_inside(self, x, y, vertical=False):
+        """Checks if a point is inside a zone."""
+
+        if not vertical:
+            x, y = y, x
+
+        return bool(self.contains(np.array([x]), np.array([y]))[0])
+
+    def contains(self, x, y):
+        x, y = np.broadcast_arrays(x, y)
+        points = np.column_stack([x.ravel(), y.ravel()])
+
+        return Path(self.points).contains_points(points).reshape(x.shape)
+
+    def bounds(self):
+        xs, ys = zip(*self.points)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def border_lines(self):
+        lines = []
+        for index in self.draw:
+            (x1, y1), (x2, y2) = self.points[index], self.points[(index + 1) % len(self.points)]
+            lines.append(([x1, x2], [y1, y2]))
+
+        return lines
+
+    def patch(self, vertical=False, **kwargs):
+        points = [(y, x) for x, y in self.points] if vertical else self.points
+        return Polygon(points, closed=True, **kwargs)
+
+    def label_point(self):
+        xs, ys = zip(*self.points)
+        return sum(xs) / len(xs), sum(ys) / len(ys)
+
+    def mirror(self):
+        return PolygonZone([(PITCH_DIMS.length - x, y) for x, y in self.points], draw=list(self.draw))
+
+
+@dataclass
+class ArcZone:
+    """A zone shaped as the part of an ellipse between `x_min` and `x_max`, like the penalty arc."""
+
+    center_x: float
+    center_y: float
+    width: float
+    height: float
+    x_min: float
+    x_max: float
+    draw: list[str] = field(default_factory=list)
+    values: dict = field(default_factory=dict)
+
+    def is_inside(self, x, y, vertical=False):
+        """Checks if a point is inside a zone."""
+
+        if not vertical:
+            x, y = y, x
+
+        return bool(self.contains(x, y))
+
+    def contains(self, x, y):
+        dx = (x - self.center_x) / (self.width / 2)
+        dy = (y - self.center_y) / (self.height / 2)
+        return (dx ** 2 + dy ** 2 < 1) & (self.x_min <= x) & (x < self.x_max)
+
+    def outline(self, points=64):
+        """Returns the points of the zone outline, starting and ending on the straight side."""
+
+        angles = np.linspace(0, 2 * np.pi, 512)
+        xs = self.center_x + np.cos(angles) * self.width / 2
+        ys = self.center_y + np.sin(angles) * self.height / 2
+
+        inside = (self.x_min <= xs) & (xs <= self.x_max)
+        # Start right after the straight side so the curve is continuous
+        start = np.argmin(inside) if not inside.all() else 0
+        xs, ys, inside = np.roll(xs, -start), np.roll(ys, -start), np.roll(inside, -start)
+        xs, ys = xs[inside], ys[inside]
+
+        step = max(1, len(xs) // points)
+        return list(zip(xs[::step], ys[::step])) + [(xs[-1], ys[-1])]
+
+    def bounds(self):
+        xs, ys = zip(*self.outline())
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def border_lines(self):
+        if "arc" not in self.draw:
+            return []
+
+        xs, ys = zip(*self.outline())
+        return [(list(xs), list(ys))]
+
+    def patch(self, vertical=False, **kwargs):
+        points = self.outline()
+        if vertical:
+            points = [(y, x) for x, y in points]
+
+        return Polygon(points, closed=True, **kwargs)
+
+    def label_point(self):
+        x_min, y_min, x_max, y_max = self.bounds()
+        return (x_min + x_max) / 2, (y_min + y_max) / 2
+
+    def mirror(self):
+        return ArcZone(
+            PITCH_DIMS.length - self.center_x,
+            self.center_y,
+            self.width,
+            self.height,
+            PITCH_DIMS.length - self.x_max,
+            PITCH_DIMS.length - self.x_min,
+            draw=list(self.draw),
+        )
+
+
+def make_penalty_arc_zone(draw=("arc",)):
+    """Returns the penalty arc at the left end of the pitch, outside of the penalty area."""
+
+    return ArcZone(
+        PITCH_DIMS.penalty_left,
+        PITCH_DIMS.center_width,
+        PENALTY_ARC_LENGTH,
+        PENALTY_ARC_WIDTH,
+        PITCH_DIMS.penalty_area_length,
+        PITCH_DIMS.penalty_left + PENALTY_ARC_LENGTH / 2,
+        draw=list(draw),
+    )
+
+
+def mirror_zones(zones):
+    """Returns the zones defined for the left end of the pitch followed by the same zones at the right end."""
+
+    return zones + [zone.mirror() for zone in zones]
+
 
 def make_default_zones():
     # All the zones are defined for the horizontal pitch but work for the vertical pitch as well.
@@ -71,65 +275,234 @@ def make_default_zones():
 
 
 def make_simplified_zones():
-    """TODO"""
+    """Returns a few large zones: the six yard box, the penalty area, the penalty arc, outside of the box and the wings."""
+
+    zones = [
+        # The six yard box and the centre of the penalty area
+        Zone(0, PITCH_DIMS.six_yard_bottom, PITCH_DIMS.six_yard_length, PITCH_DIMS.six_yard_width, draw=["right"]),
+        Zone(PITCH_DIMS.six_yard_length, PITCH_DIMS.six_yard_bottom, PENALTY_AREA_SIDE_LENGTH, PITCH_DIMS.six_yard_width, draw=["top", "bottom"]),
+
+        # The sides of the penalty area
+        Zone(0, PITCH_SIDE_WIDTH, PITCH_DIMS.penalty_area_length, PENALTY_AREA_SIDE_WIDTH),
+        Zone(0, PITCH_DIMS.six_yard_top, PITCH_DIMS.penalty_area_length, PENALTY_AREA_SIDE_WIDTH),
+
+        # The penalty arc comes before the zone outside of the box so it takes priority
+        make_penalty_arc_zone(),
+        Zone(PITCH_DIMS.penalty_area_length, PITCH_SIDE_WIDTH, PITCH_SIDE_LENGTH, PITCH_DIMS.penalty_area_width, draw=["right"]),
+
+        # The wings, up to the halfway line
+        Zone(0, 0, PITCH_DIMS.length / 2, PITCH_SIDE_WIDTH, draw=["top", "right"]),
+        Zone(0, PITCH_DIMS.penalty_area_top, PITCH_DIMS.length / 2, PITCH_SIDE_WIDTH, draw=["bottom", "right"]),
+    ]
+
+    return mirror_zones(zones)
 
 
 def make_detailed_zones():
-    pass
+    """Returns small zones splitting the boxes by the angle to the goal and the space outside of the box in bands."""
+
+    penalty_area_length = PITCH_DIMS.penalty_area_length
+    six_yard_length = PITCH_DIMS.six_yard_length
+    goal_bottom, goal_top = PITCH_DIMS.goal_bottom, PITCH_DIMS.goal_top
+    six_yard_bottom, six_yard_top = PITCH_DIMS.six_yard_bottom, PITCH_DIMS.six_yard_top
+    penalty_area_bottom, penalty_area_top = PITCH_DIMS.penalty_area_bottom, PITCH_DIMS.penalty_area_top
+
+    zones = [
+        # The six yard box, split by the goal posts
+        Zone(0, goal_bottom, six_yard_length, PITCH_DIMS.goal_width, draw=ALL_SIDES),
+        Zone(0, six_yard_bottom, six_yard_length, goal_bottom - six_yard_bottom, draw=ALL_SIDES),
+        Zone(0, goal_top, six_yard_length, six_yard_top - goal_top, draw=ALL_SIDES),
+
+        # The penalty area in front of the six yard box, split by the goal posts
+        Zone(six_yard_length, goal_bottom, PENALTY_AREA_SIDE_LENGTH, PITCH_DIMS.goal_width, draw=ALL_SIDES),
+        Zone(six_yard_length, six_yard_bottom, PENALTY_AREA_SIDE_LENGTH, goal_bottom - six_yard_bottom, draw=ALL_SIDES),
+        Zone(six_yard_length, goal_top, PENALTY_AREA_SIDE_LENGTH, six_yard_top - goal_top, draw=ALL_SIDES),
+
+        # The sides of the penalty area, split by the diagonal between the goal line and the box corner
+        PolygonZone([(0, penalty_area_bottom), (penalty_area_length, penalty_area_bottom), (0, six_yard_bottom)], draw=[0, 1]),
+        PolygonZone([(penalty_area_length, penalty_area_bottom), (penalty_area_length, six_yard_bottom), (0, six_yard_bottom)], draw=[0, 1, 2]),
+        PolygonZone([(0, penalty_area_top), (penalty_area_length, penalty_area_top), (0, six_yard_top)], draw=[0, 1]),
+        PolygonZone([(penalty_area_length, penalty_area_top), (penalty_area_length, six_yard_top), (0, six_yard_top)], draw=[0, 1, 2]),
+
+        make_penalty_arc_zone(),
+    ]
+
+    # Outside of the box, in two depth bands and three width bands
+    depth = PITCH_SIDE_LENGTH / 3
+    for x, length in [(penalty_area_length, depth), (penalty_area_length + depth, PITCH_SIDE_LENGTH - depth)]:
+        zones.append(Zone(x, penalty_area_bottom, length, six_yard_bottom - penalty_area_bottom, draw=ALL_SIDES))
+        zones.append(Zone(x, six_yard_bottom, length, PITCH_DIMS.six_yard_width, draw=ALL_SIDES))
+        zones.append(Zone(x, six_yard_top, length, penalty_area_top - six_yard_top, draw=ALL_SIDES))
+
+    # The wings, next to the box and up to the halfway line
+    for y in [0, penalty_area_top]:
+        zones.append(Zone(0, y, penalty_area_length, PITCH_SIDE_WIDTH, draw=ALL_SIDES))
+        zones.append(Zone(penalty_area_length, y, PITCH_SIDE_LENGTH, PITCH_SIDE_WIDTH, draw=ALL_SIDES))
+
+    return mirror_zones(zones)
+
+
+class ZoneLayout:
+    """Zones compiled into a label grid over the opta pitch.
+
+    Each cell of the grid holds the index of the first zone containing its center, so finding
+    the zone of a point is a single array index whatever the number or the shape of the zones.
+    The edges of the zones are exact when they lie on the grid and within half a cell otherwise.
+
+    Args:
+        zones (list): The zones, in order of priority.
+        resolution (float, optional): The size of a cell in opta units. Defaults to 0.1.
+    """
+
+    def __init__(self, zones, resolution=RASTER_RESOLUTION):
+        self.resolution = resolution
+
+        size_x = int(round((PITCH_DIMS.right - PITCH_DIMS.left) / resolution))
+        size_y = int(round((PITCH_DIMS.top - PITCH_DIMS.bottom) / resolution))
+        self.labels = np.full((size_x, size_y), -1, dtype=np.int16)
+
+        centers_x = PITCH_DIMS.left + (np.arange(size_x) + 0.5) * resolution
+        centers_y = PITCH_DIMS.bottom + (np.arange(size_y) + 0.5) * resolution
+
+        # Zones are painted from the last to the first so the first zone wins where they overlap
+        for index in reversed(range(len(zones))):
+            x_min, y_min, x_max, y_max = zones[index].bounds()
+            i_min, i_max = self._cell_range(x_min, x_max, PITCH_DIMS.left, size_x)
+            j_min, j_max = self._cell_range(y_min, y_max, PITCH_DIMS.bottom, size_y)
+
+            inside = zones[index].contains(centers_x[i_min:i_max, None], centers_y[None, j_min:j_max])
+            self.labels[i_min:i_max, j_min:j_max][inside] = index
+
+    def _cell_range(self, low, high, origin, size):
+        start = int(np.floor((low - origin) / self.resolution))
+        stop = int(np.ceil((high - origin) / self.resolution))
+        return max(start, 0), min(stop, size)
+
+    def assign(self, x, y):
+        """Returns the index of the zone of each point, or -1 if the point is in no zone.
+
+        Args:
+            x (np.ndarray): The x coordinates of the points, along the length of the pitch.
+            y (np.ndarray): The y coordinates of the points, along the width of the pitch.
+        """
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        i = np.floor((x - PITCH_DIMS.left) / self.resolution + RASTER_EPSILON).astype(np.intp)
+        j = np.floor((y - PITCH_DIMS.bottom) / self.resolution + RASTER_EPSILON).astype(np.intp)
+
+        inside = (i >= 0) & (i < self.labels.shape[0]) & (j >= 0) & (j < self.labels.shape[1])
+
+        result = np.full(x.shape, -1, dtype=np.intp)
+        result[inside] = self.labels[i[inside], j[inside]]
+
+        return result
+
+
+LAYOUTS = {
+    "default": make_default_zones,
+    "simplified": make_simplified_zones,
+    "detailed": make_detailed_zones,
+}
 
 
 @dataclass
 class Zones:
     zones: list[Zone] = field(default_factory=make_default_zones)
+    _layout: ZoneLayout = field(default=None, init=False, repr=False, compare=False)
 
     def __iter__(self):
         return iter(self.zones)
 
+    def __len__(self):
+        return len(self.zones)
 
-def draw_zone_borders(pitch, ax, zone, color=Colors.ACCENT):
-    """TODO: Write docstring."""
+    @classmethod
+    def from_layout(cls, name):
+        """Returns the zones of one of the `LAYOUTS`: "default", "simplified" or "detailed"."""
 
-    draw = zone.draw
-    if not draw:
-        return
+        if name not in LAYOUTS:
+            raise ValueError(f"Invalid zones layout: '{name}'.")
+
+        return cls(LAYOUTS[name]())
+
+    @property
+    def layout(self):
+        if self._layout is None:
+            self._layout = ZoneLayout(self.zones)
+
+        return self._layout
+
+    def assign(self, x, y, vertical=False):
+        """Find the zone of each point using the compiled layout.
+
+        Args:
+            x (np.ndarray): The x coordinates of the points.
+            y (np.ndarray): The y coordinates of the points.
+            vertical (bool, optional): Whether the coordinates are for a vertical pitch.
+                Defaults to False.
 
-    lines = []
+        Returns:
+            np.ndarray: The index of the zone of each point, or -1 if the point is in no zone.
+        """
 
-    if "top" in draw:
-        lines.append([(zone.x, zone.y + zone.height), (zone.x + zone.width, zone.y + zone.height)])
+        if not vertical:
+            x, y = y, x
 
-    if "bottom" in draw:
-        lines.append([(zone.x, zone.y), (zone.x + zone.width, zone.y)])
+        return self.layout.assign(x, y)
 
-    if "left" in draw:
-        lines.append([(zone.x, zone.y), (zone.x, zone.y + zone.height)])
 
-    if "right" in draw:
-        lines.append([(zone.x + zone.width, zone.y), (zone.x + zone.width, zone.y + zone.height)])
+def draw_zone_borders(pitch, ax, zone, color=Colors.ACCENT):
+    """Draws the borders of a zone listed in its `draw` attribute as dashed lines."""
 
-    for line in lines:
-        pitch.plot([line[0][0], line[1][0]], [line[0][1], line[1][1]], color=color, linewidth=2, linestyle="dashed",  ax=ax)
+    for xs, ys in zone.border_lines():
+        pitch.plot(xs, ys, color=color, linewidth=2, linestyle="dashed",  ax=ax)
 
 
 def draw_zone_fill(pitch, ax, zone, text="Hello, World!", color=Colors.ACCENT):
-    x = zone.x
-    y = zone.y
-    width = zone.width
-    height = zone.height
+    patch = zone.patch(pitch.vertical, facecolor=color, linewidth=0, alpha=0.4, zorder=0)
 
+    x, y = zone.label_point()
     if pitch.vertical:
         x, y = y, x
-        width, height = height, width
 
-    rect = Rectangle((x, y), width, height, facecolor=color, linewidth=0, alpha=0.4, zorder=0)
+    ax.add_patch(patch)
+    ax.annotate(f"{text}", (x, y), color=Colors.MAIN, fontsize=12, fontproperties=OutfitFont.BOLD, ha="center", va="center")
+
+
+def draw_zones_fill(pitch, ax, zones, texts, colors):
+    """Fills the zones with a single patch collection and writes a text in the middle of each zone.
+
+    Returns the patch collection and the annotations, in the same order as the zones.
+    """
+
+    patches = [zone.patch(pitch.vertical) for zone in zones]
+    collection = ax.add_collection(PatchCollection(patches, facecolors=colors, linewidths=0, alpha=0.4, zorder=0), autolim=False)
+
+    annotations = []
+    for zone, text in zip(zones, texts):
+        x, y = zone.label_point()
+        if pitch.vertical:
+            x, y = y, x
+
+        annotations.append(ax.annotate(f"{text}", (x, y), color=Colors.MAIN, fontsize=12, fontproperties=OutfitFont.BOLD, ha="center", va="center"))
+
+    return collection, annotations
 
-    ax.add_patch(rect)
-    ax.annotate(f"{text}", (0.5, 0.5), xycoords=rect, color=Colors.MAIN, fontsize=12, fontproperties=OutfitFont.BOLD, ha="center", va="center")
 
+def draw_zones(pitch, ax, zones, color=Colors.ACCENT):
+    """Draws the borders of all the zones with a single line collection."""
 
-def draw_zones(pitch, ax, zones):
+    segments = []
     for zone in zones:
-        draw_zone_borders(pitch, ax, zone)
+        for xs, ys in zone.border_lines():
+            segments.append(np.column_stack([ys, xs] if pitch.vertical else [xs, ys]))
+
+    if not segments:
+        return
+
+    ax.add_collection(LineCollection(segments, colors=color, linewidths=2, linestyles="dashed", zorder=2), autolim=False)
 
 
 if __name__ == "__main__":
@@ -151,10 +524,11 @@ if __name__ == "__main__":
         spot_scale=0
     )
 
-    for pitch in [horizontal_pitch, vertical_pitch]:
-        fig, ax = pitch.draw(figsize=(16, 9))
+    for layout in LAYOUTS:
+        for pitch in [horizontal_pitch, vertical_pitch]:
+            fig, ax = pitch.draw(figsize=(16, 9))
 
-        zones = Zones()
-        draw_zones(pitch, ax, zones)
+            zones = Zones.from_layout(layout)
+            draw_zones(pitch, ax, zones)
 
-        fig.savefig(f"./media/test_{"vertical_" if pitch.vertical else ""}zones.png", bbox_inches="tight")
+            fig.savefig(f"./media/test_{"vertical_" if pitch.vertical else ""}{layout}_zones.png", bbox_inches="tight")
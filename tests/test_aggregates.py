@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from src.aggregates import ZoneCube
+from src.shots import ShotTable
+from src.shotzone import calculate_zones_stats
+from src.zones import Zones, LAYOUTS
+
+
+PLAYERS = [("Mohamed Salah", "Liverpool", "h"), ("Jarrod Bowen", "West Ham", "a"), ("Cole Palmer", "Chelsea", "h")]
+
+SITUATIONS = ["OpenPlay", "FromCorner", "SetPiece", "Penalty"]
+
+SHOT_TYPES = ["RightFoot", "LeftFoot", "Head"]
+
+
+def _shots(n, seed=0, first_id=1):
+    rng = np.random.default_rng(seed)
+
+    shots = []
+    for i in range(n):
+        player, team, side = PLAYERS[rng.integers(len(PLAYERS))]
+        shots.append({
+            "id": str(first_id + i),
+            # Some shots are taken from the own half or behind the goal line, outside of the zones.
+            "X": str(round(float(rng.uniform(0.3, 1.02)), 3)),
+            "Y": str(round(float(rng.uniform(0, 1)), 3)),
+            "xG": str(round(float(rng.uniform(0, 0.8)), 4)),
+            "result": "Goal" if rng.random() < 0.1 else "MissedShots",
+            "player": player,
+            "h_a": side,
+            "h_team": team if side == "h" else "Everton",
+            "a_team": team if side == "a" else "Everton",
+            "situation": SITUATIONS[rng.integers(len(SITUATIONS))],
+            "shotType": SHOT_TYPES[rng.integers(len(SHOT_TYPES))],
+        })
+
+    return shots
+
+
+def _expected(shots, layout):
+    zones = Zones.from_layout(layout)
+    table = ShotTable.from_understat(shots)
+    calculate_zones_stats(table, zones)
+
+    return np.array([zone.values["shots"] for zone in zones]), np.array([zone.values["xG"] for zone in zones])
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_query_matches_the_stats_of_the_raw_shots(layout):
+    shots = _shots(500)
+
+    cube = ZoneCube(layout)
+    cube.add(shots)
+
+    filters = [
+        ({}, lambda shot: True),
+        ({"player": "Mohamed Salah"}, lambda shot: shot["player"] == "Mohamed Salah"),
+        ({"team": "West Ham"}, lambda shot: shot["player"] == "Jarrod Bowen"),
+        ({"situation": ["OpenPlay", "FromCorner"]}, lambda shot: shot["situation"] in ("OpenPlay", "FromCorner")),
+        ({"player": "Cole Palmer", "shot_type": "Head"}, lambda shot: shot["player"] == "Cole Palmer" and shot["shotType"] == "Head"),
+    ]
+    for query, keep in filters:
+        selected = [shot for shot in shots if keep(shot)]
+        aggregate = cube.query(**query)
+        expected_shots, expected_xG = _expected(selected, layout)
+
+        np.testing.assert_array_equal(aggregate["shots"], expected_shots)
+        np.testing.assert_allclose(aggregate["xG"], expected_xG)
+        assert aggregate["total_shots"] == len(selected)
+        assert aggregate["total_goals"] == sum(shot["result"] == "Goal" for shot in selected)
+        assert aggregate["total_xG"] == pytest.approx(sum(float(shot["xG"]) for shot in selected))
+
+
+def test_unknown_labels_select_no_shots():
+    cube = ZoneCube()
+    cube.add(_shots(50))
+
+    assert cube.query(player="Nobody")["total_shots"] == 0
+    assert cube.query(situation="DirectFreekick")["total_shots"] == 0
+
+
+def test_adding_the_same_shots_again_is_a_no_op():
+    shots = _shots(200)
+
+    cube = ZoneCube()
+    assert cube.add(shots) == 200
+
+    values = cube.values.copy()
+    assert cube.add(shots) == 0
+    assert cube.add(shots[:50]) == 0
+    np.testing.assert_array_equal(cube.values, values)
+
+    # Only the new shots of a batch are added.
+    assert cube.add([*shots[150:], *_shots(30, seed=1, first_id=1000)]) == 30
+    assert cube.query()["total_shots"] == 230
+
+
+def test_duplicated_shots_in_one_batch_are_added_once():
+    shots = _shots(20)
+
+    cube = ZoneCube()
+    assert cube.add([*shots, *shots]) == 20
+    assert cube.query()["total_shots"] == 20
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_save_and_load(tmp_path, monkeypatch, layout):
+    monkeypatch.chdir(tmp_path)
+
+    cube = ZoneCube(layout)
+    cube.add(_shots(300))
+    cube.save("EPL", "2024")
+
+    loaded = ZoneCube.load("EPL", "2024", layout)
+
+    np.testing.assert_array_equal(loaded.values, cube.values)
+    np.testing.assert_array_equal(loaded.shot_ids, cube.shot_ids)
+    assert loaded.pairs == cube.pairs
+
+    for query in ({}, {"player": "Jarrod Bowen"}, {"team": "Liverpool", "situation": "Penalty"}):
+        expected = cube.query(**query)
+        actual = loaded.query(**query)
+        np.testing.assert_array_equal(actual["shots"], expected["shots"])
+        assert actual["total_xG"] == pytest.approx(expected["total_xG"])
+
+    # The loaded cube keeps ignoring the shots it already holds.
+    assert loaded.add(_shots(300)) == 0
+
+
+def test_load_a_missing_cube(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        ZoneCube.load("EPL", "2024")
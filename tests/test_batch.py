@@ -0,0 +1,22 @@
+from src.batch import league_jobs
+from src.storage import write_dataset
+from src.sync import SHOTS_ENTITY
+
+
+def _shot(shot_id, player, player_id):
+    return {"id": shot_id, "X": 0.9, "Y": 0.5, "xG": 0.1, "result": "Goal", "player": player, "player_id": player_id, "match_id": 1}
+
+
+def test_league_jobs_keep_players_sharing_a_name_apart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shots = [_shot(1, "Danilo", 10), _shot(2, "Danilo", 10), _shot(3, "Danilo", 20), _shot(4, "Rodri", 30)]
+    write_dataset(shots, "shots", "EPL", "2024", SHOTS_ENTITY)
+
+    jobs = league_jobs("EPL", "2024", kinds=("shotmap",))
+
+    assert sorted((job.file_name, len(job.data)) for job in jobs) == [
+        ("./media/danilo_10_2024_shotmap.png", 2),
+        ("./media/danilo_20_2024_shotmap.png", 1),
+        ("./media/rodri_2024_shotmap.png", 1),
+    ]
+    assert {job.title for job in jobs} == {"Danilo", "Rodri"}
@@ -0,0 +1,36 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from src.files import write_atomic
+
+
+def test_write_text_and_bytes(tmp_path):
+    write_atomic(tmp_path / "data" / "state.json", '{"a": 1}')
+    write_atomic(tmp_path / "media" / "x.png", b"\x89PNG")
+
+    assert (tmp_path / "data" / "state.json").read_text() == '{"a": 1}'
+    assert (tmp_path / "media" / "x.png").read_bytes() == b"\x89PNG"
+
+
+def test_files_sharing_a_stem_do_not_share_a_temporary_file(tmp_path):
+    write_atomic(tmp_path / "x.png", b"png")
+    write_atomic(tmp_path / "x.webp", b"webp")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["x.png", "x.webp"]
+
+
+def _write_many(args):
+    file_name, value = args
+    for _ in range(100):
+        write_atomic(file_name, json.dumps({"value": value, "padding": "x" * 100_000 * value}))
+
+
+def test_concurrent_writers_publish_complete_files(tmp_path):
+    file_name = tmp_path / "state.json"
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_write_many, [(file_name, value) for value in range(1, 5)]))
+
+    data = json.loads(file_name.read_text())
+    assert len(data["padding"]) == 100_000 * data["value"]
+    assert [path.name for path in tmp_path.iterdir()] == ["state.json"]
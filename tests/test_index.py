@@ -0,0 +1,74 @@
+import time
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.index import SeasonEntry, EntityIndex, DEFAULT_TTL
+from src.leagues import current_season
+
+
+def _entry(season, updated_at):
+    return SeasonEntry("EPL", season, players={}, teams={}, matches=[], updated_at=updated_at)
+
+
+def test_entry_saved_mid_season_goes_stale():
+    entry = _entry("2023", datetime(2024, 4, 15).timestamp())
+
+    assert not entry.is_fresh(DEFAULT_TTL)
+
+
+def test_entry_saved_after_the_season_never_expires():
+    entry = _entry("2023", datetime(2024, 8, 1).timestamp())
+
+    assert entry.is_fresh(DEFAULT_TTL)
+
+
+def test_entry_of_the_current_season_is_fresh_within_the_ttl():
+    entry = _entry(current_season(), time.time())
+
+    assert entry.is_fresh(DEFAULT_TTL)
+    assert not entry.is_fresh(0)
+
+
+def _index(tmp_path, players):
+    season = current_season()
+    understat_players = [{"id": player_id, "player_name": name} for player_id, name in players]
+
+    index = EntityIndex(tmp_path / "index.json")
+    index.entries[("EPL", season)] = SeasonEntry.from_understat("EPL", season, understat_players, [], [], [])
+    return index, season
+
+
+def test_players_sharing_a_name_are_all_kept(tmp_path):
+    index, season = _index(tmp_path, [("1", "Danilo"), ("2", "Danilo"), ("3", "Mohamed Salah")])
+    entry = index.entries[("EPL", season)]
+
+    assert entry.players == {"1": "Danilo", "2": "Danilo", "3": "Mohamed Salah"}
+    assert entry.player_ids["Danilo"] == ["1", "2"]
+
+
+def test_an_ambiguous_player_name_is_not_resolved(tmp_path):
+    index, season = _index(tmp_path, [("1", "Danilo"), ("2", "Danilo"), ("3", "Mohamed Salah")])
+
+    assert asyncio.run(index.player_id(None, "Mohamed Salah", season, league="EPL")) == "3"
+    assert asyncio.run(index.player_id(None, "mohamed  salah", season, league="EPL", fuzzy=True)) == "3"
+
+    with pytest.raises(ValueError, match="Ambiguous"):
+        asyncio.run(index.player_id(None, "Danilo", season, league="EPL"))
+
+
+def test_the_index_is_saved_and_loaded(tmp_path):
+    index, season = _index(tmp_path, [("1", "Danilo"), ("2", "Danilo")])
+    index.save()
+
+    loaded = EntityIndex.load(tmp_path / "index.json")
+
+    assert loaded.entries[("EPL", season)].players == {"1": "Danilo", "2": "Danilo"}
+
+
+def test_entries_saved_in_an_older_format_are_ignored(tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text('{"entries": [{"league": "EPL", "season": "2023", "players": {"Danilo": "1"}, "teams": {}, "matches": [], "updated_at": 0}]}')
+
+    assert EntityIndex.load(path).entries == {}
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+from src import ingest
+from src.ingest import _JSONStream, iter_records, remove_dump_partitions
+from src.storage import dataset_path
+
+
+READ_SIZES = [1, 2, 3, 7, 64, 1 << 16]
+
+SHOTS = [
+    {"id": "1", "X": "0.885", "Y": "0.5", "xG": "0.7611", "player": "Mohamed Salah", "situation": "Penalty"},
+    {"id": "2", "X": 0.9123456789, "Y": 1e-3, "xG": -12345.678e-2, "player": "a ]}[{, b", "lastAction": None},
+    {"id": "3", "X": 1234567890123, "Y": 0, "xG": 0.05, "player": "N'Golo Kanté \"quoted\" \\ ,:", "tags": [1, [2, {"x": 3}]], "flag": True},
+]
+
+
+def _records(text):
+    return list(_JSONStream(io.StringIO(text)).records())
+
+
+@pytest.fixture(params=READ_SIZES)
+def read_size(request, monkeypatch):
+    monkeypatch.setattr(ingest, "READ_SIZE", request.param)
+    return request.param
+
+
+def test_list_of_records(read_size):
+    assert _records(json.dumps(SHOTS)) == SHOTS
+
+
+def test_whitespace_between_tokens(read_size):
+    assert _records(json.dumps(SHOTS, indent=4)) == SHOTS
+
+
+def test_numbers_split_across_reads(read_size):
+    # Every number ends right at a read boundary for one of the read sizes.
+    records = [{"n": 10 ** digits, "f": float(f"1.{'9' * digits}e-{digits}")} for digits in range(1, 20)]
+
+    assert _records(json.dumps(records)) == records
+
+
+def test_numbers_and_nested_arrays_between_records(read_size):
+    text = '[123456789, {"id": "1"}, [[{"id": "2"}], 3.5e10], "a ]}[{, b", null, {"id": "3"}]'
+
+    assert _records(text) == [{"id": "1"}, {"id": "2"}, {"id": "3"}]
+
+
+def test_cached_response_layout(read_size):
+    text = json.dumps({"key": "get_player_shots", "immutable": True, "updated_at": 1712345678.25, "data": SHOTS})
+
+    assert _records(text) == SHOTS
+
+
+def test_match_payload_layout(read_size, tmp_path):
+    path = tmp_path / "match.json"
+    path.write_text(json.dumps({"h": SHOTS[:2], "a": SHOTS[2:]}))
+
+    assert list(iter_records(path)) == SHOTS
+
+
+def test_list_of_match_payloads(read_size, tmp_path):
+    path = tmp_path / "matches.json"
+    path.write_text(json.dumps([{"h": SHOTS[:1], "a": SHOTS[1:2]}, {"h": [], "a": SHOTS[2:]}]))
+
+    assert list(iter_records(path)) == SHOTS
+
+
+def test_empty_documents(read_size):
+    assert _records("[]") == []
+    assert _records("{}") == []
+    assert _records("") == []
+
+
+def test_json_lines(tmp_path):
+    path = tmp_path / "shots.jsonl"
+    path.write_text("\n".join(json.dumps(shot) for shot in SHOTS) + "\n\n")
+
+    assert list(iter_records(path)) == SHOTS
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(SHOTS)[:-1],
+    json.dumps(SHOTS)[:-10],
+    '[{"id": "1"}, {"id": "2", "X": 0.9',
+    '{"data": [{"id": "1"}',
+    '[{"id": "1"} {"id": "2"}]',
+])
+def test_truncated_input(read_size, text):
+    with pytest.raises(ValueError):
+        _records(text)
+
+
+def test_truncated_input_yields_the_complete_records_first(read_size):
+    stream = _JSONStream(io.StringIO('[{"id": "1"}, {"id": "2"}, {"id": "3"'))
+    records = stream.records()
+
+    assert next(records) == {"id": "1"}
+    assert next(records) == {"id": "2"}
+    with pytest.raises(ValueError):
+        next(records)
+
+
+def test_remove_dump_partitions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    paths = {
+        entity: dataset_path("shots", "EPL", season, entity, fmt=fmt)
+        for entity, season, fmt in [
+            ("dump_00000", "2023", "parquet"),
+            ("dump_00001", "2024", "npz"),
+            ("dump_2020_00000", "2020", "parquet"),
+            ("dump_extra", "2024", "parquet"),
+            ("matches", "2024", "parquet"),
+        ]
+    }
+    for path in paths.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+    removed = remove_dump_partitions("dump", "EPL")
+
+    assert sorted(removed) == sorted(str(paths[entity]) for entity in ("dump_00000", "dump_00001"))
+    assert [entity for entity, path in paths.items() if path.exists()] == ["dump_2020_00000", "dump_extra", "matches"]
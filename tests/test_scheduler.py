@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from src.scheduler import RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+class FakeCall:
+    """A request failing with the given errors, then returning its number of calls."""
+
+    def __init__(self, errors=(), delay=0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        if self.errors:
+            raise self.errors.pop(0)
+
+        return self.calls
+
+
+def _scheduler(clock, **kwargs):
+    return RequestScheduler(rate=None, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_transient_errors_are_retried_up_to_retries():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, retries=3, backoff=1, max_backoff=3)
+    call = FakeCall([asyncio.TimeoutError()] * 4)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scheduler.submit("key", call))
+
+    assert call.calls == 4
+    assert scheduler.stats["retries"] == 3
+
+    # The backoff doubles up to `max_backoff`, minus up to half of it as jitter.
+    for delay, backoff in zip(clock.sleeps, [1, 2, 3]):
+        assert backoff / 2 <= delay <= backoff
+
+
+def test_a_transient_error_then_a_success():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, retries=3)
+    call = FakeCall([asyncio.TimeoutError(), asyncio.TimeoutError()])
+
+    assert asyncio.run(scheduler.submit("key", call)) == 3
+    assert len(clock.sleeps) == 2
+
+
+def test_non_transient_errors_are_not_retried():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, retries=3)
+    call = FakeCall([KeyError("player")])
+
+    with pytest.raises(KeyError):
+        asyncio.run(scheduler.submit("key", call))
+
+    assert call.calls == 1
+    assert clock.sleeps == []
+
+
+def test_concurrent_submits_of_one_key_run_the_call_once():
+    scheduler = _scheduler(FakeClock())
+    call = FakeCall(delay=0.01)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit("key", call) for _ in range(10)))
+
+    assert asyncio.run(main()) == [1] * 10
+    assert call.calls == 1
+    assert scheduler.stats["deduplicated"] == 9
+    assert scheduler.in_flight == {}
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_request():
+    scheduler = _scheduler(FakeClock())
+    call = FakeCall(delay=0.05)
+
+    async def main():
+        first = asyncio.ensure_future(scheduler.submit("key", call))
+        second = asyncio.ensure_future(scheduler.submit("key", call))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        result = await second
+
+        return first.cancelled(), result
+
+    assert asyncio.run(main()) == (True, 1)
+    assert call.calls == 1
+
+
+def test_the_bucket_keeps_to_its_rate_after_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=5, clock=clock, sleep=clock.sleep)
+
+    async def main():
+        times = []
+        for _ in range(25):
+            await bucket.acquire()
+            times.append(clock.now)
+
+        return times
+
+    times = asyncio.run(main())
+
+    assert times[:5] == [0] * 5
+    assert times[-1] == pytest.approx(2.0)
+
+
+def test_the_bucket_refills_up_to_its_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=5, clock=clock, sleep=clock.sleep)
+
+    async def main():
+        for _ in range(5):
+            await bucket.acquire()
+
+        clock.now += 60
+        for _ in range(6):
+            await bucket.acquire()
+
+    asyncio.run(main())
+
+    assert clock.now == pytest.approx(60.1)
+
+
+def test_invalid_bucket():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
@@ -0,0 +1,63 @@
+import asyncio
+
+from src.sync import sync_season, load_sync_state
+from src.storage import load_shots
+
+
+def _shot(shot_id, match_id):
+    return {
+        "id": str(shot_id),
+        "minute": "10",
+        "result": "MissedShots",
+        "X": "0.9",
+        "Y": "0.5",
+        "xG": "0.1",
+        "player": "Mohamed Salah",
+        "h_a": "h",
+        "player_id": "1250",
+        "situation": "OpenPlay",
+        "season": "2024",
+        "shotType": "LeftFoot",
+        "match_id": str(match_id),
+        "h_team": "Liverpool",
+        "a_team": "West Ham",
+        "h_goals": "0",
+        "a_goals": "0",
+        "date": "2024-09-01 15:00:00",
+        "player_assisted": None,
+        "lastAction": "None",
+    }
+
+
+class FakeClient:
+    """A client whose cache still holds the shots of a match fetched while it was played."""
+
+    def __init__(self, results, cached, live):
+        self.results = results
+        self.cached = cached
+        self.live = live
+
+    async def get_match_shots(self, match_id):
+        return self.cached[match_id]
+
+    async def refresh(self, method, *args, **kwargs):
+        if method == "get_league_results":
+            return self.results
+
+        assert method == "get_match_shots"
+        return self.live[args[0]]
+
+
+def test_sync_skips_a_stale_cached_match(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    results = [{"id": "100", "isResult": True, "datetime": "2024-09-01 15:00:00"}]
+    cached = {"100": {"h": [_shot(1, 100)], "a": []}}
+    live = {"100": {"h": [_shot(1, 100), _shot(2, 100)], "a": [_shot(3, 100)]}}
+
+    state_path = tmp_path / "sync_state.json"
+    synced = asyncio.run(sync_season("EPL", "2024", client=FakeClient(results, cached, live), state_path=state_path))
+
+    assert synced == ["100"]
+    assert sorted(load_shots("EPL", "2024", "matches")["id"].astype(str)) == ["1", "2", "3"]
+    assert load_sync_state(state_path)["EPL/2024"]["matches"] == ["100"]
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from src.zones import Zone, Zones, LAYOUTS, PITCH_DIMS, RASTER_RESOLUTION
+
+
+EDGE_OFFSET = 1e-3
+
+
+def _exact(zones, x, y):
+    """The zone of each point found with the geometry of the zones, the first one winning."""
+
+    result = np.full(np.shape(x), -1, dtype=np.intp)
+    for index in reversed(range(len(zones))):
+        result[zones[index].contains(x, y)] = index
+
+    return result
+
+
+def _on_grid(value):
+    return abs(value / RASTER_RESOLUTION - round(value / RASTER_RESOLUTION)) < 1e-9
+
+
+def _grid_rectangles(zones):
+    return [zone for zone in zones if isinstance(zone, Zone) and all(_on_grid(value) for value in zone.bounds())]
+
+
+@pytest.fixture(params=LAYOUTS)
+def zones(request):
+    return Zones.from_layout(request.param)
+
+
+def _on_edge(zones, x, y):
+    """The zone of points lying on an edge: the zones are closed on their low side and open on their high side."""
+
+    # Moving the points by much less than a cell but much more than the rounding of the zone
+    # bounds keeps the exact geometry from seeing the gaps of 1e-14 between adjacent zones.
+    return _exact(zones, np.asarray(x, dtype=float) + EDGE_OFFSET, np.asarray(y, dtype=float) + EDGE_OFFSET)
+
+
+def test_rectangle_edges_on_the_grid_are_exact(zones):
+    rectangles = _grid_rectangles(zones)
+    assert rectangles
+
+    for zone in rectangles:
+        x_min, y_min, x_max, y_max = zone.bounds()
+        x_mid, y_mid = (x_min + x_max) / 2, (y_min + y_max) / 2
+
+        # The corners and the middle of each edge.
+        xs = np.array([x_min, x_min, x_mid, x_max, x_max, x_mid])
+        ys = np.array([y_min, y_mid, y_min, y_mid, y_max, y_max])
+        np.testing.assert_array_equal(zones.layout.assign(xs, ys), _on_edge(zones.zones, xs, ys))
+
+        # The points just inside and just outside of the edges.
+        xs = np.array([x_min + EDGE_OFFSET, x_max - EDGE_OFFSET, x_min - EDGE_OFFSET, x_max + EDGE_OFFSET, x_mid, x_mid, x_mid, x_mid])
+        ys = np.array([y_mid, y_mid, y_mid, y_mid, y_min + EDGE_OFFSET, y_max - EDGE_OFFSET, y_min - EDGE_OFFSET, y_max + EDGE_OFFSET])
+        np.testing.assert_array_equal(zones.layout.assign(xs, ys), _exact(zones.zones, xs, ys))
+
+
+def test_float32_coordinates_on_an_edge(zones):
+    # The shots are stored as float32, which moves a point on an edge by about 1e-5.
+    for zone in _grid_rectangles(zones):
+        x_min, y_min, x_max, y_max = zone.bounds()
+        xs = np.array([x_min, (x_min + x_max) / 2, x_max])
+        ys = np.array([(y_min + y_max) / 2, y_min, y_max])
+
+        np.testing.assert_array_equal(zones.layout.assign(xs.astype(np.float32), ys.astype(np.float32)), _on_edge(zones.zones, xs, ys))
+
+
+def test_points_outside_of_the_pitch(zones):
+    xs = np.array([-50, -0.01, 100, 100.01, 150, 50, 50, 50, 50, -1, 101])
+    ys = np.array([50, 50, 50, 50, 50, -50, -0.01, 100, 100.01, -1, 101])
+
+    np.testing.assert_array_equal(zones.layout.assign(xs, ys), np.full(len(xs), -1))
+    np.testing.assert_array_equal(_exact(zones.zones, xs, ys), np.full(len(xs), -1))
+
+
+def test_pitch_corners(zones):
+    offset = 2 * EDGE_OFFSET
+    xs = np.array([PITCH_DIMS.left, PITCH_DIMS.left, PITCH_DIMS.right - offset, PITCH_DIMS.right - offset])
+    ys = np.array([PITCH_DIMS.bottom, PITCH_DIMS.top - offset, PITCH_DIMS.bottom, PITCH_DIMS.top - offset])
+
+    np.testing.assert_array_equal(zones.layout.assign(xs, ys), _on_edge(zones.zones, xs, ys))
+    assert (zones.layout.assign(xs, ys) >= 0).all()
+
+
+def test_other_points_are_within_a_cell_of_an_edge(zones):
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(PITCH_DIMS.left, PITCH_DIMS.right, 200_000)
+    ys = rng.uniform(PITCH_DIMS.bottom, PITCH_DIMS.top, 200_000)
+
+    actual = zones.layout.assign(xs, ys)
+    expected = _exact(zones.zones, xs, ys)
+
+    # The curved and off-grid edges are rasterized, so a point may only change zone when it
+    # is less than a cell away from another zone.
+    wrong = actual != expected
+    assert wrong.mean() < 0.01
+
+    near = np.zeros(wrong.sum(), dtype=bool)
+    for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]:
+        shifted = _exact(zones.zones, xs[wrong] + dx * RASTER_RESOLUTION, ys[wrong] + dy * RASTER_RESOLUTION)
+        near |= shifted == actual[wrong]
+
+    assert near.all()
+
+
+def test_assign_on_the_vertical_pitch(zones):
+    rng = np.random.default_rng(1)
+    xs = rng.uniform(0, 100, 1000)
+    ys = rng.uniform(0, 100, 1000)
+
+    np.testing.assert_array_equal(zones.assign(ys, xs, vertical=False), zones.assign(xs, ys, vertical=True))